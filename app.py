@@ -1,35 +1,130 @@
+import io
+import json
 import os 
 import sys
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, File, UploadFile, Request
+from fastapi import FastAPI, File, UploadFile, Request, WebSocket
 from fastapi.staticfiles import StaticFiles
 from uvicorn import run as app_run
-from fastapi.responses import Response, JSONResponse, FileResponse
+from fastapi.responses import Response, JSONResponse, FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import RedirectResponse
 import pandas as pd
+from pydantic import ValidationError
 
-from etl_project.utils.main_utils.utils import load_object
-from etl_project.utils.ml_utils.model.estimator import ETLModel
-from etl_project.pipeline.training_pipeline import TrainingPipeline
+from etl_project.serving.model_registry import ModelRegistry
+from etl_project.serving.admission import AdmissionController, AdmissionMiddleware, AdmissionRejected, rejected_response
+from etl_project.serving.compression import (
+    CompressionMiddleware,
+    DecompressedBodyTooLarge,
+    UnsupportedEncoding,
+    decompress_body,
+    iter_decompressed,
+    request_encoding,
+    split_compressed_filename,
+)
+from etl_project.serving.batching import MicroBatcher
+from etl_project.serving.prediction_cache import PredictionCache
+from etl_project.serving.result_store import PredictionResultStore
+from etl_project.serving.uploads import ChunkedUploadStore, UploadError, UploadRequest
+from etl_project.serving.json_records import JsonRecordScorer
+from etl_project.serving.live import LIVE_ROUTE, LivePredictionBatcher, LivePredictionConnection, live_message_adapter
+from etl_project.serving.metrics import (
+    REGISTRY,
+    REQUEST_ROWS,
+    ROWS_SCORED_TOTAL,
+    CallbackMetric,
+    MetricsMiddleware,
+    request_timings,
+)
+from etl_project.serving.executor import InferenceExecutor
+from etl_project.serving.prefork import PreforkServer
+from etl_project.serving.streaming import BodyStreamingResponse, iter_upload_chunks, prime, stream_scored_csv
+from etl_project.serving.formats import (
+    detect_input_format,
+    encode_predictions,
+    negotiate_output_format,
+    read_table,
+    table_to_frame,
+)
+from etl_project.pipeline.training_jobs import TrainingJobManager
 from etl_project.exception.exception import ETLPipelineException
 from etl_project.logging.logger import logging
-from etl_project.constants.training_pipeline import DATA_INGESTION_COLLECTION_NAME, DATA_INGESTION_DATABASE_NAME
-from dotenv import load_dotenv
-import certifi
-import pymongo
+from etl_project.constants.serving import (
+    LIVE_BATCH_MAX_ROWS,
+    PREDICTION_OUTPUT_MEDIA_TYPES,
+    SERVING_HOST,
+    SERVING_MAX_BODY_BYTES,
+    SERVING_PORT,
+    SERVING_WORKERS,
+    STREAMING_CHUNK_ROWS,
+    STREAMING_MEDIA_TYPES,
+    UPLOAD_CHECKSUM_HEADER,
+)
+
+model_registry = ModelRegistry()
+inference_executor = InferenceExecutor(model_registry)
+micro_batcher = MicroBatcher(inference_executor)
+prediction_cache = PredictionCache()
+prediction_results = PredictionResultStore()
+json_record_scorer = JsonRecordScorer()
+admission_controller = AdmissionController()
+
+_PREDICT_ROWS_SCORED  = ROWS_SCORED_TOTAL.labels("/predict")
+_PREDICT_REQUEST_ROWS = REQUEST_ROWS.labels("/predict")
+_JSON_ROWS_SCORED     = ROWS_SCORED_TOTAL.labels("/predict/json")
+REGISTRY.register(CallbackMetric("etl_prediction_cache_hits_total", "Rows served from the prediction cache",
+                                 "counter", lambda: prediction_cache.stats()["hits"]))
+REGISTRY.register(CallbackMetric("etl_prediction_cache_misses_total", "Rows scored because they were not cached",
+                                 "counter", lambda: prediction_cache.stats()["misses"]))
+REGISTRY.register(CallbackMetric("etl_prediction_cache_entries", "Rows held in the prediction cache",
+                                 "gauge", lambda: prediction_cache.stats()["entries"]))
+training_jobs = TrainingJobManager(on_success=lambda: model_registry.refresh(force=True))
+
+
+async def score_upload_block(df: pd.DataFrame):
+    loaded_model = await run_in_threadpool(model_registry.get)
+    if loaded_model is None:
+        raise ValueError("Trained model not found. Please train the model first.")
+    async with admission_controller.admit(len(df), "/uploads", wait=True):
+        return await prediction_cache.predict(df, loaded_model.version, inference_executor.predict)
+
+chunked_uploads = ChunkedUploadStore(score_upload_block, prediction_results)
 
-ca = certifi.where()
-load_dotenv()
+# Sized for a whole live batch, which can hold up to LIVE_BATCH_MAX_ROWS records
+live_record_scorer = JsonRecordScorer(json_record_scorer.feature_columns, max_records=LIVE_BATCH_MAX_ROWS)
+live_messages = live_message_adapter(live_record_scorer)
 
-MONGO_DB_URI = os.getenv("MONGO_DB_URI")
 
-client = pymongo.MongoClient(MONGO_DB_URI, tlsCAFile=ca)
-database = client[DATA_INGESTION_DATABASE_NAME]
-collection = database[DATA_INGESTION_COLLECTION_NAME]
+async def score_live_records(records: list):
+    loaded_model = await run_in_threadpool(model_registry.get)
+    if loaded_model is None:
+        raise ValueError("Trained model not found. Please train the model first.")
+    async with admission_controller.admit(len(records), LIVE_ROUTE, wait=True):
+        y_pred = await run_in_threadpool(live_record_scorer.score, loaded_model.model, records)
+    return y_pred, loaded_model.version
 
-app = FastAPI()
+live_batcher = LivePredictionBatcher(score_live_records)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(inference_executor.start)
+    yield
+    await chunked_uploads.shutdown()
+    await prediction_results.drain()
+    inference_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 origins = ["*"]
 
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -45,76 +140,127 @@ app.mount("/static", StaticFiles(directory="templates"), name="static")
 async def index():
     return FileResponse("templates/index.html")
 
+@app.post("/train")
 @app.get("/train")
 async def train_route():
     try:
-        train_pipeline=TrainingPipeline()
-        train_pipeline.run_pipeline()
-        return Response("Training is successful")
+        job = await run_in_threadpool(training_jobs.submit)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "status": job["status"],
+                "message": "Training job already in progress" if job["deduplicated"] else "Training job submitted",
+                "job_id": job["job_id"],
+                "status_url": f"/train/{job['job_id']}",
+            },
+        )
     except Exception as e:
         raise ETLPipelineException(e,sys)
+
+@app.get("/train/{job_id}")
+async def train_status_route(job_id: str):
+    job = await run_in_threadpool(training_jobs.get, job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"status": "error", "message": f"Training job {job_id} not found"}
+        )
+    return JSONResponse(content=job)
     
+def read_prediction_input(data: bytes, input_format: str) -> pd.DataFrame:
+    if input_format == "csv":
+        return pd.read_csv(io.BytesIO(data))
+    return table_to_frame(read_table(data, input_format))
+
+
 @app.post("/predict")
-async def predict_route(file: UploadFile = File(...)):
+async def predict_route(request: Request, file: UploadFile = File(None)):
+    """
+    Scores a CSV, Arrow IPC or Parquet upload, sent as a multipart "file"
+    field or as the raw request body with a matching content type. The
+    upload may be gzip or zstd compressed, declared with Content-Encoding or
+    a .gz/.zst file extension.
+
+    The response format follows the Accept header: JSON records by default,
+    or the prediction column alone as an Arrow IPC stream or Parquet file.
+    """
+    timings = request_timings(request)
     try:
-        logging.info(f"Received file: {file.filename}")
-        
-        # Check if file is CSV
-        if not file.filename.endswith('.csv'):
+        try:
+            content_encoding = request_encoding(request.headers.get("content-encoding"))
+        except UnsupportedEncoding as encoding_error:
+            return JSONResponse({"status": "error", "message": str(encoding_error)}, status_code=415)
+
+        if file is not None:
+            filename, content_encoding = split_compressed_filename(file.filename)
+            input_format = detect_input_format(file.content_type, filename)
+        else:
+            input_format = detect_input_format(request.headers.get("content-type"))
+
+        output_format = negotiate_output_format(request.headers.get("accept"))
+        if output_format is None:
+            return JSONResponse({
+                "status": "error",
+                "message": f"Unsupported Accept header. Use one of {list(PREDICTION_OUTPUT_MEDIA_TYPES.values())}"
+            }, status_code=406)
+
+        # Check if the upload is in a supported format
+        if input_format is None:
             return JSONResponse({
                 "status": "error",
-                "message": "Please upload a CSV file"
+                "message": "Please upload a CSV, Arrow or Parquet file"
             }, status_code=400)
         
-        # Check if model files exist
-        if not os.path.exists("final_model/preprocessor.pkl"):
+        # Get the current model from the registry
+        try:
+            with timings("model_load"):
+                loaded_model = await run_in_threadpool(model_registry.get)
+        except Exception as model_error:
+            logging.error(f"Error loading models: {str(model_error)}")
             return JSONResponse({
                 "status": "error",
-                "message": "Preprocessor model not found. Please train the model first."
-            }, status_code=404)
-            
-        if not os.path.exists("final_model/model.pkl"):
+                "message": f"Error loading models: {str(model_error)}"
+            }, status_code=500)
+
+        if loaded_model is None:
             return JSONResponse({
                 "status": "error",
                 "message": "Trained model not found. Please train the model first."
             }, status_code=404)
         
-        # Read and validate CSV file
+        # Read and validate the upload
         try:
-            df = pd.read_csv(file.file)
-            logging.info(f"CSV loaded successfully. Shape: {df.shape}")
-            logging.info(f"Columns: {list(df.columns)}")
-        except Exception as csv_error:
-            logging.error(f"Error reading CSV: {str(csv_error)}")
+            with timings("read"):
+                data = await file.read() if file is not None else await request.body()
+            with timings("decompress"):
+                data = await decompress_body(data, content_encoding, SERVING_MAX_BODY_BYTES)
+            with timings("parse"):
+                df = await run_in_threadpool(read_prediction_input, data, input_format)
+        except DecompressedBodyTooLarge as size_error:
+            return JSONResponse({"status": "error", "message": str(size_error)}, status_code=413)
+        except Exception as read_error:
+            logging.error(f"Error reading {input_format} input: {str(read_error)}")
             return JSONResponse({
                 "status": "error",
-                "message": f"Error reading CSV file: {str(csv_error)}"
+                "message": f"Error reading {input_format} file: {str(read_error)}"
             }, status_code=400)
         
         # Check if dataframe is empty
         if df.empty:
             return JSONResponse({
                 "status": "error",
-                "message": "The uploaded CSV file is empty"
+                "message": f"The uploaded {input_format} file is empty"
             }, status_code=400)
         
-        # Load models
-        try:
-            preprocessor = load_object("final_model/preprocessor.pkl")
-            final_model = load_object("final_model/model.pkl")
-            logging.info("Models loaded successfully")
-        except Exception as model_error:
-            logging.error(f"Error loading models: {str(model_error)}")
-            return JSONResponse({
-                "status": "error",
-                "message": f"Error loading models: {str(model_error)}"
-            }, status_code=500)
-        
-        # Create ETL model and make predictions
+        # Make predictions, if the rows fit within the pending inference capacity
         try:
-            network_model = ETLModel(preprocessor=preprocessor, model=final_model)
-            y_pred = network_model.predict(df)
-            logging.info(f"Predictions made successfully. Predictions shape: {len(y_pred)}")
+            async with admission_controller.admit(len(df), "/predict"):
+                with timings("predict"):
+                    y_pred = await prediction_cache.predict(df, loaded_model.version, micro_batcher.predict)
+            _PREDICT_ROWS_SCORED.inc(len(df))
+            _PREDICT_REQUEST_ROWS.set(len(df))
+        except AdmissionRejected as rejected:
+            return rejected_response(str(rejected), retry_after=rejected.retry_after)
         except Exception as pred_error:
             logging.error(f"Error making predictions: {str(pred_error)}")
             return JSONResponse({
@@ -122,17 +268,29 @@ async def predict_route(file: UploadFile = File(...)):
                 "message": f"Error making predictions: {str(pred_error)}"
             }, status_code=500)
         
-        # Add predictions to dataframe
+        # Add predictions to dataframe and store the result in the background
         df['predicted_column'] = y_pred
-        
-        # Create prediction_output directory if it doesn't exist
-        os.makedirs('prediction_output', exist_ok=True)
-        df.to_csv('prediction_output/output.csv', index=False)
+        result_id = prediction_results.save(df)
+
+        if output_format != "json":
+            with timings("encode"):
+                payload = await run_in_threadpool(encode_predictions, y_pred, output_format)
+            return Response(content=memoryview(payload),
+                            media_type=PREDICTION_OUTPUT_MEDIA_TYPES[output_format],
+                            headers={"X-Result-Id": result_id})
         
         # Convert to records for JSON response
         try:
-            predictions_records = df.to_dict('records')
-            logging.info("Data converted to JSON format successfully")
+            with timings("encode"):
+                predictions_records = await run_in_threadpool(df.to_dict, 'records')
+                response = JSONResponse({
+                    "status": "success",
+                    "message": "Prediction completed successfully",
+                    "predictions": predictions_records,
+                    "total_records": len(df),
+                    "result_id": result_id,
+                    "result_url": f"/predictions/{result_id}"
+                })
         except Exception as json_error:
             logging.error(f"Error converting to JSON: {str(json_error)}")
             return JSONResponse({
@@ -141,21 +299,297 @@ async def predict_route(file: UploadFile = File(...)):
             }, status_code=500)
         
         # Return JSON response with prediction results
+        return response
+        
+    except Exception as e:
+        logging.error(f"Unexpected error in predict_route: {str(e)}", exc_info=True)
+        return JSONResponse({
+            "status": "error",
+            "message": f"Unexpected error: {str(e)}"
+        }, status_code=500)
+
+
+@app.post("/predict/json")
+async def predict_json_route(request: Request):
+    """
+    Scores a single feature record, or a small list of them, posted as JSON
+    with schema column names as keys. Missing or null features are imputed.
+    """
+    timings = request_timings(request)
+    try:
+        with timings("model_load"):
+            loaded_model = await run_in_threadpool(model_registry.get)
+        if loaded_model is None:
+            return JSONResponse({
+                "status": "error",
+                "message": "Trained model not found. Please train the model first."
+            }, status_code=404)
+
+        try:
+            body = await decompress_body(await request.body(),
+                                         request_encoding(request.headers.get("content-encoding")),
+                                         SERVING_MAX_BODY_BYTES)
+        except UnsupportedEncoding as encoding_error:
+            return JSONResponse({"status": "error", "message": str(encoding_error)}, status_code=415)
+        except DecompressedBodyTooLarge as size_error:
+            return JSONResponse({"status": "error", "message": str(size_error)}, status_code=413)
+        try:
+            with timings("parse"):
+                records = json_record_scorer.parse(body)
+        except ValidationError as validation_error:
+            return JSONResponse({
+                "status": "error",
+                "message": "Invalid feature records",
+                "errors": json.loads(validation_error.json(include_url=False))
+            }, status_code=422)
+
+        try:
+            async with admission_controller.admit(len(records), "/predict/json"):
+                with timings("predict"):
+                    y_pred = await run_in_threadpool(json_record_scorer.score, loaded_model.model, records)
+        except AdmissionRejected as rejected:
+            return rejected_response(str(rejected), retry_after=rejected.retry_after)
+        _JSON_ROWS_SCORED.inc(len(records))
         return JSONResponse({
             "status": "success",
-            "message": "Prediction completed successfully",
-            "predictions": predictions_records,
-            "total_records": len(df)
+            "predictions": y_pred.tolist(),
+            "total_records": len(records),
+            "model_version": loaded_model.version
         })
-        
+
     except Exception as e:
-        logging.error(f"Unexpected error in predict_route: {str(e)}", exc_info=True)
+        logging.error(f"Unexpected error in predict_json_route: {str(e)}", exc_info=True)
         return JSONResponse({
             "status": "error",
             "message": f"Unexpected error: {str(e)}"
         }, status_code=500)
 
 
+@app.get("/predictions/{result_id}")
+async def prediction_result_route(result_id: str, output: str = "parquet"):
+    """
+    Returns a stored prediction result as the Parquet file, or streams it
+    as CSV or NDJSON.
+    """
+    if output != "parquet" and output not in STREAMING_MEDIA_TYPES:
+        return JSONResponse({
+            "status": "error",
+            "message": f"Unsupported output format: {output}. Use one of {['parquet', *STREAMING_MEDIA_TYPES]}"
+        }, status_code=400)
+
+    file_path = prediction_results.result_file_path(result_id)
+    if file_path is not None:
+        await prediction_results.wait(result_id)
+    if file_path is None or not os.path.exists(file_path):
+        return JSONResponse({
+            "status": "error",
+            "message": f"Prediction result {result_id} not found"
+        }, status_code=404)
+
+    if output == "parquet":
+        return FileResponse(file_path, media_type=PREDICTION_OUTPUT_MEDIA_TYPES["parquet"],
+                            filename=os.path.basename(file_path))
+    return StreamingResponse(prediction_results.iter_encoded(result_id, output),
+                             media_type=STREAMING_MEDIA_TYPES[output])
+
+
+@app.post("/uploads")
+async def create_upload_route(request: Request):
+    """
+    Starts a resumable chunked upload of a large CSV file, declared by its
+    file name and size in bytes. The response gives the upload id and the
+    chunk size to send.
+    """
+    try:
+        upload_request = UploadRequest.model_validate_json(await request.body())
+    except ValidationError as validation_error:
+        return JSONResponse({
+            "status": "error",
+            "message": "Invalid upload request",
+            "errors": json.loads(validation_error.json(include_url=False))
+        }, status_code=422)
+
+    try:
+        upload = await chunked_uploads.create(upload_request.filename, upload_request.size)
+    except UploadError as upload_error:
+        return JSONResponse({"status": "error", "message": str(upload_error)}, status_code=upload_error.status_code)
+    return JSONResponse({
+        **upload,
+        "upload_url": f"/uploads/{upload['upload_id']}",
+        "result_url": f"/predictions/{upload['upload_id']}",
+    }, status_code=201)
+
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk_route(upload_id: str, offset: int, request: Request):
+    """
+    Appends the request body to an upload at ``offset``, which must be the
+    upload's committed offset. The chunk is checked against the SHA-256 in
+    the X-Chunk-Sha256 header when it is sent. A 409 carries the committed
+    offset to resume from.
+    """
+    try:
+        upload = await chunked_uploads.append(upload_id, offset, await request.body(),
+                                              request.headers.get(UPLOAD_CHECKSUM_HEADER))
+    except UploadError as upload_error:
+        return JSONResponse({"status": "error", "message": str(upload_error), "offset": upload_error.offset},
+                            status_code=upload_error.status_code)
+    return JSONResponse(upload)
+
+
+@app.get("/uploads/{upload_id}")
+async def upload_status_route(upload_id: str):
+    """
+    Returns an upload's committed offset, which a client resumes from, and
+    its scoring progress: "receiving", "scoring", "complete" or "failed".
+    """
+    upload = await chunked_uploads.status(upload_id)
+    if upload is None:
+        return JSONResponse({
+            "status": "error",
+            "message": f"Upload {upload_id} not found"
+        }, status_code=404)
+    return JSONResponse(upload)
+
+
+@app.get("/uploads/{upload_id}/result")
+async def upload_result_route(upload_id: str, output: str = "parquet"):
+    """
+    Redirects to the stored prediction result of a completed upload.
+    """
+    upload = await chunked_uploads.status(upload_id)
+    if upload is None or upload["status"] != "complete":
+        return JSONResponse({
+            "status": "error",
+            "message": f"Upload {upload_id} is {upload['status'] if upload else 'not found'}"
+        }, status_code=404 if upload is None else 409)
+    return RedirectResponse(f"{upload['result_url']}?output={output}", status_code=303)
+
+
+@app.websocket(LIVE_ROUTE)
+async def live_predict_route(websocket: WebSocket):
+    """
+    Live predictions over one long-lived connection. Each message is a
+    feature update, {"id": ..., "records": <a feature record or a list of
+    them>}, answered with {"id": ..., "predictions": [...]} as soon as it
+    is scored. Updates from all connections are scored in shared batches.
+    """
+    await websocket.accept()
+    loaded_model = await run_in_threadpool(model_registry.get)
+    if loaded_model is None:
+        await websocket.send_json({
+            "status": "error",
+            "message": "Trained model not found. Please train the model first."
+        })
+        await websocket.close(code=1013)
+        return
+    await LivePredictionConnection(websocket, live_batcher, live_messages).run()
+
+
+@app.get("/metrics")
+async def metrics_route():
+    """
+    Serving metrics in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/predict/cache")
+async def prediction_cache_route():
+    """
+    Hit rate and occupancy of the row-level prediction cache.
+    """
+    return JSONResponse(prediction_cache.stats())
+
+
+@app.post("/predict/stream")
+async def predict_stream_route(request: Request, output: str = "ndjson"):
+    """
+    Scores a CSV upload in chunks of rows and streams each scored chunk back
+    as NDJSON or CSV as soon as it is ready.
+
+    The CSV can be sent as the raw request body (text/csv), which is scored
+    while it is still being received, or as a multipart "file" field. A gzip
+    or zstd compressed CSV is decompressed as it streams in, up to
+    SERVING_MAX_BODY_BYTES of CSV.
+    """
+    try:
+        if output not in STREAMING_MEDIA_TYPES:
+            return JSONResponse({
+                "status": "error",
+                "message": f"Unsupported output format: {output}. Use one of {list(STREAMING_MEDIA_TYPES)}"
+            }, status_code=400)
+
+        try:
+            loaded_model = await run_in_threadpool(model_registry.get)
+        except Exception as model_error:
+            logging.error(f"Error loading models: {str(model_error)}")
+            return JSONResponse({
+                "status": "error",
+                "message": f"Error loading models: {str(model_error)}"
+            }, status_code=500)
+
+        if loaded_model is None:
+            return JSONResponse({
+                "status": "error",
+                "message": "Trained model not found. Please train the model first."
+            }, status_code=404)
+
+        try:
+            content_encoding = request_encoding(request.headers.get("content-encoding"))
+        except UnsupportedEncoding as encoding_error:
+            return JSONResponse({"status": "error", "message": str(encoding_error)}, status_code=415)
+
+        background = None
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                await form.close()
+                return JSONResponse({
+                    "status": "error",
+                    "message": "Please upload a CSV file in the 'file' field"
+                }, status_code=400)
+            byte_chunks = iter_upload_chunks(upload)
+            content_encoding = split_compressed_filename(upload.filename)[1]
+            # The form owns the spooled upload, close it once streaming is done
+            background = BackgroundTask(form.close)
+        else:
+            byte_chunks = request.stream()
+
+        async def predict_block(df: pd.DataFrame):
+            # Waiting for capacity pauses reading the body, which pushes back on the client
+            async with admission_controller.admit(len(df), "/predict/stream", wait=True):
+                return await prediction_cache.predict(df, loaded_model.version, inference_executor.predict)
+
+        # Scoring the first block before the response starts lets a body that
+        # inflates past the limit early, i.e. a decompression bomb, get a 413
+        try:
+            scored_blocks = await prime(stream_scored_csv(
+                iter_decompressed(byte_chunks, content_encoding, SERVING_MAX_BODY_BYTES),
+                predict_block, output, STREAMING_CHUNK_ROWS))
+        except DecompressedBodyTooLarge as size_error:
+            if background is not None:
+                await background()
+            return JSONResponse({"status": "error", "message": str(size_error)}, status_code=413)
+
+        return BodyStreamingResponse(
+            scored_blocks,
+            media_type=STREAMING_MEDIA_TYPES[output],
+            background=background
+        )
+
+    except Exception as e:
+        logging.error(f"Unexpected error in predict_stream_route: {str(e)}", exc_info=True)
+        return JSONResponse({
+            "status": "error",
+            "message": f"Unexpected error: {str(e)}"
+        }, status_code=500)
+
 
 if __name__=="__main__":
-    app_run(app, host="0.0.0.0", port=8000)
+    if SERVING_WORKERS > 1:
+        PreforkServer(app, model_registry, inference_executor,
+                      host=SERVING_HOST, port=SERVING_PORT, workers=SERVING_WORKERS).run()
+    else:
+        app_run(app, host=SERVING_HOST, port=SERVING_PORT)
@@ -0,0 +1,134 @@
+"""
+Time spent in each training pipeline stage when stages hand artifacts on
+through files ("disk") and in memory with background writes ("memory").
+
+The stages run in a temporary directory on --rows rows of the schema's
+columns (values in {-1, 0, 1}, as in the phishing data), starting from
+the ingested DataFrame, so Mongo isn't needed:
+
+  data_ingestion       train/test split written to the feature store
+  data_validation      drift check, valid datasets written
+  data_transformation  imputer fitted, transformed arrays written
+  model_trainer load   the trainer loading the arrays and preprocessor
+  persist_artifacts    memory mode: waiting for the background writes
+
+Both modes leave the same artifacts on disk, which is checked.
+
+Usage:
+    python -m benchmarks.artifact_handoff_benchmark --rows 1000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl_project.components.data_ingestion import DataIngestion
+from etl_project.components.data_transformation import DataTransformation
+from etl_project.components.data_validation import DataValidation
+from etl_project.components.model_trainer import ModelTrainer
+from etl_project.entity.artifact_entity import DataIngestionArtifact
+from etl_project.entity.config_entity import (
+    DataIngestionConfig,
+    DataTransformationConfig,
+    DataValidationConfig,
+    FeatureStoreConfig,
+    ModelTrainerConfig,
+    TrainingPipelineConfig,
+)
+from etl_project.utils.main_utils.artifact_handoff import ArtifactHandoff
+from etl_project.utils.main_utils.feature_store import FeatureStore
+from etl_project.utils.main_utils.utils import load_numpy_array_data, load_object
+
+
+def run_stages(df: pd.DataFrame, handoff: ArtifactHandoff) -> tuple:
+    timings = {}
+    training_pipeline_config = TrainingPipelineConfig()
+
+    def timed(stage: str, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    data_ingestion_config = DataIngestionConfig(training_pipeline_config)
+    data_ingestion = DataIngestion(data_ingestion_config, artifact_handoff=handoff)
+    timed("data_ingestion", lambda: data_ingestion.split_data_as_train_test_set(df))
+    data_ingestion_artifact = DataIngestionArtifact(data_ingestion_config.training_file_path,
+                                                    data_ingestion_config.test_file_path)
+
+    data_validation = DataValidation(data_ingestion_artifact, DataValidationConfig(training_pipeline_config),
+                                     artifact_handoff=handoff)
+    data_validation_artifact = timed("data_validation", data_validation.initiate_data_validation)
+
+    data_transformation = DataTransformation(data_validation_artifact,
+                                             DataTransformationConfig(training_pipeline_config),
+                                             artifact_handoff=handoff)
+    data_transformation_artifact = timed("data_transformation", data_transformation.initiate_data_transformation)
+
+    model_trainer = ModelTrainer(ModelTrainerConfig(training_pipeline_config), data_transformation_artifact,
+                                 artifact_handoff=handoff)
+    timed("model_trainer load", lambda: (
+        model_trainer._load_artifact(data_transformation_artifact.transformed_train_file_path, load_numpy_array_data),
+        model_trainer._load_artifact(data_transformation_artifact.transformed_test_file_path, load_numpy_array_data),
+        model_trainer._load_artifact(data_transformation_artifact.transformed_object_file_path, load_object),
+    ))
+    if handoff is not None:
+        timed("persist_artifacts", handoff.wait)
+        handoff.close()
+    return timings, data_validation_artifact, data_transformation_artifact
+
+
+def read_artifacts(data_validation_artifact, data_transformation_artifact) -> list:
+    feature_store = FeatureStore(FeatureStoreConfig())
+    return [
+        feature_store.read_pandas(data_validation_artifact.valid_train_file_path),
+        feature_store.read_pandas(data_validation_artifact.valid_test_file_path),
+        np.load(data_transformation_artifact.transformed_train_file_path),
+        np.load(data_transformation_artifact.transformed_test_file_path),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    package_dir = os.getcwd()
+    columns = list(FeatureStore(FeatureStoreConfig()).column_types)
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.integers(-1, 2, size=(args.rows, len(columns))), columns=columns)
+
+    results, artifacts = {}, {}
+    for mode in ("disk", "memory"):
+        work_dir = tempfile.mkdtemp()
+        os.symlink(os.path.join(package_dir, "data_schema"), os.path.join(work_dir, "data_schema"))
+        os.chdir(work_dir)
+        try:
+            # train_test_split draws from NumPy's global generator, so both modes split alike
+            np.random.seed(0)
+            results[mode], *stage_artifacts = run_stages(df, ArtifactHandoff() if mode == "memory" else None)
+            artifacts[mode] = read_artifacts(*stage_artifacts)
+        finally:
+            os.chdir(package_dir)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    for disk_artifact, memory_artifact in zip(artifacts["disk"], artifacts["memory"]):
+        if isinstance(disk_artifact, pd.DataFrame):
+            pd.testing.assert_frame_equal(disk_artifact, memory_artifact)
+        else:
+            np.testing.assert_array_equal(disk_artifact, memory_artifact)
+    print(f"{args.rows:,} rows x {len(columns)} columns")
+    print(f"{'stage':<22}{'disk s':>9}{'memory s':>10}")
+    for stage in ("data_ingestion", "data_validation", "data_transformation", "model_trainer load",
+                  "persist_artifacts"):
+        disk, memory = results["disk"].get(stage), results["memory"].get(stage)
+        print(f"{stage:<22}{'' if disk is None else f'{disk:.2f}':>9}{memory:>10.2f}")
+    print(f"{'total':<22}{sum(results['disk'].values()):>9.2f}{sum(results['memory'].values()):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+End-to-end cost of a /predict round trip with CSV+JSON versus Arrow IPC.
+
+Each round trip runs every step the client and the server perform, except
+the socket transfer: the client encodes the features, the server decodes
+them, scores them and encodes the response the way /predict does, and the
+client decodes the predictions. Payload sizes are reported so transfer
+time can be estimated for a given link.
+
+Usage:
+    python -m benchmarks.columnar_predict_benchmark --rows 10000 50000 200000
+"""
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi.responses import JSONResponse
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+from etl_project.serving.formats import encode_predictions, read_table, table_to_frame
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+from etl_project.utils.ml_utils.preprocessing.imputer import IndexedKNNImputer
+
+N_FEATURES = 30
+COLUMNS = [f"feature_{i}" for i in range(N_FEATURES)]
+
+
+def build_model(rng: np.random.Generator) -> ETLModel:
+    X = pd.DataFrame(rng.integers(-1, 2, size=(10_000, N_FEATURES)).astype(float), columns=COLUMNS)
+    y = (X.iloc[:, 0] + X.iloc[:, 1] > 0).astype(int)
+    preprocessor = Pipeline([("imputer", IndexedKNNImputer(n_neighbors=3))]).fit(X)
+    model = DecisionTreeClassifier(max_depth=8).fit(preprocessor.transform(X), y)
+    return ETLModel(preprocessor=preprocessor, model=model)
+
+
+def csv_json_round_trip(features: pd.DataFrame, model: ETLModel) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    request_body = features.to_csv(index=False).encode()
+    timings["client encode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = pd.read_csv(io.BytesIO(request_body))
+    timings["server decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df["predicted_column"] = model.predict(df)
+    timings["predict"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response_body = JSONResponse({"status": "success", "predictions": df.to_dict("records"),
+                                  "total_records": len(df)}).body
+    timings["server encode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = np.array([row["predicted_column"] for row in json.loads(response_body)["predictions"]])
+    timings["client decode"] = time.perf_counter() - start
+    return {"timings": timings, "request": len(request_body), "response": len(response_body),
+            "predictions": predictions}
+
+
+def arrow_round_trip(features: pd.DataFrame, model: ETLModel) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    table = pa.Table.from_pandas(features, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    request_body = sink.getvalue().to_pybytes()
+    timings["client encode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = table_to_frame(read_table(request_body, "arrow"))
+    timings["server decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(df)
+    timings["predict"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response_body = encode_predictions(y_pred, "arrow")
+    timings["server encode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = pa.ipc.open_stream(response_body).read_all().column(0).to_numpy()
+    timings["client decode"] = time.perf_counter() - start
+    return {"timings": timings, "request": len(request_body), "response": response_body.size,
+            "predictions": predictions}
+
+
+def best_of(round_trip, features, model, repeats: int) -> dict:
+    runs = [round_trip(features, model) for _ in range(repeats)]
+    return min(runs, key=lambda run: sum(run["timings"].values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    model = build_model(rng)
+
+    for n_rows in args.rows:
+        features = pd.DataFrame(rng.integers(-1, 2, size=(n_rows, N_FEATURES)), columns=COLUMNS)
+        csv_json = best_of(csv_json_round_trip, features, model, args.repeats)
+        arrow    = best_of(arrow_round_trip, features, model, args.repeats)
+        assert np.array_equal(csv_json["predictions"], arrow["predictions"])
+
+        print(f"\n{n_rows:,} rows x {N_FEATURES} features")
+        print(f"{'step':<16}{'CSV+JSON ms':>14}{'Arrow ms':>12}")
+        for step in csv_json["timings"]:
+            print(f"{step:<16}{csv_json['timings'][step] * 1000:>14,.1f}{arrow['timings'][step] * 1000:>12,.1f}")
+        csv_total = sum(csv_json["timings"].values()) * 1000
+        arrow_total = sum(arrow["timings"].values()) * 1000
+        print(f"{'total':<16}{csv_total:>14,.1f}{arrow_total:>12,.1f}   ({csv_total / arrow_total:,.1f}x)")
+        print(f"{'request bytes':<16}{csv_json['request']:>14,}{arrow['request']:>12,}")
+        print(f"{'response bytes':<16}{csv_json['response']:>14,}{arrow['response']:>12,}")
+
+
+if __name__ == "__main__":
+    main()
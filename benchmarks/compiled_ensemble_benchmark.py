@@ -0,0 +1,101 @@
+"""
+Inference throughput and artifact size of compiled tree ensembles.
+
+Fits the ensembles ModelTrainer chooses between on a synthetic dataset
+shaped like the training data (30 features in {-1, 0, 1}), compiles each
+with CompiledTreeEnsemble and compares, per batch size, the rows/s of
+sklearn's predict, the compiled ensemble and ETLModel (which picks between
+them by batch size). Also reports the size and load time of the pickle
+and of the compiled .npz.
+
+Usage:
+    python -m benchmarks.compiled_ensemble_benchmark --batch-sizes 1 16 128 1024 10000
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.tree import DecisionTreeClassifier
+
+from etl_project.utils.ml_utils.model.compiled_ensemble import CompiledTreeEnsemble
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+
+N_FEATURES = 30
+
+
+def rows_per_second(fn, X: np.ndarray, min_seconds: float = 0.3) -> float:
+    fn(X)
+    calls, started_at = 0, time.perf_counter()
+    while True:
+        fn(X)
+        calls += 1
+        elapsed = time.perf_counter() - started_at
+        if elapsed >= min_seconds:
+            return calls * X.shape[0] / elapsed
+
+
+def load_seconds(load, repeats: int = 3) -> float:
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        load()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 128, 1024, 10000])
+    parser.add_argument("--train-rows", type=int, default=11_000)
+    parser.add_argument("--n-estimators", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    X = rng.integers(-1, 2, size=(args.train_rows, N_FEATURES)).astype(float)
+    y = (X[:, 0] + X[:, 1] - X[:, 2] + rng.normal(0, 1, len(X)) > 0).astype(float)
+    X_eval = rng.integers(-1, 2, size=(max(args.batch_sizes), N_FEATURES)).astype(float)
+
+    models = {
+        "Decision Tree": DecisionTreeClassifier(random_state=0),
+        "Random Forest": RandomForestClassifier(n_estimators=args.n_estimators, random_state=0),
+        "Gradient Boosting": GradientBoostingClassifier(n_estimators=args.n_estimators, random_state=0),
+    }
+    identity = FunctionTransformer()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, estimator in models.items():
+            estimator.fit(X, y)
+            compiled = CompiledTreeEnsemble.from_estimator(estimator, X_eval)
+            assert compiled is not None, f"{name} did not compile"
+            assert np.array_equal(compiled.predict_proba(X_eval), estimator.predict_proba(X_eval))
+            etl_model = ETLModel(preprocessor=identity, model=estimator, compiled_model=compiled)
+
+            pickle_path = os.path.join(tmp_dir, "model.pkl")
+            npz_path = os.path.join(tmp_dir, "model.npz")
+            with open(pickle_path, "wb") as file:
+                pickle.dump(estimator, file)
+            compiled.save(npz_path)
+
+            def load_pickle():
+                with open(pickle_path, "rb") as file:
+                    return pickle.load(file)
+
+            print(f"\n{name}: pickle {os.path.getsize(pickle_path) / 2**20:,.2f} MiB, "
+                  f"loads in {load_seconds(load_pickle) * 1000:,.1f} ms; "
+                  f"npz {os.path.getsize(npz_path) / 2**20:,.2f} MiB, "
+                  f"loads in {load_seconds(lambda: CompiledTreeEnsemble.load(npz_path)) * 1000:,.1f} ms")
+            print(f"{'batch rows':>10}{'sklearn rows/s':>18}{'compiled rows/s':>18}{'ETLModel rows/s':>18}")
+            for batch_rows in args.batch_sizes:
+                batch = X_eval[:batch_rows]
+                print(f"{batch_rows:>10,}"
+                      f"{rows_per_second(estimator.predict, batch):>18,.0f}"
+                      f"{rows_per_second(compiled.predict, batch):>18,.0f}"
+                      f"{rows_per_second(etl_model.predict_array, batch):>18,.0f}")
+
+
+if __name__ == "__main__":
+    main()
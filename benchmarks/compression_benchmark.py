@@ -0,0 +1,115 @@
+"""
+Bytes on the wire and end-to-end time of a /predict round trip with
+uncompressed, gzip and zstd transport.
+
+Each round trip runs every step the client and the server perform except
+the socket transfer: the client compresses the CSV, the server decompresses
+and parses it, scores it, encodes the JSON response and compresses it the
+way CompressionMiddleware does, and the client decompresses and decodes it.
+The transfer time of the request and response bytes is then added for each
+link speed. The features are uniformly random in {-1, 0, 1}, which
+compresses worse than real feature files.
+
+Usage:
+    python -m benchmarks.compression_benchmark --rows 100000 --link-mbps 10 100 1000
+"""
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+from etl_project.serving.compression import StreamDecompressor, _Compressor, decompress
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+from etl_project.utils.ml_utils.preprocessing.imputer import IndexedKNNImputer
+
+N_FEATURES = 30
+COLUMNS = [f"feature_{i}" for i in range(N_FEATURES)]
+ENCODINGS = ("identity", "gzip", "zstd")
+
+
+def build_model(rng: np.random.Generator) -> ETLModel:
+    X = pd.DataFrame(rng.integers(-1, 2, size=(10_000, N_FEATURES)).astype(float), columns=COLUMNS)
+    y = (X.iloc[:, 0] + X.iloc[:, 1] > 0).astype(int)
+    preprocessor = Pipeline([("imputer", IndexedKNNImputer(n_neighbors=3))]).fit(X)
+    model = DecisionTreeClassifier(max_depth=8).fit(preprocessor.transform(X), y)
+    return ETLModel(preprocessor=preprocessor, model=model)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    return data if encoding == "identity" else _Compressor(encoding).compress(data, True)
+
+
+def round_trip(features: pd.DataFrame, model: ETLModel, encoding: str) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    request_body = compress(features.to_csv(index=False).encode(), encoding)
+    timings["client encode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = pd.read_csv(io.BytesIO(decompress(request_body)))
+    timings["server decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df["predicted_column"] = model.predict(df)
+    timings["predict"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response_body = compress(JSONResponse({"status": "success", "predictions": df.to_dict("records"),
+                                           "total_records": len(df)}).body, encoding)
+    timings["server encode"] = time.perf_counter() - start
+    response_bytes = len(response_body)
+
+    start = time.perf_counter()
+    if encoding != "identity":
+        decompressor = StreamDecompressor(encoding)
+        response_body = b"".join(decompressor.decompress(response_body))
+        decompressor.finish()
+    predictions = np.array([row["predicted_column"] for row in json.loads(response_body)["predictions"]])
+    timings["client decode"] = time.perf_counter() - start
+    return {"timings": timings, "request": len(request_body),
+            "response": response_bytes, "predictions": predictions}
+
+
+def best_of(features: pd.DataFrame, model: ETLModel, encoding: str, repeats: int) -> dict:
+    runs = [round_trip(features, model, encoding) for _ in range(repeats)]
+    return min(runs, key=lambda run: sum(run["timings"].values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--link-mbps", type=float, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    model = build_model(rng)
+
+    for n_rows in args.rows:
+        features = pd.DataFrame(rng.integers(-1, 2, size=(n_rows, N_FEATURES)), columns=COLUMNS)
+        runs = {encoding: best_of(features, model, encoding, args.repeats) for encoding in ENCODINGS}
+        for run in runs.values():
+            assert np.array_equal(run["predictions"], runs["identity"]["predictions"])
+
+        print(f"\n{n_rows:,} rows x {N_FEATURES} features")
+        print(f"{'step':<22}" + "".join(f"{encoding + ' ms':>14}" for encoding in ENCODINGS))
+        for step in runs["identity"]["timings"]:
+            print(f"{step:<22}" + "".join(f"{run['timings'][step] * 1000:>14,.1f}" for run in runs.values()))
+        cpu_ms = {encoding: sum(run["timings"].values()) * 1000 for encoding, run in runs.items()}
+        print(f"{'total CPU':<22}" + "".join(f"{cpu_ms[encoding]:>14,.1f}" for encoding in ENCODINGS))
+        print(f"{'request bytes':<22}" + "".join(f"{run['request']:>14,}" for run in runs.values()))
+        print(f"{'response bytes':<22}" + "".join(f"{run['response']:>14,}" for run in runs.values()))
+        for link_mbps in args.link_mbps:
+            totals = [cpu_ms[encoding] + (run["request"] + run["response"]) * 8 / (link_mbps * 1000)
+                      for encoding, run in runs.items()]
+            print(f"{f'end to end {link_mbps:g} Mbit/s':<22}" + "".join(f"{total:>14,.1f}" for total in totals))
+
+
+if __name__ == "__main__":
+    main()
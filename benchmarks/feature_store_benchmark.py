@@ -0,0 +1,105 @@
+"""
+Write time, read time and disk size of a training dataset stored as CSV
+(what data ingestion wrote before) and in the Parquet feature store.
+
+The dataset has --rows rows of the schema's columns, values in {-1, 0, 1}
+as in the phishing data. Each storage is written once and then read three
+ways:
+
+  full        every column and row
+  projection  --columns columns only (CSV: usecols)
+  filter      the rows where --filter-column equals 1 (CSV: read, then mask)
+
+The Parquet feature store is measured unpartitioned and partitioned by
+--filter-column, where the filter skips the other partitions' directories.
+
+Usage:
+    python -m benchmarks.feature_store_benchmark --rows 2000000 --columns 3
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl_project.entity.config_entity import FeatureStoreConfig
+from etl_project.utils.main_utils.feature_store import FeatureStore
+
+
+def directory_bytes(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--columns", type=int, default=3)
+    parser.add_argument("--filter-column", default="SSLfinal_State")
+    args = parser.parse_args()
+
+    store = FeatureStore(FeatureStoreConfig())
+    columns = list(store.column_types)
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.integers(-1, 2, size=(args.rows, len(columns))), columns=columns)
+    projected = columns[:args.columns]
+
+    partitioned_config = FeatureStoreConfig()
+    partitioned_config.partition_columns = [args.filter_column]
+    partitioned_store = FeatureStore(partitioned_config)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        csv_path = os.path.join(work_dir, "train.csv")
+        storages = {
+            "csv": (
+                lambda: df.to_csv(csv_path, index=False, header=True),
+                csv_path,
+                lambda: pd.read_csv(csv_path),
+                lambda: pd.read_csv(csv_path, usecols=projected),
+                lambda: (lambda full: full[full[args.filter_column] == 1])(pd.read_csv(csv_path)),
+            ),
+        }
+        for name, feature_store in (("parquet", store), (f"parquet by {args.filter_column}", partitioned_store)):
+            path = os.path.join(work_dir, name.replace(" ", "_"))
+            storages[name] = (
+                lambda feature_store=feature_store, path=path: feature_store.write(df, path),
+                path,
+                lambda feature_store=feature_store, path=path: feature_store.read_pandas(path),
+                lambda feature_store=feature_store, path=path: feature_store.read_pandas(path, columns=projected),
+                lambda feature_store=feature_store, path=path: feature_store.read_pandas(
+                    path, filters=[(args.filter_column, "==", 1)]),
+            )
+
+        print(f"{args.rows:,} rows x {len(columns)} int64 columns; projection of {args.columns} columns, "
+              f"filter {args.filter_column} == 1")
+        print(f"{'storage':<28}{'write s':>9}{'MB':>9}{'full s':>9}{'project s':>11}{'filter s':>10}")
+        expected_filtered = None
+        for name, (write, path, read_full, read_projection, read_filtered) in storages.items():
+            write_seconds, _ = timed(write)
+            full_seconds, _ = timed(read_full)
+            projection_seconds, _ = timed(read_projection)
+            filter_seconds, filtered = timed(read_filtered)
+            # Partitions come back grouped, so rows are compared in order of their values
+            filtered = filtered.sort_values(columns, ignore_index=True)[columns]
+            if expected_filtered is None:
+                expected_filtered = filtered
+            pd.testing.assert_frame_equal(filtered, expected_filtered, check_dtype=False)
+            print(f"{name:<28}{write_seconds:>9.2f}{directory_bytes(path) / 2**20:>9.1f}{full_seconds:>9.2f}"
+                  f"{projection_seconds:>11.2f}{filter_seconds:>10.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-request latency of scoring one (or a few) feature records.
+
+Compares the server-side work of the CSV upload path (pandas parses the
+CSV, ETLModel.predict on a DataFrame) with the JSON fast path (pydantic
+validates the raw body, rows go into a preallocated buffer,
+ETLModel.predict_array). "model side" is the JSON path without
+validation: filling the buffer, imputation and the model call.
+
+Usage:
+    python -m benchmarks.json_predict_benchmark --records 1 16 --iterations 5000
+"""
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+from etl_project.serving.json_records import JsonRecordScorer, read_feature_columns
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+from etl_project.utils.ml_utils.preprocessing.imputer import IndexedKNNImputer
+
+
+def build_model(columns, rng: np.random.Generator) -> ETLModel:
+    X = pd.DataFrame(rng.integers(-1, 2, size=(10_000, len(columns))).astype(float), columns=columns)
+    y = (X.iloc[:, 0] + X.iloc[:, 1] > 0).astype(int)
+    preprocessor = Pipeline([("imputer", IndexedKNNImputer(n_neighbors=3))]).fit(X)
+    model = DecisionTreeClassifier(max_depth=8).fit(preprocessor.transform(X), y)
+    return ETLModel(preprocessor=preprocessor, model=model)
+
+
+def measure(fn, iterations: int) -> np.ndarray:
+    for _ in range(min(iterations, 200)):
+        fn()
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - start
+    return timings * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    columns = read_feature_columns()
+    model = build_model(columns, rng)
+    scorer = JsonRecordScorer(columns)
+
+    for n_records in args.records:
+        features = pd.DataFrame(rng.integers(-1, 2, size=(n_records, len(columns))), columns=columns)
+        csv_body = features.to_csv(index=False).encode()
+        json_body = json.dumps(features.to_dict("records")).encode()
+        records = scorer.parse(json_body)
+
+        csv_predictions = model.predict(pd.read_csv(io.BytesIO(csv_body)))
+        assert np.array_equal(csv_predictions, scorer.score(model, scorer.parse(json_body)))
+
+        results = {
+            "CSV + DataFrame": measure(lambda: model.predict(pd.read_csv(io.BytesIO(csv_body))), args.iterations),
+            "JSON fast path": measure(lambda: scorer.score(model, scorer.parse(json_body)), args.iterations),
+            "model side": measure(lambda: scorer.score(model, records), args.iterations),
+        }
+
+        print(f"\n{n_records} record(s), {len(columns)} features, {args.iterations:,} iterations")
+        print(f"{'path':<18}{'p50 us':>10}{'p99 us':>10}")
+        for name, timings in results.items():
+            print(f"{name:<18}{np.percentile(timings, 50):>10,.1f}{np.percentile(timings, 99):>10,.1f}")
+
+
+if __name__ == "__main__":
+    main()
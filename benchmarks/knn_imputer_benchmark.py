@@ -0,0 +1,76 @@
+"""
+Serving latency of KNNImputer vs IndexedKNNImputer as the training set grows.
+
+Usage:
+    python -m benchmarks.knn_imputer_benchmark --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.impute import KNNImputer
+
+from etl_project.utils.ml_utils.preprocessing.imputer import IndexedKNNImputer
+
+N_FEATURES = 30
+
+
+def make_training_data(n_rows: int, rng: np.random.Generator) -> np.ndarray:
+    # Same shape and value range as the -1/0/1 encoded feature rows
+    return rng.integers(-1, 2, size=(n_rows, N_FEATURES)).astype(np.float64)
+
+
+def make_request_batch(n_rows: int, missing_ratio: float, rng: np.random.Generator) -> np.ndarray:
+    batch = make_training_data(n_rows, rng)
+    incomplete_rows = np.flatnonzero(rng.random(n_rows) < missing_ratio)
+    # Serving traffic repeats a handful of gaps, e.g. a feed that lacks one column
+    patterns = [[3], [7], [3, 11], [20, 21, 22]]
+    for row in incomplete_rows:
+        batch[row, patterns[row % len(patterns)]] = np.nan
+    return batch
+
+
+def time_transform(imputer, batch: np.ndarray, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        imputer.transform(batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--batch-rows", type=int, default=256)
+    parser.add_argument("--missing-ratio", type=float, default=0.1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-donors", type=int, default=50_000,
+                        help="donor index size of the capped imputer")
+    parser.add_argument("--skip-baseline-above", type=int, default=1_000_000,
+                        help="don't time KNNImputer for training sets larger than this")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    batch = make_request_batch(args.batch_rows, args.missing_ratio, rng)
+    complete_batch = make_training_data(args.batch_rows, rng)
+
+    print(f"{'train rows':>12} {'KNNImputer ms':>15} {'indexed ms':>12} "
+          f"{'capped ms':>11} {'complete rows ms':>18}")
+    for size in args.sizes:
+        train = make_training_data(size, rng)
+
+        baseline_ms = float("nan")
+        if size <= args.skip_baseline_above:
+            baseline = KNNImputer(n_neighbors=3).fit(train)
+            baseline_ms = time_transform(baseline, batch, args.repeats)
+
+        indexed = IndexedKNNImputer(n_neighbors=3).fit(train)
+        capped  = IndexedKNNImputer(n_neighbors=3, max_donors=args.max_donors).fit(train)
+
+        print(f"{size:>12} {baseline_ms:>15.2f} {time_transform(indexed, batch, args.repeats):>12.2f} "
+              f"{time_transform(capped, batch, args.repeats):>11.2f} "
+              f"{time_transform(capped, complete_batch, args.repeats):>18.3f}")
+
+if __name__ == "__main__":
+    main()
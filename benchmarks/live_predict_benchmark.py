@@ -0,0 +1,193 @@
+"""
+Per-update latency and throughput of live predictions over HTTP and over
+one WebSocket connection.
+
+A uvicorn server in a separate process serves a small decision tree the
+way app.py does: POST /predict/json validates the raw body and scores it
+with JsonRecordScorer, and /ws/predict scores feature updates through
+LivePredictionBatcher. The client sends one-record updates:
+
+  http new connection   a fresh HTTP connection per update
+  http keep-alive       one pooled HTTP connection, one update at a time
+  websocket             one connection, one update at a time
+  websocket pipelined   one connection, --in-flight updates outstanding,
+                        which the server batches into shared model calls
+
+Client and server share the machine, so absolute numbers include the
+client's own overhead.
+
+Usage:
+    python -m benchmarks.live_predict_benchmark --updates 2000 --in-flight 64
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+import websockets
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+from etl_project.serving.json_records import JsonRecordScorer, read_feature_columns
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+from etl_project.utils.ml_utils.preprocessing.imputer import IndexedKNNImputer
+
+
+def build_model(columns) -> ETLModel:
+    rng = np.random.default_rng(7)
+    X = pd.DataFrame(rng.integers(-1, 2, size=(10_000, len(columns))).astype(float), columns=columns)
+    y = (X.iloc[:, 0] + X.iloc[:, 1] > 0).astype(int)
+    preprocessor = Pipeline([("imputer", IndexedKNNImputer(n_neighbors=3))]).fit(X)
+    model = DecisionTreeClassifier(max_depth=8).fit(preprocessor.transform(X), y)
+    return ETLModel(preprocessor=preprocessor, model=model)
+
+
+def serve(port: int) -> None:
+    import uvicorn
+    from fastapi import FastAPI, Request, WebSocket
+    from fastapi.responses import JSONResponse
+    from starlette.concurrency import run_in_threadpool
+
+    from etl_project.serving.live import LivePredictionBatcher, LivePredictionConnection, live_message_adapter
+
+    columns = read_feature_columns()
+    model = build_model(columns)
+    json_scorer = JsonRecordScorer(columns)
+    live_scorer = JsonRecordScorer(columns, max_records=2048)
+
+    async def score_live_records(records: list):
+        return await run_in_threadpool(live_scorer.score, model, records), "benchmark"
+
+    batcher = LivePredictionBatcher(score_live_records)
+    messages = live_message_adapter(live_scorer)
+    server_app = FastAPI()
+
+    @server_app.post("/predict/json")
+    async def predict_json(request: Request):
+        records = json_scorer.parse(await request.body())
+        y_pred = await run_in_threadpool(json_scorer.score, model, records)
+        return JSONResponse({"status": "success", "predictions": y_pred.tolist()})
+
+    @server_app.websocket("/ws/predict")
+    async def live_predict(websocket: WebSocket):
+        await websocket.accept()
+        await LivePredictionConnection(websocket, batcher, messages).run()
+
+    uvicorn.run(server_app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port: int) -> None:
+    for _ in range(300):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Benchmark server did not start")
+
+
+async def http_new_connection(url: str, bodies: list) -> np.ndarray:
+    timings = np.empty(len(bodies))
+    for i, body in enumerate(bodies):
+        start = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            (await client.post(url, content=body)).raise_for_status()
+        timings[i] = time.perf_counter() - start
+    return timings
+
+
+async def http_keep_alive(url: str, bodies: list) -> np.ndarray:
+    timings = np.empty(len(bodies))
+    async with httpx.AsyncClient() as client:
+        for i, body in enumerate(bodies):
+            start = time.perf_counter()
+            (await client.post(url, content=body)).raise_for_status()
+            timings[i] = time.perf_counter() - start
+    return timings
+
+
+async def websocket_sequential(url: str, bodies: list) -> np.ndarray:
+    timings = np.empty(len(bodies))
+    async with websockets.connect(url) as connection:
+        for i, body in enumerate(bodies):
+            start = time.perf_counter()
+            await connection.send(json.dumps({"id": i, "records": json.loads(body)}))
+            assert json.loads(await connection.recv())["status"] == "success"
+            timings[i] = time.perf_counter() - start
+    return timings
+
+
+async def websocket_pipelined(url: str, bodies: list, in_flight: int) -> np.ndarray:
+    timings = np.empty(len(bodies))
+    sent_at = {}
+    window = asyncio.Semaphore(in_flight)
+    async with websockets.connect(url) as connection:
+        async def receive():
+            for _ in bodies:
+                answer = json.loads(await connection.recv())
+                assert answer["status"] == "success"
+                timings[answer["id"]] = time.perf_counter() - sent_at[answer["id"]]
+                window.release()
+
+        receiver = asyncio.ensure_future(receive())
+        for i, body in enumerate(bodies):
+            await window.acquire()
+            sent_at[i] = time.perf_counter()
+            await connection.send(json.dumps({"id": i, "records": json.loads(body)}))
+        await receiver
+    return timings
+
+
+async def run_scenarios(port: int, bodies: list, in_flight: int) -> None:
+    http_url, ws_url = f"http://127.0.0.1:{port}/predict/json", f"ws://127.0.0.1:{port}/ws/predict"
+    scenarios = [
+        ("http new connection", lambda: http_new_connection(http_url, bodies)),
+        ("http keep-alive", lambda: http_keep_alive(http_url, bodies)),
+        ("websocket", lambda: websocket_sequential(ws_url, bodies)),
+        (f"websocket pipelined x{in_flight}", lambda: websocket_pipelined(ws_url, bodies, in_flight)),
+    ]
+    print(f"{'scenario':<28}{'p50 ms':>10}{'p99 ms':>10}{'updates/s':>12}")
+    for name, scenario in scenarios:
+        await scenario()
+        start = time.perf_counter()
+        timings = await scenario()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28}{np.percentile(timings, 50) * 1000:>10.2f}{np.percentile(timings, 99) * 1000:>10.2f}"
+              f"{len(bodies) / elapsed:>12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--in-flight", type=int, default=64)
+    args = parser.parse_args()
+
+    columns = read_feature_columns()
+    rng = np.random.default_rng(11)
+    features = rng.integers(-1, 2, size=(args.updates, len(columns))).astype(float)
+    bodies = [json.dumps(dict(zip(columns, row))).encode() for row in features.tolist()]
+
+    port = free_port()
+    server = multiprocessing.get_context("spawn").Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    try:
+        wait_for_server(port)
+        asyncio.run(run_scenarios(port, bodies, args.in_flight))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
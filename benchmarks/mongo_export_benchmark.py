@@ -0,0 +1,196 @@
+"""
+Peak memory and throughput of exporting the training collection from Mongo.
+
+Without a mongod, an in-process stand-in plays the collection: it produces
+the raw BSON batches a server would send for documents shaped like the
+ones push_data.py inserts (every schema column as an int32), generated
+batch by batch so the stand-in itself holds no data. Every batch also
+waits --round-trip-ms, standing in for the getMore round trip and the
+server's work, which a single cursor waits for batch after batch. Each
+export runs in a fresh process and reports its peak RSS above the
+process's RSS before exporting.
+
+  stand-in only   iterating the raw batches with one cursor, the floor
+  legacy          pd.DataFrame(list(collection.find())) and dropping _id
+  columnar        MongoColumnExporter.export, one cursor
+  columnar xN     MongoColumnExporter.export_parallel with N _id ranges
+
+The legacy export keeps a dict per document, so it is only run up to
+--legacy-documents (10M documents would need well over 10 GB).
+
+Usage:
+    python -m benchmarks.mongo_export_benchmark --documents 10000000 --legacy-documents 1000000 \
+        --partitions 2 4 8 --round-trip-ms 2
+"""
+import argparse
+import multiprocessing
+import time
+
+import bson
+import numpy as np
+import pandas as pd
+import psutil
+
+from etl_project.constants.training_pipeline import DATA_INGESTION_MONGO_BATCH_SIZE, SCHEMA_FILE_PATH
+from etl_project.utils.main_utils.mongo_export import MongoColumnExporter, schema_column_types
+from etl_project.utils.main_utils.utils import read_yaml_file
+
+
+class StandInCollection:
+    """
+    Serves ``documents`` documents of int32 ``columns`` as raw BSON
+    batches, with an ObjectId ``_id`` unless the projection drops it. The
+    ``_id`` of the i-th document ends with i, so ``_id`` ranges are ranges
+    of positions.
+    """
+    def __init__(self, documents: int, columns: list, seed: int = 7, round_trip_ms: float = 0.0) -> None:
+        self.documents  = documents
+        self.columns    = columns
+        self.seed       = seed
+        self.round_trip = round_trip_ms / 1000
+        self._id_prefix = bson.ObjectId().binary[:4]
+
+    def _object_id(self, position: int) -> bson.ObjectId:
+        return bson.ObjectId(self._id_prefix + position.to_bytes(8, "big"))
+
+    def _positions(self, query) -> range:
+        bounds = (query or {}).get("_id", {})
+        start = int.from_bytes(bounds["$gte"].binary[4:], "big") if "$gte" in bounds else 0
+        end = int.from_bytes(bounds["$lt"].binary[4:], "big") if "$lt" in bounds else self.documents
+        return range(start, end)
+
+    def estimated_document_count(self) -> int:
+        return self.documents
+
+    def count_documents(self, query: dict) -> int:
+        return len(self._positions(query))
+
+    def aggregate(self, pipeline: list):
+        size = pipeline[0]["$sample"]["size"]
+        positions = np.random.default_rng(self.seed).integers(0, self.documents, size=size)
+        return [{"value": self._object_id(int(position))} for position in positions]
+
+    def _template(self, with_id: bool):
+        template = {"_id": self._object_id(0)} if with_id else {}
+        template.update({column: 0 for column in self.columns})
+        raw = np.frombuffer(bson.encode(template), dtype=np.uint8)
+        offsets, position = [], 4
+        for name in template:
+            position += 1 + len(name.encode()) + 1
+            offsets.append(position)
+            position += 12 if name == "_id" else 4
+        return raw, offsets
+
+    def _raw_batches(self, with_id: bool, batch_size: int, positions: range):
+        raw, offsets = self._template(with_id)
+        value_offsets = offsets[1:] if with_id else offsets
+        column_keys = np.arange(len(self.columns), dtype=np.uint64) * np.uint64(40503) + np.uint64(self.seed)
+        for start in range(positions.start, positions.stop, batch_size):
+            rows = min(batch_size, positions.stop - start)
+            time.sleep(self.round_trip)
+            # Values depend only on the document's position, whatever the batch size
+            index = np.arange(start, start + rows, dtype=np.uint64)[:, None]
+            documents = np.tile(raw, (rows, 1))
+            if with_id:
+                documents[:, offsets[0] + 4:offsets[0] + 12] = index.astype(">u8").view(np.uint8)
+            values = (((index * np.uint64(2654435761) + column_keys) >> np.uint64(7)) % np.uint64(3)).astype(np.int32) - 1
+            for column, offset in enumerate(value_offsets):
+                documents[:, offset:offset + 4] = values[:, column:column + 1].view(np.uint8)
+            yield documents.tobytes()
+
+    def find_raw_batches(self, query=None, projection=None, batch_size: int = 101):
+        with_id = not (projection and projection.get("_id") == 0)
+        return self._raw_batches(with_id, batch_size, self._positions(query))
+
+    def find(self, query=None, projection=None):
+        for raw_batch in self._raw_batches(True, DATA_INGESTION_MONGO_BATCH_SIZE, self._positions(query)):
+            yield from bson.decode_all(raw_batch)
+
+
+def peak_rss_bytes() -> int:
+    # VmHWM starts over with the process's own address space, unlike ru_maxrss,
+    # which a spawned child inherits from its parent
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmHWM is not reported on this platform")
+
+
+def legacy_export(collection) -> pd.DataFrame:
+    df = pd.DataFrame(list(collection.find()))
+    if "_id" in df.columns.to_list():
+        df.drop(columns=["_id"], axis=1, inplace=True)
+    return df
+
+
+def run_export(scenario: str, documents: int, round_trip_ms: float, column_types: dict, results) -> None:
+    collection = StandInCollection(documents, list(column_types), round_trip_ms=round_trip_ms)
+    rss_before = psutil.Process().memory_info().rss
+    start = time.perf_counter()
+    if scenario == "stand-in only":
+        for _ in collection.find_raw_batches({}, {"_id": 0}, batch_size=DATA_INGESTION_MONGO_BATCH_SIZE):
+            pass
+    elif scenario == "legacy":
+        legacy_export(collection)
+    elif scenario == "columnar":
+        MongoColumnExporter(collection, column_types, batch_size=DATA_INGESTION_MONGO_BATCH_SIZE).export()
+    else:
+        partitions = int(scenario.rsplit("x", 1)[1])
+        MongoColumnExporter(collection, column_types, batch_size=DATA_INGESTION_MONGO_BATCH_SIZE).export_parallel(partitions)
+    seconds = time.perf_counter() - start
+    peak_mb = (peak_rss_bytes() - rss_before) / 2**20
+    results.put((seconds, peak_mb))
+
+
+def measure(scenario: str, documents: int, round_trip_ms: float, column_types: dict):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_export, args=(scenario, documents, round_trip_ms, column_types, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        return None
+    return results.get()
+
+
+def check_parity(column_types: dict) -> None:
+    collection = StandInCollection(50_000, list(column_types))
+    expected = legacy_export(collection)
+    exporter = MongoColumnExporter(collection, column_types, batch_size=7_000)
+    for exported in (exporter.export(), exporter.export_parallel(4)):
+        pd.testing.assert_frame_equal(exported, expected.astype(exported.dtypes.to_dict()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10_000_000)
+    parser.add_argument("--legacy-documents", type=int, default=1_000_000)
+    parser.add_argument("--partitions", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--round-trip-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    column_types = schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+    check_parity(column_types)
+
+    runs = [("stand-in only", args.documents), ("columnar", args.documents)]
+    runs += [(f"columnar x{partitions}", args.documents) for partitions in args.partitions]
+    if args.legacy_documents != args.documents:
+        runs.append(("columnar", args.legacy_documents))
+    runs.append(("legacy", args.legacy_documents))
+
+    print(f"{len(column_types)} int32 columns per document, batches of {DATA_INGESTION_MONGO_BATCH_SIZE:,}, "
+          f"{args.round_trip_ms:g} ms per batch round trip")
+    print(f"{'export':<16}{'documents':>14}{'seconds':>10}{'docs/s':>14}{'peak MB':>10}{'bytes/doc':>11}")
+    for scenario, documents in runs:
+        result = measure(scenario, documents, args.round_trip_ms, column_types)
+        if result is None:
+            print(f"{scenario:<16}{documents:>14,}  failed (out of memory?)")
+            continue
+        seconds, peak_mb = result
+        print(f"{scenario:<16}{documents:>14,}{seconds:>10.2f}{documents / seconds:>14,.0f}{peak_mb:>10,.0f}"
+              f"{peak_mb * 2**20 / documents:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Per-worker memory of N serving workers with and without pre-fork sharing.
+
+A model whose preprocessor holds a large KNN training matrix is written to
+a temporary model directory, then N workers load it and score a batch:
+
+  independent   each worker is a fresh process that unpickles its own copy
+                (what N separate uvicorn processes do)
+  prefork       the master loads the model once and forks the workers
+  prefork+mmap  as prefork, with the registry memory-mapping the arrays
+
+RSS counts shared pages in every worker, USS only the worker's private
+pages and PSS splits shared pages between the processes sharing them, so
+the PSS total is what the node actually pays.
+
+Usage:
+    python -m benchmarks.prefork_memory_benchmark --workers 4 --train-rows 500000
+"""
+import argparse
+import gc
+import multiprocessing
+import tempfile
+
+import numpy as np
+import pandas as pd
+import psutil
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+from etl_project.entity.config_entity import ModelRegistryConfig
+from etl_project.serving.model_registry import ModelRegistry
+from etl_project.utils.main_utils.utils import save_object
+from etl_project.utils.ml_utils.preprocessing.imputer import IndexedKNNImputer
+
+N_FEATURES = 30
+COLUMNS = [f"feature_{i}" for i in range(N_FEATURES)]
+
+# Registry loaded by the master before forking
+_registry = None
+
+
+def write_model(model_dir: str, train_rows: int) -> None:
+    rng = np.random.default_rng(7)
+    X = pd.DataFrame(rng.integers(-1, 2, size=(train_rows, N_FEATURES)).astype(float), columns=COLUMNS)
+    y = (X.iloc[:, 0] + X.iloc[:, 1] > 0).astype(int)
+    preprocessor = Pipeline([("imputer", IndexedKNNImputer(n_neighbors=3, max_donors=None))]).fit(X)
+    model = DecisionTreeClassifier(max_depth=8).fit(preprocessor.transform(X), y)
+    config = ModelRegistryConfig(model_dir)
+    save_object(config.preprocessor_file_path, preprocessor)
+    save_object(config.model_file_path, model)
+
+
+def score(registry: ModelRegistry) -> None:
+    rng = np.random.default_rng(11)
+    X = rng.integers(-1, 2, size=(2_000, N_FEATURES)).astype(float)
+    X[rng.random(X.shape) < 0.01] = np.nan
+    registry.get().model.predict(pd.DataFrame(X, columns=COLUMNS))
+
+
+def worker(model_dir, memory_map, barrier, results) -> None:
+    registry = _registry
+    if registry is None:
+        registry = ModelRegistry(ModelRegistryConfig(model_dir, memory_map=memory_map))
+        registry.get()
+    score(registry)
+    barrier.wait()
+    info = psutil.Process().memory_full_info()
+    results.put((info.rss, info.pss, info.uss))
+    barrier.wait()
+
+
+def run_scenario(name: str, model_dir: str, workers: int) -> None:
+    global _registry
+    prefork = name.startswith("prefork")
+    context = multiprocessing.get_context("fork" if prefork else "spawn")
+    barrier = context.Barrier(workers + 1)
+    results = context.Queue()
+
+    if prefork:
+        _registry = ModelRegistry(ModelRegistryConfig(model_dir, memory_map=name.endswith("mmap")))
+        _registry.get()
+        gc.collect()
+        gc.freeze()
+
+    processes = [context.Process(target=worker, args=(model_dir, False, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    samples = [results.get() for _ in range(workers)]
+    master_pss = psutil.Process().memory_full_info().pss if prefork else 0
+    barrier.wait()
+    for process in processes:
+        process.join()
+
+    if prefork:
+        _registry = None
+        gc.unfreeze()
+        gc.collect()
+
+    rss, pss, uss = (np.mean([sample[i] for sample in samples]) / 2**20 for i in range(3))
+    total_pss = (sum(sample[1] for sample in samples) + master_pss) / 2**20
+    print(f"{name:<14}{rss:>12,.0f}{pss:>12,.0f}{uss:>12,.0f}{total_pss:>14,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--train-rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        write_model(model_dir, args.train_rows)
+        print(f"{args.workers} workers, KNN training matrix {args.train_rows:,} x {N_FEATURES}")
+        print(f"{'scenario':<14}{'RSS MiB':>12}{'PSS MiB':>12}{'USS MiB':>12}{'total PSS MiB':>14}")
+        for name in ("independent", "prefork", "prefork+mmap"):
+            run_scenario(name, model_dir, args.workers)
+
+
+if __name__ == "__main__":
+    main()
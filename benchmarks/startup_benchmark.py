@@ -0,0 +1,96 @@
+"""
+Import time of the serving app, checked against a startup budget.
+
+Runs ``python -X importtime -c "import app"`` in fresh interpreters, takes
+the median cumulative import time of ``app`` and lists the slowest modules
+of the last run. Exits with status 1 when the median is over the budget or
+when a training-only module (the training pipeline, model trainer, mlflow,
+boto3, pymongo, ...) was imported, so it can run as a regression check.
+
+Usage:
+    python -m benchmarks.startup_benchmark --runs 5 --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Modules only training needs; importing any of them while serving means a
+# lazy import was turned back into a top-level one
+FORBIDDEN_MODULES = (
+    "mlflow",
+    "dagshub",
+    "pymongo",
+    "boto3",
+    "sklearn.ensemble",
+    "sklearn.model_selection",
+    "etl_project.pipeline.training_pipeline",
+    "etl_project.components",
+    "etl_project.cloud",
+)
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$")
+
+
+def import_times(module: str, cwd: str) -> dict:
+    """
+    Returns {module: (self us, cumulative us, depth)} for one import of
+    ``module`` in a fresh interpreter.
+    """
+    # The app reads its schema and model paths relative to the repo root
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # The first run warms the OS page cache and writes bytecode
+    import_times(args.module, repo_dir)
+    runs = [import_times(args.module, repo_dir) for _ in range(args.runs)]
+    totals_ms = [times[args.module][1] / 1000 for times in runs]
+    median_ms = statistics.median(totals_ms)
+
+    last = runs[-1]
+    print(f"import {args.module}: median {median_ms:,.0f} ms over {args.runs} runs "
+          f"(min {min(totals_ms):,.0f}, max {max(totals_ms):,.0f}), budget {args.budget_ms:,.0f} ms")
+    print(f"\n{'top-level import':<48}{'cumulative ms':>14}")
+    top_level = sorted(((cumulative, name) for name, (_, cumulative, depth) in last.items() if depth <= 1),
+                       reverse=True)
+    for cumulative, name in top_level[:args.top]:
+        print(f"{name:<48}{cumulative / 1000:>14,.1f}")
+
+    forbidden = sorted(name for name in last
+                       if any(name == prefix or name.startswith(prefix + ".") for prefix in FORBIDDEN_MODULES))
+    failed = False
+    if forbidden:
+        print(f"\nFAIL: training-only modules imported: {', '.join(forbidden)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"\nFAIL: import {args.module} took {median_ms:,.0f} ms, over the {args.budget_ms:,.0f} ms budget")
+        failed = True
+    if not failed:
+        print("\nOK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
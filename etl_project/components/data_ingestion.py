@@ -2,13 +2,23 @@ from etl_project.exception.exception import ETLPipelineException
 from etl_project.logging.logger import logging
 from etl_project.entity.config_entity import DataIngestionConfig
 from etl_project.entity.artifact_entity import DataIngestionArtifact
+from etl_project.constants.training_pipeline import SCHEMA_FILE_PATH
+from etl_project.utils.main_utils.utils import read_yaml_file, file_lock
+from etl_project.utils.main_utils.mongo_export import MongoColumnExporter, schema_column_types
+from etl_project.utils.main_utils.feature_store import FeatureStore
+from etl_project.utils.main_utils.artifact_handoff import ArtifactHandoff
 
 import os 
 import sys
+import json
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pymongo
-from typing import List 
+from bson import ObjectId, json_util
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 from sklearn.model_selection import train_test_split
 
 from dotenv import load_dotenv
@@ -17,39 +27,260 @@ load_dotenv()
 MONGO_DB_URI = os.getenv("MONGO_DB_URI")
 
 class DataIngestion:
-    def __init__(self, data_ingestion_config: DataIngestionConfig) -> None:
+    def __init__(self, data_ingestion_config: DataIngestionConfig,
+                 artifact_handoff: Optional[ArtifactHandoff] = None) -> None:
         try:
             self.data_ingestion_config = data_ingestion_config
+            self.artifact_handoff = artifact_handoff
         except Exception as e:
             raise ETLPipelineException(e, sys)
 
 
+    def _open_collection(self):
+        partitions = self.data_ingestion_config.export_partitions
+        # One pooled client, with a connection for each range's cursor
+        self.mongo_client = pymongo.MongoClient(MONGO_DB_URI, maxPoolSize=max(partitions, 100))
+        return self.mongo_client[self.data_ingestion_config.database_name][self.data_ingestion_config.collection_name]
+
+    def _export(self, exporter: MongoColumnExporter, query: Optional[dict] = None) -> pd.DataFrame:
+        partitions = self.data_ingestion_config.export_partitions
+        if partitions > 1:
+            return exporter.export_parallel(partitions, self.data_ingestion_config.partition_field,
+                                            self.data_ingestion_config.samples_per_partition, query=query)
+        return exporter.export(query)
+
     def export_collection_as_df(self):
         try:
-            database_name = self.data_ingestion_config.database_name
-            collection_name = self.data_ingestion_config.collection_name
-            self.mongo_client = pymongo.MongoClient(MONGO_DB_URI)
-            collection = self.mongo_client[database_name][collection_name]
+            collection = self._open_collection()
+            try:
+                # Only the schema columns are read, straight into typed column arrays
+                columns = schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+                exporter = MongoColumnExporter(collection, columns, batch_size=self.data_ingestion_config.mongo_batch_size)
+                return self._export(exporter)
+            finally:
+                self.mongo_client.close()
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
 
-            df = pd.DataFrame(list(collection.find()))
+    def read_snapshot_manifest(self) -> Optional[dict]:
+        try:
+            file_path = self.data_ingestion_config.snapshot_manifest_file_path
+            if not os.path.exists(file_path):
+                return None
+            with open(file_path) as file:
+                return json.load(file)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
 
-            if "_id" in df.columns.to_list():
-                df.drop(columns=["_id"], axis=1, inplace=True)
-            return df
+    def write_snapshot_manifest(self, manifest: dict) -> None:
+        file_path = self.data_ingestion_config.snapshot_manifest_file_path
+        tmp_file_path = file_path + ".tmp"
+        with open(tmp_file_path, "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(tmp_file_path, file_path)
+
+    def _write_snapshot_part(self, table: pa.Table, manifest: dict) -> dict:
+        part_file_name = f"part-{manifest['next_part']:05d}.parquet"
+        part_file_path = os.path.join(self.data_ingestion_config.snapshot_dir, part_file_name)
+        tmp_file_path = os.path.join(self.data_ingestion_config.snapshot_dir, "." + part_file_name + ".tmp")
+        pq.write_table(table, tmp_file_path, compression=self.data_ingestion_config.snapshot_compression)
+        os.replace(tmp_file_path, part_file_path)
+        manifest["next_part"] += 1
+        return {"file": part_file_name, "rows": table.num_rows}
+
+    def _remove_unlisted_parts(self, manifest: dict) -> None:
+        # Parts of a full export or compaction that the manifest no longer
+        # lists, or that a failed run wrote before updating it
+        listed = {part["file"] for part in manifest["parts"]}
+        for file_name in os.listdir(self.data_ingestion_config.snapshot_dir):
+            if file_name.endswith(".parquet") and file_name not in listed:
+                os.remove(os.path.join(self.data_ingestion_config.snapshot_dir, file_name))
+
+    def read_snapshot(self, manifest: dict) -> pa.Table:
+        try:
+            tables = [pq.read_table(os.path.join(self.data_ingestion_config.snapshot_dir, part["file"]))
+                      for part in manifest["parts"]]
+            if not tables:
+                return pa.table({column: pa.array([], type=pa.from_numpy_dtype(np.dtype(dtype)))
+                                 for column, dtype in manifest["columns"].items()})
+            # A delta whose integer column held a missing value was exported as float64
+            return pa.concat_tables(tables, promote_options="permissive")
         except Exception as e:
             raise ETLPipelineException(e, sys)
-    
-    def export_data_into_feature_store(self, df:pd.DataFrame):
+
+    def compact_snapshot(self, manifest: dict) -> bool:
+        """
+        Rewrites the snapshot's parts as a single part once more than
+        snapshot_max_parts deltas have piled up. Returns whether it did.
+        """
+        try:
+            if len(manifest["parts"]) <= self.data_ingestion_config.snapshot_max_parts:
+                return False
+            manifest["parts"] = [self._write_snapshot_part(self.read_snapshot(manifest), manifest)]
+            logging.info(f"Compacted the feature store snapshot into {manifest['parts'][0]['file']}")
+            return True
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    @staticmethod
+    def _key(document: dict, field: str) -> tuple:
+        # Documents are ordered by their watermark field, then by _id
+        return (document.get(field), document["_id"])
+
+    @staticmethod
+    def _key_query(field: str, operator: str, key: tuple) -> dict:
+        """
+        The documents whose (field, _id) key is past ``key`` for "$gt" and
+        "$gte", or before it for "$lt" and "$lte".
+        """
+        value, document_id = key
+        if field == "_id":
+            return {"_id": {operator: document_id}}
+        return {"$or": [{field: {operator[:3]: value}}, {field: value, "_id": {operator: document_id}}]}
+
+    def _window_start(self, collection, field: str, high_water: tuple) -> Optional[tuple]:
+        """
+        The key of the oldest document of the window read again below
+        high_water: the documents of the last watermark_window_seconds, at
+        most watermark_window_max_documents of them. None when the field's
+        type has no notion of time and there is no window.
+        """
+        config = self.data_ingestion_config
+        window = timedelta(seconds=config.watermark_window_seconds)
+        if isinstance(high_water[0], ObjectId):
+            window_low = ObjectId.from_datetime(high_water[0].generation_time - window)
+            window_start = (window_low, window_low)
+        elif isinstance(high_water[0], datetime):
+            window_low = high_water[0] - window
+            window_start = (window_low, ObjectId(b"\x00" * 12))
+        else:
+            return None
+        recent = list(collection.find(self._key_query(field, "$gte", window_start), {field: 1})
+                      .sort([(field, pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+                      .limit(config.watermark_window_max_documents))
+        if len(recent) < config.watermark_window_max_documents:
+            return window_start
+        return self._key(recent[-1], field)
+
+    @staticmethod
+    def _and(*conditions: dict) -> dict:
+        conditions = [condition for condition in conditions if condition]
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def export_incremental(self) -> Tuple[pd.DataFrame, dict]:
+        """
+        Brings the feature store snapshot up to date with the collection and
+        returns it, with a report of what was exported.
+
+        The snapshot is a directory of Parquet parts kept across runs, with a
+        manifest holding the high-water mark: the (watermark_field, _id) key
+        of the last document exported, ties on the field being broken by
+        _id. A run reads the collection's current high-water mark first,
+        then exports only the documents up to it past the last run's (an
+        index range scan; the index is created if missing) and appends them
+        as a new part.
+
+        ``_id`` and date values are assigned before an insert commits, so a
+        document can become visible below a watermark already exported. A
+        run therefore starts again at the window of the last run, the
+        documents of its last watermark_window_seconds (at most
+        watermark_window_max_documents of them), and skips the ones of that
+        window the manifest lists as exported; the window of each run is
+        read with its ``_id`` values to list them. An insert committing later
+        than the window is lost until the next full export, as are documents
+        updated or deleted after they were exported. A watermark field of
+        another type has no window, and documents without the field are
+        never exported. Without a snapshot, or when the schema or watermark
+        field changed, the whole collection is exported instead.
+        """
         try:
-            feature_store_file_path = self.data_ingestion_config.feature_store_dir
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path, exist_ok=True)
+            config = self.data_ingestion_config
+            columns = schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+            field = config.watermark_field
+            with file_lock(config.snapshot_lock_file_path):
+                manifest = self.read_snapshot_manifest()
+                full = (manifest is None or manifest["columns"] != columns
+                        or manifest["watermark_field"] != field or "high_water" not in manifest)
+                if full:
+                    lower, window = None, []
+                else:
+                    window = [tuple(key) for key in json_util.loads(manifest["window"])]
+                    # Inclusive from the last window, exclusive past the last high-water mark without one
+                    lower = json_util.loads(manifest["window_start"] or manifest["high_water"] or "null")
+                    lower = None if lower is None else ("$gte" if manifest["window_start"] else "$gt", tuple(lower))
+                collection = self._open_collection()
+                try:
+                    if field != "_id":
+                        collection.create_index([(field, pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+                    latest = collection.find_one({field: {"$ne": None}}, {field: 1},
+                                                 sort=[(field, pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+                    high_water = None if latest is None else self._key(latest, field)
+                    window_start = None if high_water is None else self._window_start(collection, field, high_water)
+                    exporter = MongoColumnExporter(collection, columns, batch_size=config.mongo_batch_size)
+                    lower_query = {} if lower is None else self._key_query(field, *lower)
+                    exported_ids = {"_id": {"$nin": [document_id for _, document_id in window]}} if window else {}
 
-            df.to_csv(feature_store_file_path, index=False, header=True)
-            return df
+                    deltas = []
+                    if high_water is not None and (window_start is None or lower is None or window_start > lower[1]):
+                        # Older than the window: read without _id, in parallel for a full export
+                        upper_query = (self._key_query(field, "$lte", high_water) if window_start is None
+                                       else self._key_query(field, "$lt", window_start))
+                        query = self._and(lower_query, upper_query, exported_ids)
+                        deltas.append(self._export(exporter, query) if full else exporter.export(query))
+                    if window_start is not None:
+                        if lower is None or window_start > lower[1]:
+                            lower_query = self._key_query(field, "$gte", window_start)
+                        query = self._and(lower_query, self._key_query(field, "$lte", high_water), exported_ids)
+                        window_delta, window_keys = exporter.export_with_keys(query, (field, "_id"))
+                        deltas.append(window_delta)
+                        window = [key for key in window if key >= window_start] + window_keys
+                    else:
+                        window = []
+                finally:
+                    self.mongo_client.close()
+
+                delta = pd.concat(deltas, ignore_index=True) if deltas else pd.DataFrame()
+                if full:
+                    manifest = {"watermark_field": field, "watermark": None, "high_water": None,
+                                "window_start": None, "window": "[]", "columns": columns,
+                                "parts": [], "next_part": 0 if manifest is None else manifest["next_part"]}
+                    df = delta
+                if len(delta):
+                    manifest["parts"].append(self._write_snapshot_part(pa.Table.from_pandas(delta, preserve_index=False),
+                                                                       manifest))
+                if high_water is not None:
+                    manifest["watermark"] = json_util.dumps(high_water[0])
+                    manifest["high_water"] = json_util.dumps(list(high_water))
+                    manifest["window_start"] = None if window_start is None else json_util.dumps(list(window_start))
+                    manifest["window"] = json_util.dumps([list(key) for key in window])
+                compacted = self.compact_snapshot(manifest)
+                manifest["rows"] = sum(part["rows"] for part in manifest["parts"])
+                self.write_snapshot_manifest(manifest)
+                self._remove_unlisted_parts(manifest)
+
+                if not full:
+                    df = self.read_snapshot(manifest).to_pandas()
+            report = {
+                "ingestion_mode": "full" if full else "incremental",
+                "delta_rows": len(delta),
+                "snapshot_rows": manifest["rows"],
+                "watermark": manifest["watermark"],
+                "compacted": compacted,
+            }
+            logging.info(f"Feature store snapshot: {report}")
+            return df, report
         except Exception as e:
             raise ETLPipelineException(e, sys)
     
+    def export_data_into_feature_store(self, df: pd.DataFrame) -> pd.DataFrame:
+        try:
+            os.makedirs(self.data_ingestion_config.feature_store_dir, exist_ok=True)
+            FeatureStore(self.data_ingestion_config.feature_store_config).write(
+                df, self.data_ingestion_config.feature_store_file_path)
+            return df
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
     def split_data_as_train_test_set(self, df: pd.DataFrame):
         try:
             train_set, test_set = train_test_split(
@@ -57,24 +288,36 @@ class DataIngestion:
             )
             logging.info("Train test split operation completed.")
             
-            dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
-            os.makedirs(dir_path, exist_ok=True)
+            os.makedirs(self.data_ingestion_config.feature_store_dir, exist_ok=True)
 
-            logging.info("Exporting file paths")
-            train_set.to_csv(self.data_ingestion_config.training_file_path, index=False, header=True)
-            test_set.to_csv(self.data_ingestion_config.test_file_path, index=False, header=True)
-            logging.info("Exported train and test file paths")
+            logging.info("Exporting train and test sets into the feature store")
+            feature_store = FeatureStore(self.data_ingestion_config.feature_store_config)
+            for dataset_dir, dataset in ((self.data_ingestion_config.training_file_path, train_set),
+                                         (self.data_ingestion_config.test_file_path, test_set)):
+                if self.artifact_handoff is None:
+                    feature_store.write(dataset, dataset_dir)
+                else:
+                    # Handed to validation as a schema-typed table, written in the background
+                    self.artifact_handoff.publish(dataset_dir, feature_store.conform(dataset),
+                                                  lambda path, table: feature_store.write(table, path))
+            logging.info("Exported train and test sets into the feature store")
         except Exception as e:
             raise ETLPipelineException(e, sys)
         
     def initiate_data_ingestion(self):
         try:
-            df = self.export_collection_as_df()
+            # Only how the collection is read depends on the mode
+            if self.data_ingestion_config.incremental:
+                df, report = self.export_incremental()
+            else:
+                df = self.export_collection_as_df()
+                report = {"delta_rows": len(df), "snapshot_rows": len(df)}
             df = self.export_data_into_feature_store(df)
             self.split_data_as_train_test_set(df)
 
 
-            data_ingestion_artifact = DataIngestionArtifact(trained_file_path=self.data_ingestion_config.training_file_path, test_file_path=self.data_ingestion_config.test_file_path)
+            data_ingestion_artifact = DataIngestionArtifact(trained_file_path=self.data_ingestion_config.training_file_path, test_file_path=self.data_ingestion_config.test_file_path,
+                                                            **report)
             return data_ingestion_artifact
 
         except Exception as e:
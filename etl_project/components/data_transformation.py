@@ -2,38 +2,43 @@ import sys
 import os
 import numpy as np
 import pandas as pd
-from sklearn.impute import KNNImputer
 from sklearn.pipeline import Pipeline
 from etl_project.constants.training_pipeline import TARGET_COLUMN
 from etl_project.constants.training_pipeline import DATA_TRANSFORMATION_IMPUTER_PARAMS
 from etl_project.entity.artifact_entity import DataTransformationArtifact, DataValidationArtifact
-from etl_project.entity.config_entity import DataTransformationConfig
+from etl_project.entity.config_entity import DataTransformationConfig, FeatureStoreConfig
 from etl_project.exception.exception import ETLPipelineException
 from etl_project.logging.logger import logging
 from etl_project.utils.main_utils.utils import save_numpy_array_data, save_object
+from etl_project.utils.main_utils.feature_store import FeatureStore
+from etl_project.utils.main_utils.artifact_handoff import ArtifactHandoff
+from typing import Optional
+from etl_project.utils.ml_utils.preprocessing.imputer import IndexedKNNImputer
 
 class DataTransformation:
     def __init__(self, data_validation_artifact: DataValidationArtifact,
-                       data_transformation_config: DataTransformationConfig) -> None:
+                       data_transformation_config: DataTransformationConfig,
+                       artifact_handoff: Optional[ArtifactHandoff] = None) -> None:
         try:
             self.data_validation_artifact = data_validation_artifact
             self.data_transformation_config = data_transformation_config
+            self.artifact_handoff = artifact_handoff
         except Exception as e:
             raise ETLPipelineException(e, sys)
     
     @staticmethod
     def read_data(file_path) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return FeatureStore(FeatureStoreConfig()).read_pandas(file_path)
         except Exception as e:
             raise ETLPipelineException(e, sys)
     
     def get_data_transformer_object(cls) -> Pipeline:
         logging.info("Entered get_data_transformer_object of Data Transformation class")
         try:
-            imputer:KNNImputer = KNNImputer(**DATA_TRANSFORMATION_IMPUTER_PARAMS)
+            imputer:IndexedKNNImputer = IndexedKNNImputer(**DATA_TRANSFORMATION_IMPUTER_PARAMS)
             logging.info(
-                f"Initialize KNN Imputer with params {DATA_TRANSFORMATION_IMPUTER_PARAMS}"
+                f"Initialize Indexed KNN Imputer with params {DATA_TRANSFORMATION_IMPUTER_PARAMS}"
             )
             processor: Pipeline = Pipeline([("imputer", imputer)])
             return processor
@@ -44,8 +49,15 @@ class DataTransformation:
         logging.info("Entered initiate_data_transformation method of Data Transformation class")
         try:
             logging.info("Started data transformation")
-            train_df = DataTransformation.read_data(self.data_validation_artifact.valid_train_file_path)
-            test_df  = DataTransformation.read_data(self.data_validation_artifact.valid_test_file_path)
+            if self.artifact_handoff is None:
+                train_df = DataTransformation.read_data(self.data_validation_artifact.valid_train_file_path)
+                test_df  = DataTransformation.read_data(self.data_validation_artifact.valid_test_file_path)
+            else:
+                feature_store = FeatureStore(self.data_transformation_config.feature_store_config)
+                train_df = self.artifact_handoff.get(self.data_validation_artifact.valid_train_file_path,
+                                                     feature_store.read).to_pandas()
+                test_df  = self.artifact_handoff.get(self.data_validation_artifact.valid_test_file_path,
+                                                     feature_store.read).to_pandas()
 
             input_feature_train_df  = train_df.drop(TARGET_COLUMN, axis=1)
             target_feature_train_df = train_df[TARGET_COLUMN]
@@ -63,12 +75,19 @@ class DataTransformation:
             train_arr = np.c_[transformed_input_train_feature, np.array(target_feature_train_df)]
             test_arr  = np.c_[transformed_input_test_feature, np.array(target_feature_test_df)]
 
-            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, 
-                                  array=train_arr)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path,
-                                  array=test_arr)
-            save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_obj)
-            save_object("final_model/preprocessor.pkl", preprocessor_obj)
+            if self.artifact_handoff is None:
+                save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, 
+                                      array=train_arr)
+                save_numpy_array_data(self.data_transformation_config.transformed_test_file_path,
+                                      array=test_arr)
+                save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_obj)
+            else:
+                self.artifact_handoff.publish(self.data_transformation_config.transformed_train_file_path,
+                                              train_arr, save_numpy_array_data)
+                self.artifact_handoff.publish(self.data_transformation_config.transformed_test_file_path,
+                                              test_arr, save_numpy_array_data)
+                self.artifact_handoff.publish(self.data_transformation_config.transformed_object_file_path,
+                                              preprocessor_obj, save_object)
             
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_object_file_path = self.data_transformation_config.transformed_object_file_path,
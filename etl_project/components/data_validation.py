@@ -1,10 +1,13 @@
 from etl_project.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
-from etl_project.entity.config_entity import DataValidationConfig
+from etl_project.entity.config_entity import DataValidationConfig, FeatureStoreConfig
 from etl_project.logging.logger import logging
 from etl_project.exception.exception import ETLPipelineException
 from etl_project.constants.training_pipeline import SCHEMA_FILE_PATH
 from etl_project.utils.main_utils.utils import read_yaml_file, write_yaml_file
+from etl_project.utils.main_utils.feature_store import FeatureStore
+from etl_project.utils.main_utils.artifact_handoff import ArtifactHandoff
 from scipy.stats import ks_2samp # for checking data drift 
+from typing import Optional
 import pandas as pd
 import os 
 import sys
@@ -12,10 +15,12 @@ import sys
 
 class DataValidation:
     def __init__(self, data_ingestion_artifact: DataIngestionArtifact, 
-                 data_validation_config: DataValidationConfig):
+                 data_validation_config: DataValidationConfig,
+                 artifact_handoff: Optional[ArtifactHandoff] = None):
         try:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_config  = data_validation_config
+            self.artifact_handoff        = artifact_handoff
             self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
         except Exception as e:
             raise ETLPipelineException(e, sys)
@@ -23,7 +28,7 @@ class DataValidation:
     @staticmethod
     def read_data(file_path) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return FeatureStore(FeatureStoreConfig()).read_pandas(file_path)
         except Exception as e:
             raise ETLPipelineException(e, sys)
         
@@ -73,8 +78,14 @@ class DataValidation:
             train_file_path = self.data_ingestion_artifact.trained_file_path
             test_file_path = self.data_ingestion_artifact.test_file_path
 
-            train_df = DataValidation.read_data(train_file_path)
-            test_df  = DataValidation.read_data(test_file_path)
+            feature_store = FeatureStore(self.data_validation_config.feature_store_config)
+            if self.artifact_handoff is None:
+                train_df = DataValidation.read_data(train_file_path)
+                test_df  = DataValidation.read_data(test_file_path)
+            else:
+                train_table = self.artifact_handoff.get(train_file_path, feature_store.read)
+                test_table  = self.artifact_handoff.get(test_file_path, feature_store.read)
+                train_df, test_df = train_table.to_pandas(), test_table.to_pandas()
 
             status = self.validate_num_of_cols(train_df)
             if not status:
@@ -91,12 +102,17 @@ class DataValidation:
             dir_path = os.path.dirname(self.data_validation_config.valid_train_file_path)
             os.makedirs(dir_path, exist_ok=True)
 
-            train_df.to_csv(
-                self.data_validation_config.valid_train_file_path, index=False, header=True
-            )
-            test_df.to_csv(
-                self.data_validation_config.valid_test_file_path, index=False, header=True
-            )
+            if self.artifact_handoff is None:
+                feature_store.write(train_df, self.data_validation_config.valid_train_file_path)
+                feature_store.write(test_df, self.data_validation_config.valid_test_file_path)
+            else:
+                # Validation doesn't change the data: the tables it was handed are the valid datasets
+                def write_dataset(path, table):
+                    return feature_store.write(table, path)
+                self.artifact_handoff.publish(self.data_validation_config.valid_train_file_path, train_table,
+                                              write_dataset)
+                self.artifact_handoff.publish(self.data_validation_config.valid_test_file_path, test_table,
+                                              write_dataset)
             
             data_validation_artifact = DataValidationArtifact(
                 validation_status=status,
@@ -1,16 +1,20 @@
 import os
 import sys
+from dataclasses import asdict
 
 from etl_project.exception.exception import ETLPipelineException
 from etl_project.logging.logger import logging
 
-from etl_project.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from etl_project.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ServingCostArtifact
 from etl_project.entity.config_entity import ModelTrainerConfig
 
-from etl_project.utils.main_utils.utils import save_object, load_object
+from etl_project.utils.main_utils.utils import save_object, load_object, file_lock
 from etl_project.utils.main_utils.utils import load_numpy_array_data, evaluate_models
+from etl_project.utils.main_utils.artifact_handoff import ArtifactHandoff
 from etl_project.utils.ml_utils.metric.classification_metric import get_classification_score
+from etl_project.utils.ml_utils.metric.serving_cost_metric import get_serving_cost
 from etl_project.utils.ml_utils.model.estimator import ETLModel
+from etl_project.utils.ml_utils.model.compiled_ensemble import CompiledTreeEnsemble
 
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import r2_score
@@ -22,9 +26,8 @@ from sklearn.ensemble import (
     RandomForestClassifier,
 )
 
-import mlflow
+from typing import Optional
 from urllib.parse import urlparse
-import dagshub
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -34,14 +37,25 @@ MLFLOW_TRACKING_PASSWORD = os.getenv("MLFLOW_TRACKING_PASSWORD")
 
 class ModelTrainer:
     def __init__(self, model_trainer_config: ModelTrainerConfig, 
-                 data_transformation_artifact: DataTransformationArtifact) -> None:
+                 data_transformation_artifact: DataTransformationArtifact,
+                 artifact_handoff: Optional[ArtifactHandoff] = None) -> None:
         try:
             self.model_trainer_config         = model_trainer_config
             self.data_transformation_artifact = data_transformation_artifact
+            self.artifact_handoff             = artifact_handoff
         except Exception as e:
             raise ETLPipelineException(e, sys)
     
-    def track_mlflow(self, best_model, classificationmetric):
+    def _load_artifact(self, file_path: str, load):
+        if self.artifact_handoff is None:
+            return load(file_path)
+        return self.artifact_handoff.get(file_path, load)
+
+    def track_mlflow(self, best_model, classificationmetric, serving_cost: ServingCostArtifact = None):
+        # mlflow takes seconds to import, so only runs that log to it load it
+        import mlflow
+        import mlflow.sklearn
+
         if MLFLOW_TRACKING_URI:
             mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
         # Avoid MLflow "logged models" API (unsupported by some servers like DagsHub)
@@ -50,6 +64,8 @@ class ModelTrainer:
             mlflow.log_metric("f1_score", classificationmetric.f1_score)
             mlflow.log_metric("precision", classificationmetric.precision_score)
             mlflow.log_metric("recall_score", classificationmetric.recall_score)
+            if serving_cost is not None:
+                mlflow.log_metrics(asdict(serving_cost))
 
             with TemporaryDirectory() as tmp_dir:
                 mlflow.sklearn.save_model(best_model, path=tmp_dir)
@@ -94,12 +110,21 @@ class ModelTrainer:
         }
         model_report :dict = evaluate_models(X_train=X_train,y_train=y_train,X_test=x_test,y_test=y_test,
                                           models=models,param=params)
-        
-        best_model_score = max(sorted(model_report.values()))
 
-        best_model_name = list(model_report.keys())[
-            list(model_report.values()).index(best_model_score)
-        ]
+        preprocessor = self._load_artifact(self.data_transformation_artifact.transformed_object_file_path, load_object)
+
+        # Each candidate is compiled (checked on the test set) and costed the way serving would run it
+        serving_models = {name: ETLModel(preprocessor=preprocessor, model=model).compile(X_check=x_test)
+                          for name, model in models.items()}
+        serving_costs  = {name: get_serving_cost(serving_model, x_test,
+                                                 latency_samples=self.model_trainer_config.latency_samples,
+                                                 batch_rows=self.model_trainer_config.latency_batch_rows)
+                          for name, serving_model in serving_models.items()}
+        candidate_report = {name: {"score": model_report[name], **asdict(serving_costs[name])}
+                            for name in model_report}
+        logging.info(f"Model candidates: {candidate_report}")
+
+        best_model_name = self.select_model(model_report, serving_costs)
         best_model = models[best_model_name]
         y_train_pred=best_model.predict(X_train)
 
@@ -111,34 +136,85 @@ class ModelTrainer:
         y_test_pred=best_model.predict(x_test)
         classification_test_metric=get_classification_score(y_true=y_test,y_pred=y_test_pred)
 
-        self.track_mlflow(best_model,classification_test_metric)
+        self.track_mlflow(best_model,classification_test_metric,serving_costs[best_model_name])
 
-        preprocessor = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
-            
         model_dir_path = os.path.dirname(self.model_trainer_config.trained_model_file_path)
         os.makedirs(model_dir_path, exist_ok=True)
 
-        ETL_Model = ETLModel(preprocessor = preprocessor, model= best_model)
+        ETL_Model = serving_models[best_model_name]
         save_object(self.model_trainer_config.trained_model_file_path, obj= ETLModel)
 
-        save_object("final_model/model.pkl",best_model)
-        
+        self.publish_final_model(preprocessor, best_model, ETL_Model.compiled_model)
+
 
         model_trainer_artifact=ModelTrainerArtifact(trained_model_file_path = self.model_trainer_config.trained_model_file_path,
                                                     train_metric_artifact   = classification_train_metric,
-                                                    test_metric_artifact    = classification_test_metric
+                                                    test_metric_artifact    = classification_test_metric,
+                                                    model_name              = best_model_name,
+                                                    serving_cost_artifact   = serving_costs[best_model_name],
+                                                    candidate_report        = candidate_report
                                                     )
         logging.info(f"Model trainer artifact: {model_trainer_artifact}")
         return model_trainer_artifact
 
 
+    def select_model(self, model_report: dict, serving_costs: dict) -> str:
+        """
+        Returns the name of the best scoring candidate whose serving cost is
+        within the configured p99 latency, model size and peak memory limits.
+        """
+        limits = {
+            "single_row_p99_ms": self.model_trainer_config.max_p99_latency_ms,
+            "model_size_mb":     self.model_trainer_config.max_model_size_mb,
+            "peak_memory_mb":    self.model_trainer_config.max_peak_memory_mb,
+        }
+        eligible = {}
+        for name, score in model_report.items():
+            over_limit = [f"{field} {getattr(serving_costs[name], field):,.2f} > {limit:,.2f}"
+                          for field, limit in limits.items()
+                          if limit is not None and getattr(serving_costs[name], field) > limit]
+            if over_limit:
+                logging.info(f"Model candidate {name} (score {score:.4f}) rejected: {', '.join(over_limit)}")
+            else:
+                eligible[name] = score
+        if not eligible:
+            raise Exception(f"No model candidate is within the serving limits {limits}")
+
+        best_model_name = max(eligible, key=eligible.get)
+        logging.info(f"Selected {best_model_name} (score {eligible[best_model_name]:.4f}) "
+                     f"from {len(eligible)} of {len(model_report)} candidates within {limits}")
+        return best_model_name
+
+    def publish_final_model(self, preprocessor, model, compiled_model: CompiledTreeEnsemble = None):
+        """
+        Publishes the preprocessor and model to the final model directory
+        served by the API. Concurrent trainings publish one at a time, and
+        the preprocessor is written before the model so the serving registry
+        never pairs a new preprocessor with an old model. The compiled model
+        is written in between, or an earlier one removed if this model
+        couldn't be compiled.
+        """
+        try:
+            with file_lock(self.model_trainer_config.publish_lock_file_path):
+                save_object(self.model_trainer_config.final_preprocessor_file_path, preprocessor)
+                compiled_model_file_path = self.model_trainer_config.final_compiled_model_file_path
+                if compiled_model is not None:
+                    compiled_model.save(compiled_model_file_path)
+                elif os.path.exists(compiled_model_file_path):
+                    os.remove(compiled_model_file_path)
+                save_object(self.model_trainer_config.final_model_file_path, model)
+            logging.info(f"Published final model to {os.path.dirname(self.model_trainer_config.final_model_file_path)}"
+                         f"{' with its compiled ensemble' if compiled_model is not None else ''}")
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
     def initiate_model_trainer(self):
         try:
             train_file_path = self.data_transformation_artifact.transformed_train_file_path
             test_file_path  = self.data_transformation_artifact.transformed_test_file_path
 
-            train_arr       = load_numpy_array_data(train_file_path)
-            test_arr        = load_numpy_array_data(test_file_path)
+            train_arr       = self._load_artifact(train_file_path, load_numpy_array_data)
+            test_arr        = self._load_artifact(test_file_path, load_numpy_array_data)
 
             x_train, y_train, x_test, y_test = (
                 train_arr[:, :-1],
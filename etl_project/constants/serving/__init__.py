@@ -0,0 +1,182 @@
+import os
+
+##################################################################################
+## Model Registry Constant Variables
+##################################################################################
+
+FINAL_MODEL_DIR                         : str   = "final_model"
+FINAL_PREPROCESSOR_FILE_NAME            : str   = "preprocessor.pkl"
+FINAL_MODEL_FILE_NAME                   : str   = "model.pkl"
+FINAL_COMPILED_MODEL_FILE_NAME          : str   = "model.npz"
+FINAL_MODEL_PUBLISH_LOCK_FILE_NAME      : str   = ".publish.lock"
+MODEL_REGISTRY_POLL_INTERVAL_SECONDS    : float = 2.0
+MODEL_REGISTRY_MEMORY_MAP               : bool  = os.getenv("MODEL_REGISTRY_MEMORY_MAP", "0") == "1"
+MODEL_REGISTRY_MMAP_DIR_NAME            : str   = ".mmap"
+
+##################################################################################
+## Prediction Constant Variables
+##################################################################################
+
+PREDICTION_COLUMN_NAME                  : str   = "predicted_column"
+STREAMING_CHUNK_ROWS                    : int   = 10_000
+STREAMING_UPLOAD_READ_SIZE              : int   = 1024 * 1024
+STREAMING_MEDIA_TYPES                   : dict  = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+##################################################################################
+## Columnar Formats Constant Variables
+##################################################################################
+
+ARROW_STREAM_MEDIA_TYPE                 : str   = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MEDIA_TYPE                   : str   = "application/vnd.apache.arrow.file"
+PARQUET_MEDIA_TYPE                      : str   = "application/vnd.apache.parquet"
+PREDICTION_INPUT_MEDIA_TYPES            : dict  = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    ARROW_STREAM_MEDIA_TYPE: "arrow",
+    ARROW_FILE_MEDIA_TYPE: "arrow",
+    PARQUET_MEDIA_TYPE: "parquet",
+    "application/x-parquet": "parquet",
+}
+PREDICTION_INPUT_FILE_EXTENSIONS        : dict  = {
+    ".csv": "csv",
+    ".arrow": "arrow",
+    ".arrows": "arrow",
+    ".feather": "arrow",
+    ".parquet": "parquet",
+}
+PREDICTION_OUTPUT_MEDIA_TYPES           : dict  = {
+    "json": "application/json",
+    "arrow": ARROW_STREAM_MEDIA_TYPE,
+    "parquet": PARQUET_MEDIA_TYPE,
+}
+
+##################################################################################
+## Compression Constant Variables
+##################################################################################
+
+CONTENT_ENCODINGS                       : dict  = {
+    "gzip": "gzip",
+    "x-gzip": "gzip",
+    "zstd": "zstd",
+}
+COMPRESSED_FILE_EXTENSIONS              : dict  = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+# Preferred first when the client accepts both at the same quality
+RESPONSE_ENCODINGS                      : tuple = ("zstd", "gzip")
+RESPONSE_COMPRESSION_MIN_BYTES          : int   = 1024
+RESPONSE_COMPRESSION_MEDIA_TYPES        : tuple = (
+    "application/json",
+    "application/x-ndjson",
+    "text/",
+    ARROW_STREAM_MEDIA_TYPE,
+)
+COMPRESSION_GZIP_LEVEL                  : int   = 6
+COMPRESSION_ZSTD_LEVEL                  : int   = 3
+DECOMPRESSION_WRITE_SIZE                : int   = 1024 * 1024
+# Chunks larger than this are (de)compressed in the threadpool, off the event loop
+COMPRESSION_THREADPOOL_BYTES            : int   = 256 * 1024
+
+##################################################################################
+## JSON Prediction Constant Variables
+##################################################################################
+
+PREDICT_JSON_MAX_RECORDS                : int   = 256
+
+##################################################################################
+## Micro Batching Constant Variables
+##################################################################################
+
+MICRO_BATCH_MAX_ROWS                    : int   = 2048
+MICRO_BATCH_MAX_WAIT_MS                 : float = 5.0
+
+##################################################################################
+## Live Prediction Constant Variables
+##################################################################################
+
+# Feature updates from all WebSocket connections arriving within the window are scored together
+LIVE_BATCH_WINDOW_MS                    : float = 2.0
+LIVE_BATCH_MAX_ROWS                     : int   = 2048
+# Messages a connection may have waiting for predictions before it stops being read
+LIVE_MAX_PENDING_MESSAGES               : int   = 256
+
+##################################################################################
+## Inference Executor Constant Variables
+##################################################################################
+
+SERVING_EXECUTOR_MODE                   : str   = os.getenv("SERVING_EXECUTOR_MODE", "process")
+# Inference processes of each server worker, each holding its own copy of the model; the pre-fork
+# server already runs a worker per core, so a couple are enough to keep scoring off its event loop
+SERVING_EXECUTOR_WORKERS                : int   = int(os.getenv("SERVING_EXECUTOR_WORKERS", 2))
+
+##################################################################################
+## Pre-fork Serving Constant Variables
+##################################################################################
+
+SERVING_HOST                            : str   = os.getenv("SERVING_HOST", "0.0.0.0")
+SERVING_PORT                            : int   = int(os.getenv("SERVING_PORT", 8000))
+SERVING_WORKERS                         : int   = int(os.getenv("SERVING_WORKERS", 1))
+SERVING_LISTEN_BACKLOG                  : int   = 2048
+
+##################################################################################
+## Admission Control Constant Variables
+##################################################################################
+
+ADMISSION_MAX_PENDING_ROWS              : int   = int(os.getenv("ADMISSION_MAX_PENDING_ROWS", 500_000))
+ADMISSION_RETRY_AFTER_SECONDS           : int   = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 1))
+ADMISSION_ROUTES                        : tuple = ("/predict", "/predict/json", "/predict/stream")
+SERVING_MAX_BODY_BYTES                  : int   = int(os.getenv("SERVING_MAX_BODY_BYTES", 256 * 1024 ** 2))
+# Bodies these routes read incrementally instead of buffering, so the size limit doesn't apply
+UNBUFFERED_BODY_ROUTES                  : tuple = ("/predict/stream",)
+
+##################################################################################
+## Prediction Cache Constant Variables
+##################################################################################
+
+PREDICTION_CACHE_MAX_ENTRIES            : int   = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", 200_000))
+PREDICTION_CACHE_TTL_SECONDS            : float = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 3600))
+
+##################################################################################
+## Prediction Result Store Constant Variables
+##################################################################################
+
+PREDICTION_RESULT_DIR                   : str   = os.path.join("prediction_output", "results")
+PREDICTION_RESULT_FILE_EXTENSION        : str   = ".parquet"
+PREDICTION_RESULT_COMPRESSION           : str   = "zstd"
+PREDICTION_RESULT_MAX_BYTES             : int   = int(os.getenv("PREDICTION_RESULT_MAX_BYTES", 1024 ** 3))
+PREDICTION_RESULT_MAX_COUNT             : int   = int(os.getenv("PREDICTION_RESULT_MAX_COUNT", 10_000))
+PREDICTION_RESULT_MAX_AGE_SECONDS       : float = float(os.getenv("PREDICTION_RESULT_MAX_AGE_SECONDS", 7 * 24 * 3600))
+# Writes are counted against the limits between scans of the result directory; it is scanned again
+# once a limit is crossed, or after this long to count other workers' results
+PREDICTION_RESULT_RESCAN_SECONDS        : float = 60.0
+# Once a size or count limit is crossed, the oldest results are removed until the store is down to this
+# fraction of both, so the writes that follow do not each cross it again
+PREDICTION_RESULT_LOW_WATER_RATIO       : float = 0.9
+PREDICTION_RESULT_STREAM_BATCH_ROWS     : int   = 10_000
+
+##################################################################################
+## Chunked Upload Constant Variables
+##################################################################################
+
+UPLOAD_DIR                              : str   = os.path.join("prediction_output", "uploads")
+UPLOAD_CHUNK_BYTES                      : int   = 8 * 1024 ** 2
+UPLOAD_MAX_BYTES                        : int   = int(os.getenv("UPLOAD_MAX_BYTES", 4 * 1024 ** 3))
+UPLOAD_MAX_AGE_SECONDS                  : float = float(os.getenv("UPLOAD_MAX_AGE_SECONDS", 24 * 3600))
+# How often a scorer checks for chunks appended by another worker process
+UPLOAD_POLL_SECONDS                     : float = 0.5
+UPLOAD_CHECKSUM_HEADER                  : str   = "X-Chunk-Sha256"
+
+##################################################################################
+## Training Jobs Constant Variables
+##################################################################################
+
+TRAINING_JOB_HISTORY_SIZE               : int   = 50
+# Job state files, shared by pre-forked workers
+TRAINING_JOB_DIR                        : str   = os.path.join("prediction_output", "training_jobs")
+TRAINING_JOB_EVENT_POLL_SECONDS         : float = 1.0
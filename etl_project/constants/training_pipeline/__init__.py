@@ -1,7 +1,5 @@
 import os 
 import sys
-import numpy as np
-import pandas as pd
 
 ##################################################################################
 ## Common Constant Variables 
@@ -12,10 +10,30 @@ SCHEMA_FILE_PATH      = os.path.join("data_schema", "schema.yaml")
 TARGET_COLUMN         = "Result"
 PIPELINE_NAME :  str  = "training_pipeline"
 ARTIFACT_DIR  :  str  = "artifacts"
+# "memory" hands each stage's artifacts to the next in process and writes them in the
+# background; "disk" has every stage write its artifacts and the next one read them back
+ARTIFACT_HANDOFF :  str  = os.getenv("ARTIFACT_HANDOFF", "memory")
 FILE_NAME     :  str  = "phisingData.csv"
 
 TRAIN_FILE_NAME = "train.csv"
 TEST_FILE_NAME  = "test.csv"
+# Feature store datasets (directories of Parquet files) of the ingested collection and its train/test split
+FULL_DATASET_NAME  = "full"
+TRAIN_DATASET_NAME = "train"
+TEST_DATASET_NAME  = "test"
+
+##################################################################################
+## Feature Store Constant Variables 
+##################################################################################
+
+FEATURE_STORE_COMPRESSION           : str   = "zstd"
+# Schema columns a dataset is partitioned by, a directory per value (hive style), so
+# a filter on them skips whole directories; e.g. "Division,Season" for the match data
+FEATURE_STORE_PARTITION_COLUMNS     : list  = [column for column in
+                                               os.getenv("FEATURE_STORE_PARTITION_COLUMNS", "").split(",") if column]
+# Rows per Parquet row group; a filter on other columns skips row groups by their min/max
+FEATURE_STORE_ROW_GROUP_ROWS        : int   = 128 * 1024
+FEATURE_STORE_BATCH_ROWS            : int   = 64 * 1024
 
 ##################################################################################
 ## Data Collection Constant Variables 
@@ -38,8 +56,33 @@ DATA_INGESTION_COLLECTION_NAME              : str   = "NETWORK_SECURITY_DATA"
 DATA_INGESTION_DATABASE_NAME                : str   = "ETL_PIPELINE"
 DATA_INGESTION_DIR_NAME                     : str   = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR            : str   = "feature_store"
-DATA_INGESTION_INGESTED_DIR                 : str   = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO       : float = 0.2
+# Documents per cursor batch; the server also caps a batch at 16 MiB
+DATA_INGESTION_MONGO_BATCH_SIZE             : int   = 20_000
+# Ranges of the partition field exported in parallel, each with its own cursor; 1 reads one cursor.
+# More ranges than cores still overlap the cursors' round trips
+DATA_INGESTION_EXPORT_PARTITIONS            : int   = int(os.getenv("DATA_INGESTION_EXPORT_PARTITIONS",
+                                                                    max(4, os.cpu_count() or 1)))
+DATA_INGESTION_PARTITION_FIELD              : str   = "_id"
+DATA_INGESTION_SAMPLES_PER_PARTITION        : int   = 32
+# Incremental ingestion: a Parquet snapshot of the collection kept across runs (outside the
+# per-run artifact dir), to which each run appends the documents past the last run's watermark
+DATA_INGESTION_INCREMENTAL                  : bool  = os.getenv("DATA_INGESTION_INCREMENTAL", "1") == "1"
+DATA_INGESTION_SNAPSHOT_DIR                 : str   = "feature_store_snapshot"
+DATA_INGESTION_SNAPSHOT_MANIFEST_FILE_NAME  : str   = "manifest.json"
+DATA_INGESTION_SNAPSHOT_LOCK_FILE_NAME      : str   = ".snapshot.lock"
+DATA_INGESTION_SNAPSHOT_COMPRESSION         : str   = "zstd"
+# Indexed, increasing field the watermark is kept on: "_id" (an ObjectId) or a date field. Both are
+# assigned before the insert commits, so a document can commit below a watermark already exported
+DATA_INGESTION_WATERMARK_FIELD              : str   = os.getenv("DATA_INGESTION_WATERMARK_FIELD", "_id")
+# Each run reads again the documents this many seconds below the watermark, skipping the ones already
+# exported, so inserts that commit up to this late (or from a client clock this far behind) are kept.
+DATA_INGESTION_WATERMARK_WINDOW_SECONDS     : float = float(os.getenv("DATA_INGESTION_WATERMARK_WINDOW_SECONDS", 60))
+# The _ids of the documents in the window are kept in the manifest and skipped with $nin, so the window
+# holds at most this many of the latest documents (a bulk insert can put any number in one second)
+DATA_INGESTION_WATERMARK_WINDOW_MAX_DOCS    : int   = 1_000
+# Delta files the snapshot may hold before they are compacted into one
+DATA_INGESTION_SNAPSHOT_MAX_PARTS           : int   = 16
 
 ##################################################################################
 ## Data Validation Constant Variables 
@@ -60,10 +103,15 @@ PREPROCESSING_OBJECT_FILE_NAME              : str = "preprocessing.pkl"
 DATA_TRANSFORMATION_DIR_NAME                : str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR    : str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR  : str = "transformed_object"
+# Donors kept in the imputer's index. Unset, it keeps every complete training row and imputes like
+# KNNImputer; set it to bound imputation latency on large training sets with a random sample of donors
+DATA_TRANSFORMATION_IMPUTER_MAX_DONORS      : int = (int(os.environ["DATA_TRANSFORMATION_IMPUTER_MAX_DONORS"])
+                                                     if os.getenv("DATA_TRANSFORMATION_IMPUTER_MAX_DONORS") else None)
 DATA_TRANSFORMATION_IMPUTER_PARAMS          : dict = {
-    "missing_values": np.nan,
+    "missing_values": float("nan"),
     "n_neighbors": 3,
-    "weights": "uniform"
+    "weights": "uniform",
+    "max_donors": DATA_TRANSFORMATION_IMPUTER_MAX_DONORS
 }
 
 ##################################################################################
@@ -76,6 +124,24 @@ MODEL_TRAINER_TRAINED_MODEL_DIR                     : str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME                    : str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE                        : float = 0.6
 MODEL_TRAINER_OVER_FIITING_UNDER_FITTING_THRESHOLD  : float = 0.05
+# Serving cost a candidate must stay within to be selected; None means no limit
+MODEL_TRAINER_MAX_P99_LATENCY_MS                    : float = 5.0
+MODEL_TRAINER_MAX_MODEL_SIZE_MB                     : float = 50.0
+MODEL_TRAINER_MAX_PEAK_MEMORY_MB                    : float = None
+MODEL_TRAINER_LATENCY_SAMPLES                       : int = 200
+MODEL_TRAINER_LATENCY_BATCH_ROWS                    : int = 1_000
 SAVED_MODEL_DIR = os.path.join("saved_models")
 
+##################################################################################
+## Batch Prediction Constant Variables 
+##################################################################################
+
+BATCH_PREDICTION_DIR                    : str = os.path.join("prediction_output", "batch")
+BATCH_PREDICTION_SHARD_ROWS             : int = 250_000
+BATCH_PREDICTION_WORKERS                : int = os.cpu_count() or 1
+BATCH_PREDICTION_MANIFEST_FILE_NAME     : str = "_manifest.json"
+BATCH_PREDICTION_PART_FILE_NAME         : str = "part-{shard:05d}.parquet"
+BATCH_PREDICTION_COMPRESSION            : str = "zstd"
+BATCH_PREDICTION_MONGO_BATCH_SIZE       : int = 10_000
+
 TRAINING_BUCKET_NAME = "etlprojectpipeline"
\ No newline at end of file
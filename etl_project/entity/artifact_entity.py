@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class DataCollectionArtifact:
@@ -13,6 +14,12 @@ class DataCollectionArtifact:
 class DataIngestionArtifact:
     trained_file_path   : str
     test_file_path      : str
+    # "full" when the snapshot was rebuilt from the whole collection, "incremental" otherwise
+    ingestion_mode      : str           = "full"
+    delta_rows          : int           = 0
+    snapshot_rows       : int           = 0
+    watermark           : Optional[str] = None
+    compacted           : bool          = False
 
 @dataclass 
 class DataValidationArtifact:
@@ -35,8 +42,33 @@ class ClassificationMetricArtifact:
     precision_score     : float
     recall_score        : float
 
+@dataclass
+class ServingCostArtifact:
+    single_row_p50_ms       : float
+    single_row_p99_ms       : float
+    batch_rows              : int
+    batch_ms                : float
+    model_size_mb           : float
+    peak_memory_mb          : float
+
 @dataclass
 class ModelTrainerArtifact:
     trained_model_file_path : str
     train_metric_artifact   : ClassificationMetricArtifact
-    test_metric_artifact    : ClassificationMetricArtifact
\ No newline at end of file
+    test_metric_artifact    : ClassificationMetricArtifact
+    model_name              : str
+    serving_cost_artifact   : ServingCostArtifact
+    candidate_report        : dict
+
+@dataclass
+class BatchPredictionArtifact:
+    output_dir          : str
+    manifest_file_path  : str
+    model_version       : str
+    total_shards        : int
+    scored_shards       : int
+    skipped_shards      : int
+    total_rows          : int
+    scored_rows         : int
+    rows_per_second     : float
+    worker_throughput   : dict
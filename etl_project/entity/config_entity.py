@@ -1,6 +1,7 @@
 from datetime import datetime
 import os 
 from etl_project.constants import training_pipeline
+from etl_project.constants import serving
 
 
 class TrainingPipelineConfig:
@@ -9,8 +10,9 @@ class TrainingPipelineConfig:
         self.pipeline_name = training_pipeline.PIPELINE_NAME
         self.artifact_name = training_pipeline.ARTIFACT_DIR
         self.artifact_dir = os.path.join(self.artifact_name, timestamp)
-        self.model_dir = os.path.join("final_model")
+        self.model_dir = os.path.join(serving.FINAL_MODEL_DIR)
         self.timestamp = timestamp
+        self.artifact_handoff = training_pipeline.ARTIFACT_HANDOFF
 
 class DataCollectionConfig:
     def __init__(self, timestamp=datetime.now()):
@@ -27,6 +29,15 @@ class DataCollectionConfig:
                                                        timestamp,
                                                        training_pipeline.ELO_DATA_FILE_NAME)
         
+class FeatureStoreConfig:
+    def __init__(self, schema_file_path: str = training_pipeline.SCHEMA_FILE_PATH):
+        self.schema_file_path       : str   = schema_file_path
+        self.partition_columns      : list  = list(training_pipeline.FEATURE_STORE_PARTITION_COLUMNS)
+        self.compression            : str   = training_pipeline.FEATURE_STORE_COMPRESSION
+        self.row_group_rows         : int   = training_pipeline.FEATURE_STORE_ROW_GROUP_ROWS
+        self.batch_rows             : int   = training_pipeline.FEATURE_STORE_BATCH_ROWS
+
+
 class DataIngestionConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig) -> None:
         self.data_ingestion_dir = os.path.join(
@@ -34,17 +45,40 @@ class DataIngestionConfig:
             training_pipeline.DATA_INGESTION_DIR_NAME,
         )
         self.feature_store_dir = os.path.join(
-            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
+            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR
+        )
+        self.feature_store_file_path = os.path.join(
+            self.feature_store_dir, training_pipeline.FULL_DATASET_NAME
         )
         self.training_file_path = os.path.join(
-            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TRAIN_FILE_NAME
+            self.feature_store_dir, training_pipeline.TRAIN_DATASET_NAME
         )
         self.test_file_path = os.path.join(
-            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TEST_FILE_NAME
+            self.feature_store_dir, training_pipeline.TEST_DATASET_NAME
         )
+        self.feature_store_config = FeatureStoreConfig()
         self.train_test_split_ratio = training_pipeline.DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
         self.collection_name = training_pipeline.DATA_INGESTION_COLLECTION_NAME
         self.database_name = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.mongo_batch_size = training_pipeline.DATA_INGESTION_MONGO_BATCH_SIZE
+        self.export_partitions = training_pipeline.DATA_INGESTION_EXPORT_PARTITIONS
+        self.partition_field = training_pipeline.DATA_INGESTION_PARTITION_FIELD
+        self.samples_per_partition = training_pipeline.DATA_INGESTION_SAMPLES_PER_PARTITION
+        self.incremental = training_pipeline.DATA_INGESTION_INCREMENTAL
+        self.snapshot_dir = os.path.join(
+            training_pipeline.DATA_INGESTION_SNAPSHOT_DIR, training_pipeline.DATA_INGESTION_COLLECTION_NAME
+        )
+        self.snapshot_manifest_file_path = os.path.join(
+            self.snapshot_dir, training_pipeline.DATA_INGESTION_SNAPSHOT_MANIFEST_FILE_NAME
+        )
+        self.snapshot_lock_file_path = os.path.join(
+            self.snapshot_dir, training_pipeline.DATA_INGESTION_SNAPSHOT_LOCK_FILE_NAME
+        )
+        self.snapshot_compression = training_pipeline.DATA_INGESTION_SNAPSHOT_COMPRESSION
+        self.watermark_field = training_pipeline.DATA_INGESTION_WATERMARK_FIELD
+        self.watermark_window_seconds = training_pipeline.DATA_INGESTION_WATERMARK_WINDOW_SECONDS
+        self.watermark_window_max_documents = training_pipeline.DATA_INGESTION_WATERMARK_WINDOW_MAX_DOCS
+        self.snapshot_max_parts = training_pipeline.DATA_INGESTION_SNAPSHOT_MAX_PARTS
 
 
 class DataValidationConfig:
@@ -55,10 +89,10 @@ class DataValidationConfig:
                                                            training_pipeline.DATA_VALIDATION_VALID_DIR)
         self.invalid_data_dir        : str  = os.path.join(self.data_valdiation_dir, 
                                                            training_pipeline.DATA_VALIDATION_INVALID_DIR)
-        self.valid_train_file_path   : str  = os.path.join(self.data_valdiation_dir, 
-                                                           training_pipeline.TRAIN_FILE_NAME)
-        self.valid_test_file_path    : str  = os.path.join(self.data_valdiation_dir, 
-                                                           training_pipeline.TEST_FILE_NAME)
+        self.valid_train_file_path   : str  = os.path.join(self.valid_data_dir, 
+                                                           training_pipeline.TRAIN_DATASET_NAME)
+        self.valid_test_file_path    : str  = os.path.join(self.valid_data_dir, 
+                                                           training_pipeline.TEST_DATASET_NAME)
         self.invalid_train_file_path : str  = os.path.join(self.invalid_data_dir, 
                                                            training_pipeline.TRAIN_FILE_NAME)
         self.invalid_test_file_path  : str  = os.path.join(self.invalid_data_dir, 
@@ -68,6 +102,7 @@ class DataValidationConfig:
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_DIR,
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_FILE_NAME
         )
+        self.feature_store_config                = FeatureStoreConfig()
 
 
 class DataTransformationConfig:
@@ -83,6 +118,7 @@ class DataTransformationConfig:
         self.transformed_object_file_path       : str = os.path.join(self.data_transformation_dir, 
                                                         training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
                                                         training_pipeline.PREPROCESSING_OBJECT_FILE_NAME,)
+        self.feature_store_config                       = FeatureStoreConfig()
         
         
 class ModelTrainerConfig:
@@ -95,4 +131,82 @@ class ModelTrainerConfig:
                                                         training_pipeline.MODEL_FILE_NAME
                                                         )
         self.expected_accuracy                  : float = training_pipeline.MODEL_TRAINER_EXPECTED_SCORE
-        self.overfitting_underfitting_threshold         = training_pipeline.MODEL_TRAINER_OVER_FIITING_UNDER_FITTING_THRESHOLD
\ No newline at end of file
+        self.overfitting_underfitting_threshold         = training_pipeline.MODEL_TRAINER_OVER_FIITING_UNDER_FITTING_THRESHOLD
+        self.max_p99_latency_ms                 : float = training_pipeline.MODEL_TRAINER_MAX_P99_LATENCY_MS
+        self.max_model_size_mb                  : float = training_pipeline.MODEL_TRAINER_MAX_MODEL_SIZE_MB
+        self.max_peak_memory_mb                 : float = training_pipeline.MODEL_TRAINER_MAX_PEAK_MEMORY_MB
+        self.latency_samples                    : int   = training_pipeline.MODEL_TRAINER_LATENCY_SAMPLES
+        self.latency_batch_rows                 : int   = training_pipeline.MODEL_TRAINER_LATENCY_BATCH_ROWS
+        self.final_preprocessor_file_path       : str   = os.path.join(
+                                                        training_pipeline_config.model_dir, serving.FINAL_PREPROCESSOR_FILE_NAME
+                                                        )
+        self.final_model_file_path              : str   = os.path.join(
+                                                        training_pipeline_config.model_dir, serving.FINAL_MODEL_FILE_NAME
+                                                        )
+        self.final_compiled_model_file_path     : str   = os.path.join(
+                                                        training_pipeline_config.model_dir, serving.FINAL_COMPILED_MODEL_FILE_NAME
+                                                        )
+        self.publish_lock_file_path             : str   = os.path.join(
+                                                        training_pipeline_config.model_dir, serving.FINAL_MODEL_PUBLISH_LOCK_FILE_NAME
+                                                        )
+
+
+class ModelRegistryConfig:
+    def __init__(self, model_dir: str = serving.FINAL_MODEL_DIR,
+                 memory_map: bool = serving.MODEL_REGISTRY_MEMORY_MAP):
+        self.model_dir                : str   = model_dir
+        self.preprocessor_file_path   : str   = os.path.join(model_dir, serving.FINAL_PREPROCESSOR_FILE_NAME)
+        self.model_file_path          : str   = os.path.join(model_dir, serving.FINAL_MODEL_FILE_NAME)
+        self.compiled_model_file_path : str   = os.path.join(model_dir, serving.FINAL_COMPILED_MODEL_FILE_NAME)
+        self.publish_lock_file_path   : str   = os.path.join(model_dir, serving.FINAL_MODEL_PUBLISH_LOCK_FILE_NAME)
+        self.poll_interval            : float = serving.MODEL_REGISTRY_POLL_INTERVAL_SECONDS
+        self.memory_map               : bool  = memory_map
+        self.mmap_dir                 : str   = os.path.join(model_dir, serving.MODEL_REGISTRY_MMAP_DIR_NAME)
+
+
+class PredictionResultStoreConfig:
+    def __init__(self, result_dir: str = serving.PREDICTION_RESULT_DIR):
+        self.result_dir             : str   = result_dir
+        self.file_extension         : str   = serving.PREDICTION_RESULT_FILE_EXTENSION
+        self.compression            : str   = serving.PREDICTION_RESULT_COMPRESSION
+        self.max_bytes              : int   = serving.PREDICTION_RESULT_MAX_BYTES
+        self.max_count              : int   = serving.PREDICTION_RESULT_MAX_COUNT
+        self.max_age_seconds        : float = serving.PREDICTION_RESULT_MAX_AGE_SECONDS
+        self.retention_scan_seconds : float = serving.PREDICTION_RESULT_RESCAN_SECONDS
+        self.low_water_ratio        : float = serving.PREDICTION_RESULT_LOW_WATER_RATIO
+
+
+class ChunkedUploadConfig:
+    def __init__(self, upload_dir: str = serving.UPLOAD_DIR):
+        self.upload_dir             : str   = upload_dir
+        self.chunk_bytes            : int   = serving.UPLOAD_CHUNK_BYTES
+        self.max_bytes              : int   = serving.UPLOAD_MAX_BYTES
+        self.max_age_seconds        : float = serving.UPLOAD_MAX_AGE_SECONDS
+        self.poll_seconds           : float = serving.UPLOAD_POLL_SECONDS
+        self.read_size              : int   = serving.STREAMING_UPLOAD_READ_SIZE
+        self.rows_per_block         : int   = serving.STREAMING_CHUNK_ROWS
+
+
+class BatchPredictionConfig:
+    def __init__(self, input_path: str = None, output_dir: str = None,
+                 shard_rows: int = training_pipeline.BATCH_PREDICTION_SHARD_ROWS,
+                 max_workers: int = training_pipeline.BATCH_PREDICTION_WORKERS,
+                 model_dir: str = serving.FINAL_MODEL_DIR, filters: list = None, timestamp=datetime.now()):
+        timestamp = timestamp.strftime("%m_%d_%Y_%H_%M_%S")
+        # Without an input path the pipeline scores the ingestion collection
+        self.input_path             : str   = input_path
+        self.database_name          : str   = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.collection_name        : str   = training_pipeline.DATA_INGESTION_COLLECTION_NAME
+        self.mongo_batch_size       : int   = training_pipeline.BATCH_PREDICTION_MONGO_BATCH_SIZE
+        self.output_dir             : str   = output_dir or os.path.join(training_pipeline.BATCH_PREDICTION_DIR, timestamp)
+        self.manifest_file_path     : str   = os.path.join(self.output_dir,
+                                                           training_pipeline.BATCH_PREDICTION_MANIFEST_FILE_NAME)
+        self.part_file_name         : str   = training_pipeline.BATCH_PREDICTION_PART_FILE_NAME
+        self.compression            : str   = training_pipeline.BATCH_PREDICTION_COMPRESSION
+        self.shard_rows             : int   = shard_rows
+        self.max_workers            : int   = max_workers
+        self.model_registry_config          = ModelRegistryConfig(model_dir, memory_map=False)
+        self.prediction_column_name : str   = serving.PREDICTION_COLUMN_NAME
+        self.target_column          : str   = training_pipeline.TARGET_COLUMN
+        self.filters                : list  = filters or []
+        self.feature_store_config           = FeatureStoreConfig()
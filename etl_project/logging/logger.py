@@ -6,12 +6,22 @@ from datetime import datetime
 LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 
 log_path = os.path.join(os.getcwd(), "logs", LOG_FILE)
-os.makedirs(log_path, exist_ok=True)
 
 LOG_FILE_PATH = os.path.join(log_path, LOG_FILE)
 
+
+class _DelayedFileHandler(logging.FileHandler):
+    """
+    Creates the log directory and file on the first record instead of at
+    import, so importing the package has no filesystem side effects.
+    """
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 logging.basicConfig(
-    filename = LOG_FILE_PATH,
+    handlers = [_DelayedFileHandler(LOG_FILE_PATH, delay=True)],
     format   = "[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s",
     level    = logging.INFO
 )
\ No newline at end of file
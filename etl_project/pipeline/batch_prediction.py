@@ -0,0 +1,392 @@
+import argparse
+import json
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+from etl_project.constants.training_pipeline import (
+    BATCH_PREDICTION_SHARD_ROWS,
+    BATCH_PREDICTION_WORKERS,
+    SCHEMA_FILE_PATH,
+)
+from etl_project.entity.artifact_entity import BatchPredictionArtifact
+from etl_project.entity.config_entity import BatchPredictionConfig, ModelRegistryConfig
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.serving.model_registry import LoadedModel, ModelRegistry
+from etl_project.utils.main_utils.feature_store import FeatureStore
+from etl_project.utils.main_utils.mongo_export import schema_column_types
+from etl_project.utils.main_utils.utils import read_yaml_file
+
+load_dotenv()
+
+MONGO_DB_URI = os.getenv("MONGO_DB_URI")
+
+# Model of the current pool worker process, set by _init_worker
+_worker_model: Optional[LoadedModel] = None
+
+
+def _init_worker(model_registry_config: ModelRegistryConfig, model_version: str) -> None:
+    global _worker_model
+    _worker_model = ModelRegistry(model_registry_config).refresh(force=True)
+    if _worker_model is None or _worker_model.version != model_version:
+        # A retrain was published after the run started; the run fails and
+        # resuming it reports the version mismatch
+        raise ETLPipelineException(f"Expected model version {model_version}, found "
+                                   f"{_worker_model.version if _worker_model else None}", sys)
+
+
+def _score_shard(shard: int, table: pa.Table, part_file_path: str, target_column: str,
+                 prediction_column_name: str, compression: str) -> dict:
+    """
+    Scores one shard with the worker's model and writes it, with the
+    prediction column added, to its part file.
+    """
+    started_at = time.perf_counter()
+    df = table.to_pandas()
+    features = df.drop(columns=[target_column], errors="ignore")
+    df[prediction_column_name] = _worker_model.model.predict(features)
+
+    tmp_file_path = os.path.join(os.path.dirname(part_file_path), "." + os.path.basename(part_file_path) + ".tmp")
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_file_path, compression=compression)
+    os.replace(tmp_file_path, part_file_path)
+    return {
+        "rows": len(df),
+        "file": os.path.basename(part_file_path),
+        "worker_pid": os.getpid(),
+        "seconds": time.perf_counter() - started_at,
+    }
+
+
+def _rechunk(batches: Iterator[pa.RecordBatch], shard_rows: int) -> Iterator[pa.Table]:
+    """
+    Regroups record batches of any size into tables of ``shard_rows`` rows
+    (the last one may be shorter).
+    """
+    pending, pending_rows = [], 0
+    for batch in batches:
+        while batch.num_rows:
+            take = min(shard_rows - pending_rows, batch.num_rows)
+            pending.append(batch.slice(0, take))
+            pending_rows += take
+            batch = batch.slice(take)
+            if pending_rows == shard_rows:
+                yield pa.Table.from_batches(pending)
+                pending, pending_rows = [], 0
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+
+class BatchPredictionPipeline:
+    """
+    Scores a CSV or Parquet file, a feature store dataset directory (read
+    with the config's filters pushed down), or the ingestion Mongo
+    collection, offline and writes the predictions as a directory of Parquet part
+    files, one per shard of ``shard_rows`` input rows.
+
+    The input is read once in this process and its shards are scored in a
+    process pool whose workers each load the model once. At most two shards
+    per worker are in flight, so memory stays bounded whatever the input
+    size. After every scored shard the manifest is rewritten; a run started
+    again on the same output directory skips the shards it lists and scores
+    only the rest. A run is tied to one model version and refuses to resume
+    with another.
+    """
+    def __init__(self, batch_prediction_config: BatchPredictionConfig) -> None:
+        try:
+            self.batch_prediction_config = batch_prediction_config
+            self.model_registry          = ModelRegistry(batch_prediction_config.model_registry_config)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _input_description(self) -> dict:
+        config = self.batch_prediction_config
+        if config.input_path is None:
+            return {"source": "mongo", "database": config.database_name, "collection": config.collection_name}
+        if os.path.isdir(config.input_path):
+            # The filters decide which rows are scored, so a run can only resume with the same ones
+            return {"source": "feature_store", "path": os.path.abspath(config.input_path),
+                    "filters": [list(condition) for condition in config.filters]}
+        source = "parquet" if config.input_path.endswith((".parquet", ".pq")) else "csv"
+        return {"source": source, "path": os.path.abspath(config.input_path)}
+
+    def load_manifest(self, model_version: str) -> dict:
+        """
+        Returns the manifest of an earlier run on the output directory, or a
+        new one. An earlier run on other input or another model version
+        can't be resumed.
+        """
+        try:
+            config = self.batch_prediction_config
+            manifest = {
+                "input": self._input_description(),
+                "shard_rows": config.shard_rows,
+                "model_version": model_version,
+                "status": "running",
+                "created_at": time.time(),
+                "shards": {},
+            }
+            if not os.path.exists(config.manifest_file_path):
+                return manifest
+
+            with open(config.manifest_file_path) as file:
+                previous = json.load(file)
+            for key in ("input", "model_version"):
+                if previous[key] != manifest[key]:
+                    raise ValueError(f"{config.output_dir} holds a run with {key} {previous[key]}, "
+                                     f"not {manifest[key]}; use a new output directory")
+            if previous["shard_rows"] != config.shard_rows:
+                logging.info(f"Resuming with the earlier run's shard size of {previous['shard_rows']} rows")
+                config.shard_rows = previous["shard_rows"]
+            return previous
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def write_manifest(self, manifest: dict) -> None:
+        file_path = self.batch_prediction_config.manifest_file_path
+        tmp_file_path = file_path + ".tmp"
+        with open(tmp_file_path, "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(tmp_file_path, file_path)
+
+    def _csv_shards(self, first_shard: int) -> Iterator[Tuple[int, pa.Table, None]]:
+        config = self.batch_prediction_config
+        # Feature types come from the schema, not from the first block, so
+        # a column that looks integral early on can still hold floats later
+        schema = read_yaml_file(SCHEMA_FILE_PATH)
+        column_types = {name: pa.float64() for column in schema["columns"] for name in column}
+        reader = pa_csv.open_csv(config.input_path,
+                                 convert_options=pa_csv.ConvertOptions(column_types=column_types))
+        for shard, table in enumerate(_rechunk(reader, config.shard_rows)):
+            if shard >= first_shard:
+                yield shard, table, None
+
+    def _parquet_shards(self, first_shard: int) -> Iterator[Tuple[int, pa.Table, None]]:
+        config = self.batch_prediction_config
+        parquet_file = pq.ParquetFile(config.input_path)
+        # Start reading at the row group holding the first row still to score
+        first_row, row_group, group_start = first_shard * config.shard_rows, 0, 0
+        metadata = parquet_file.metadata
+        while row_group < metadata.num_row_groups and group_start + metadata.row_group(row_group).num_rows <= first_row:
+            group_start += metadata.row_group(row_group).num_rows
+            row_group += 1
+        batches = parquet_file.iter_batches(row_groups=range(row_group, metadata.num_row_groups))
+
+        def skip_to_first_row():
+            skip = first_row - group_start
+            for batch in batches:
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                yield batch.slice(skip)
+                skip = 0
+
+        for shard, table in enumerate(_rechunk(skip_to_first_row(), config.shard_rows), start=first_shard):
+            yield shard, table, None
+
+    def _feature_store_shards(self, first_shard: int) -> Iterator[Tuple[int, pa.Table, None]]:
+        config = self.batch_prediction_config
+        batches = FeatureStore(config.feature_store_config).iter_batches(config.input_path,
+                                                                         filters=config.filters)
+
+        def skip_to_first_row():
+            # Batches come in the same order on every read; the filter is
+            # pushed down, so only matching rows are counted
+            skip = first_shard * config.shard_rows
+            for batch in batches:
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                yield batch.slice(skip)
+                skip = 0
+
+        for shard, table in enumerate(_rechunk(skip_to_first_row(), config.shard_rows), start=first_shard):
+            yield shard, table, None
+
+    def _mongo_shards(self, first_shard: int, resume_after: Optional[str]) -> Iterator[Tuple[int, pa.Table, str]]:
+        import pymongo
+        from bson import json_util
+
+        config = self.batch_prediction_config
+        client = pymongo.MongoClient(MONGO_DB_URI)
+        try:
+            collection = client[config.database_name][config.collection_name]
+            # Reading in _id order makes the shard boundaries the same on every run
+            query = {} if resume_after is None else {"_id": {"$gt": json_util.loads(resume_after)}}
+            cursor = collection.find(query).sort("_id", pymongo.ASCENDING).batch_size(config.mongo_batch_size)
+            shard, documents = first_shard, []
+            for document in cursor:
+                documents.append(document)
+                if len(documents) == config.shard_rows:
+                    yield shard, *self._documents_to_table(documents)
+                    shard, documents = shard + 1, []
+            if documents:
+                yield shard, *self._documents_to_table(documents)
+        finally:
+            client.close()
+
+    @staticmethod
+    def _documents_to_table(documents: list) -> Tuple[pa.Table, str]:
+        from bson import json_util
+
+        last_id = json_util.dumps(documents[-1]["_id"])
+        for document in documents:
+            del document["_id"]
+        return pa.Table.from_pylist(documents), last_id
+
+    def iter_shards(self, manifest: dict) -> Iterator[Tuple[int, pa.Table, Optional[str]]]:
+        """
+        Yields (shard, table, resume token) for every shard from the first
+        one the manifest doesn't list as scored. Files are read from the
+        start of that shard; the collection from the _id after the last
+        one of the contiguous scored shards before it.
+        """
+        done = manifest["shards"]
+        first_shard = 0
+        while str(first_shard) in done:
+            first_shard += 1
+
+        source = manifest["input"]["source"]
+        if source == "csv":
+            return self._csv_shards(first_shard)
+        if source == "parquet":
+            return self._parquet_shards(first_shard)
+        if source == "feature_store":
+            return self._feature_store_shards(first_shard)
+        resume_after = done[str(first_shard - 1)]["resume_after"] if first_shard else None
+        return self._mongo_shards(first_shard, resume_after)
+
+    @staticmethod
+    def throughput(shards: dict, wall_seconds: float) -> Tuple[float, dict]:
+        """
+        Returns the overall rows/s of the shards scored in this run and the
+        rows, busy seconds and rows/s of each worker.
+        """
+        workers = {}
+        for entry in shards.values():
+            worker = workers.setdefault(str(entry["worker_pid"]), {"shards": 0, "rows": 0, "seconds": 0.0})
+            worker["shards"]  += 1
+            worker["rows"]    += entry["rows"]
+            worker["seconds"] += entry["seconds"]
+        for worker in workers.values():
+            worker["rows_per_second"] = worker["rows"] / worker["seconds"] if worker["seconds"] else 0.0
+        rows = sum(entry["rows"] for entry in shards.values())
+        return (rows / wall_seconds if wall_seconds else 0.0), workers
+
+    def initiate_batch_prediction(self) -> BatchPredictionArtifact:
+        try:
+            config = self.batch_prediction_config
+            model_version = self.model_registry.published_version()
+            if model_version is None:
+                raise ETLPipelineException("Trained model not found. Please train the model first.", sys)
+
+            os.makedirs(config.output_dir, exist_ok=True)
+            manifest = self.load_manifest(model_version)
+            skipped_shards = len(manifest["shards"])
+            if skipped_shards:
+                logging.info(f"Resuming batch prediction in {config.output_dir}, {skipped_shards} shards already scored")
+
+            scored = {}
+            started_at = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=config.max_workers,
+                                     mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker,
+                                     initargs=(config.model_registry_config, model_version)) as pool:
+                in_flight = {}
+
+                def collect(return_when) -> None:
+                    done, _ = wait(in_flight, return_when=return_when)
+                    for future in done:
+                        shard, resume_after = in_flight.pop(future)
+                        entry = future.result()
+                        if resume_after is not None:
+                            entry["resume_after"] = resume_after
+                        manifest["shards"][str(shard)] = scored[str(shard)] = entry
+                        self.write_manifest(manifest)
+                        logging.info(f"Batch prediction shard {shard}: {entry['rows']} rows "
+                                     f"in {entry['seconds']:.2f}s (worker {entry['worker_pid']})")
+
+                try:
+                    for shard, table, resume_after in self.iter_shards(manifest):
+                        if str(shard) in manifest["shards"]:
+                            continue
+                        while len(in_flight) >= 2 * config.max_workers:
+                            collect(FIRST_COMPLETED)
+                        part_file_path = os.path.join(config.output_dir, config.part_file_name.format(shard=shard))
+                        future = pool.submit(_score_shard, shard, table, part_file_path, config.target_column,
+                                             config.prediction_column_name, config.compression)
+                        in_flight[future] = (shard, resume_after)
+                    while in_flight:
+                        collect(FIRST_COMPLETED)
+                except BaseException:
+                    # Keep what finished in the manifest so a rerun resumes after it
+                    for future in in_flight:
+                        future.cancel()
+                    raise
+
+            rows_per_second, workers = self.throughput(scored, time.perf_counter() - started_at)
+            manifest.update({
+                "status": "completed",
+                "completed_at": time.time(),
+                "total_shards": len(manifest["shards"]),
+                "total_rows": sum(entry["rows"] for entry in manifest["shards"].values()),
+                "last_run_throughput": {"rows_per_second": rows_per_second, "workers": workers},
+            })
+            self.write_manifest(manifest)
+
+            for pid, worker in workers.items():
+                logging.info(f"Batch prediction worker {pid}: {worker['rows']} rows, "
+                             f"{worker['rows_per_second']:,.0f} rows/s")
+            logging.info(f"Batch prediction scored {sum(entry['rows'] for entry in scored.values())} rows "
+                         f"at {rows_per_second:,.0f} rows/s into {config.output_dir}")
+
+            return BatchPredictionArtifact(
+                output_dir         = config.output_dir,
+                manifest_file_path = config.manifest_file_path,
+                model_version      = model_version,
+                total_shards       = manifest["total_shards"],
+                scored_shards      = len(scored),
+                skipped_shards     = skipped_shards,
+                total_rows         = manifest["total_rows"],
+                scored_rows        = sum(entry["rows"] for entry in scored.values()),
+                rows_per_second    = rows_per_second,
+                worker_throughput  = workers,
+            )
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file, a feature store dataset or the "
+                                                 "Mongo collection offline.")
+    parser.add_argument("--input", help="CSV or Parquet file, or a feature store dataset directory; "
+                                        "the Mongo collection if omitted")
+    parser.add_argument("--filter", action="append", default=[], metavar="COLUMN=VALUE",
+                        help="score only the feature store rows where COLUMN equals VALUE; repeatable")
+    parser.add_argument("--output-dir", help="run directory; pass an earlier one to resume it")
+    parser.add_argument("--shard-rows", type=int, default=BATCH_PREDICTION_SHARD_ROWS)
+    parser.add_argument("--workers", type=int, default=BATCH_PREDICTION_WORKERS)
+    args = parser.parse_args()
+
+    column_types = schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+    filters = []
+    for condition in args.filter:
+        column, _, value = condition.partition("=")
+        if column not in column_types:
+            parser.error(f"--filter column {column!r} is not in the schema")
+        filters.append((column, "==", np.dtype(column_types[column]).type(value).item()))
+
+    batch_prediction_artifact = BatchPredictionPipeline(BatchPredictionConfig(
+        input_path=args.input, output_dir=args.output_dir, shard_rows=args.shard_rows, max_workers=args.workers,
+        filters=filters,
+    )).initiate_batch_prediction()
+    print(batch_prediction_artifact)
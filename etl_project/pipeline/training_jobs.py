@@ -0,0 +1,257 @@
+import fcntl
+import json
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, is_dataclass
+from typing import Callable, Dict, Optional
+
+from etl_project.constants.serving import (
+    TRAINING_JOB_DIR,
+    TRAINING_JOB_EVENT_POLL_SECONDS,
+    TRAINING_JOB_HISTORY_SIZE,
+)
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.utils.main_utils.utils import file_lock
+
+JOB_QUEUED    = "queued"
+JOB_RUNNING   = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED    = "failed"
+
+JOB_ID_PATTERN       = re.compile(r"^[0-9a-f]{32}$")
+ACTIVE_JOB_FILE_NAME = "active"
+JOBS_LOCK_FILE_NAME  = "jobs.lock"
+
+
+def _run_training_job(events) -> None:
+    """
+    Entry point of the training worker process. Runs the pipeline and
+    reports stage events, then a final ``job`` event, on the events queue.
+    """
+    from etl_project.pipeline.training_pipeline import TrainingPipeline
+
+    try:
+        training_pipeline = TrainingPipeline(progress_callback=events.put)
+        model_trainer_artifact = training_pipeline.run_pipeline()
+        result = asdict(model_trainer_artifact) if is_dataclass(model_trainer_artifact) else None
+        events.put({"stage": "job", "status": JOB_SUCCEEDED, "timestamp": time.time(), "result": result})
+    except Exception as e:
+        events.put({"stage": "job", "status": JOB_FAILED, "timestamp": time.time(), "error": str(e)})
+
+
+@dataclass
+class TrainingJob:
+    job_id       : str
+    status       : str            = JOB_QUEUED
+    submitted_at : float          = field(default_factory=time.time)
+    started_at   : Optional[float] = None
+    finished_at  : Optional[float] = None
+    stages       : Dict[str, dict] = field(default_factory=dict)
+    error        : Optional[str]  = None
+    result       : Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        job = asdict(self)
+        end = self.finished_at or time.time()
+        job["duration_seconds"] = end - self.started_at if self.started_at else None
+        job["current_stage"] = next((name for name, stage in self.stages.items()
+                                     if stage["status"] == JOB_RUNNING), None)
+        return job
+
+
+class TrainingJobManager:
+    """
+    Runs TrainingPipeline as background jobs.
+
+    Each job runs in its own spawned worker process, so training never
+    competes with request handling for the serving process' GIL or memory.
+    The pipeline reads its configuration from the training constants, so
+    every submission asks for the same run: while a job is queued or
+    running, new submissions return that job instead of starting another
+    one. Stage progress and timings stream back from the worker through a
+    queue and can be read with ``get`` while the job runs.
+
+    Jobs are kept as ``<job_id>.json`` files in ``job_dir``, so pre-forked
+    serving workers share them: a submission to any worker is checked
+    against the active job under a file lock, and any worker reports any
+    job. The serving process that submitted a job supervises it and holds
+    a lock on ``<job_id>.running`` until the job is finished, so a job left
+    unfinished with that lock free lost its supervisor and is failed.
+    """
+    def __init__(self, on_success: Optional[Callable[[], None]] = None,
+                 history_size: int = TRAINING_JOB_HISTORY_SIZE, job_dir: str = TRAINING_JOB_DIR) -> None:
+        try:
+            self.on_success    = on_success
+            self.history_size  = history_size
+            self.job_dir       = job_dir
+            self._mp_context   = multiprocessing.get_context("spawn")
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _file_path(self, name: str) -> str:
+        return os.path.join(self.job_dir, name)
+
+    def _read_job(self, job_id: Optional[str]) -> Optional[TrainingJob]:
+        if not job_id or not JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self._file_path(job_id + ".json")) as file:
+                return TrainingJob(**json.load(file))
+        except FileNotFoundError:
+            return None
+
+    def _write_job(self, job: TrainingJob) -> None:
+        file_path = self._file_path(job.job_id + ".json")
+        with open(file_path + ".tmp", "w") as file:
+            json.dump(asdict(job), file)
+        os.replace(file_path + ".tmp", file_path)
+
+    def _read_active_id(self) -> Optional[str]:
+        try:
+            with open(self._file_path(ACTIVE_JOB_FILE_NAME)) as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def _is_supervised(self, job_id: str) -> bool:
+        try:
+            fd = os.open(self._file_path(job_id + ".running"), os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+
+    def _reap(self, job: TrainingJob) -> TrainingJob:
+        """
+        Returns job, failed if it is unfinished and nothing supervises it.
+        """
+        if job.finished_at is not None or self._is_supervised(job.job_id):
+            return job
+        # Read again: the supervisor may have finished the job before releasing its lock
+        job = self._read_job(job.job_id) or job
+        if job.finished_at is None:
+            job.status      = JOB_FAILED
+            job.finished_at = time.time()
+            job.error       = "The serving process supervising the job exited"
+            self._write_job(job)
+        return job
+
+    def _remove_old_jobs(self) -> None:
+        with os.scandir(self.job_dir) as scan:
+            jobs = [entry for entry in scan
+                    if entry.name.endswith(".json") and JOB_ID_PATTERN.match(entry.name[:-len(".json")])]
+        jobs.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in jobs[:max(len(jobs) - self.history_size, 0)]:
+            os.remove(entry.path)
+
+    def submit(self) -> dict:
+        """
+        Starts a training job, or returns the active one. The returned dict
+        has a ``deduplicated`` flag telling which of the two happened.
+        """
+        try:
+            os.makedirs(self.job_dir, exist_ok=True)
+            with file_lock(self._file_path(JOBS_LOCK_FILE_NAME)):
+                active_job = self._read_job(self._read_active_id())
+                if active_job is not None:
+                    active_job = self._reap(active_job)
+                    if active_job.finished_at is None:
+                        return {**active_job.to_dict(), "deduplicated": True}
+
+                job = TrainingJob(job_id=uuid.uuid4().hex)
+                running_lock = open(self._file_path(job.job_id + ".running"), "a")
+                fcntl.flock(running_lock, fcntl.LOCK_EX)
+                self._write_job(job)
+                with open(self._file_path(ACTIVE_JOB_FILE_NAME), "w") as file:
+                    file.write(job.job_id)
+                self._remove_old_jobs()
+
+                threading.Thread(target=self._supervise, args=(job, running_lock),
+                                 name=f"training-job-{job.job_id}", daemon=True).start()
+                logging.info(f"Training job {job.job_id} submitted")
+                return {**job.to_dict(), "deduplicated": False}
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._read_job(job_id)
+        return self._reap(job).to_dict() if job is not None else None
+
+    def _apply_event(self, job: TrainingJob, event: dict) -> None:
+        if event["stage"] == "job":
+            job.status      = event["status"]
+            job.finished_at = event["timestamp"]
+            job.error       = event.get("error")
+            job.result      = event.get("result")
+        else:
+            stage = job.stages.setdefault(event["stage"], {})
+            stage["status"] = event["status"]
+            if event["status"] == JOB_RUNNING:
+                stage["started_at"] = event["timestamp"]
+            else:
+                stage["duration_seconds"] = event.get("duration_seconds")
+                if "error" in event:
+                    stage["error"] = event["error"]
+        self._write_job(job)
+
+    def _drain_events(self, job: TrainingJob, events, process) -> None:
+        """
+        Applies the events a worker that has exited left on the queue; its
+        final ``job`` event can still be in flight when the poll times out.
+        The job fails only if that event never arrives or the worker exited
+        with an error.
+        """
+        # Once joined, the worker's queue feeder has flushed every event it put
+        process.join()
+        while job.finished_at is None:
+            try:
+                self._apply_event(job, events.get_nowait())
+            except queue.Empty:
+                break
+        if job.finished_at is None or process.exitcode != 0:
+            error = job.error or f"Training worker exited with code {process.exitcode}"
+            self._apply_event(job, {"stage": "job", "status": JOB_FAILED, "timestamp": time.time(), "error": error})
+
+    def _supervise(self, job: TrainingJob, running_lock) -> None:
+        events = self._mp_context.Queue()
+        process = self._mp_context.Process(target=_run_training_job, args=(events,),
+                                           name=f"training-job-{job.job_id}")
+        try:
+            job.status     = JOB_RUNNING
+            job.started_at = time.time()
+            self._write_job(job)
+            process.start()
+
+            while job.finished_at is None:
+                try:
+                    self._apply_event(job, events.get(timeout=TRAINING_JOB_EVENT_POLL_SECONDS))
+                except queue.Empty:
+                    if not process.is_alive():
+                        self._drain_events(job, events, process)
+            process.join()
+
+            if job.status == JOB_SUCCEEDED and self.on_success is not None:
+                self.on_success()
+            logging.info(f"Training job {job.job_id} {job.status}")
+        except Exception as e:
+            logging.error(f"Training job {job.job_id} supervisor failed: {e}")
+            self._apply_event(job, {"stage": "job", "status": JOB_FAILED, "timestamp": time.time(), "error": str(e)})
+        finally:
+            events.close()
+            with file_lock(self._file_path(JOBS_LOCK_FILE_NAME)):
+                if self._read_active_id() == job.job_id:
+                    os.remove(self._file_path(ACTIVE_JOB_FILE_NAME))
+            os.remove(running_lock.name)
+            running_lock.close()
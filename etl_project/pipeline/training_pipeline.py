@@ -1,5 +1,7 @@
 import os 
 import sys
+import time
+from typing import Callable, Optional
 from etl_project.exception.exception import ETLPipelineException
 from etl_project.logging.logger import logging
 from etl_project.components.data_ingestion import DataIngestion
@@ -7,6 +9,7 @@ from etl_project.components.data_validation import DataValidation
 from etl_project.components.data_transformation import DataTransformation
 from etl_project.components.model_trainer import ModelTrainer
 from etl_project.cloud.s3_sync import S3Sync
+from etl_project.utils.main_utils.artifact_handoff import ArtifactHandoff
 from etl_project.constants.training_pipeline import TRAINING_BUCKET_NAME
 from etl_project.entity.config_entity import (
                                               TrainingPipelineConfig, 
@@ -23,15 +26,43 @@ from etl_project.entity.artifact_entity import (
                                                 )
 
 class TrainingPipeline:
-    def __init__(self) -> None:
+    def __init__(self, progress_callback: Optional[Callable[[dict], None]] = None) -> None:
+        """
+        progress_callback, if given, is called with an event dict
+        ({"stage", "status", "timestamp", ...}) when each stage starts,
+        completes or fails.
+        """
         self.training_pipeline_config = TrainingPipelineConfig()
         self.s3_sync = S3Sync()
+        self.progress_callback = progress_callback
+        # Stages hand their artifacts on in memory and persist them in the background
+        self.artifact_handoff = (ArtifactHandoff() if self.training_pipeline_config.artifact_handoff == "memory"
+                                 else None)
+
+    def _report(self, stage: str, status: str, **details) -> None:
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback({"stage": stage, "status": status, "timestamp": time.time(), **details})
+        except Exception as e:
+            logging.warning(f"Training progress callback failed: {e}")
+
+    def run_stage(self, stage: str, stage_fn: Callable, *args):
+        started_at = time.perf_counter()
+        self._report(stage, "running")
+        try:
+            result = stage_fn(*args)
+        except Exception as e:
+            self._report(stage, "failed", duration_seconds=time.perf_counter() - started_at, error=str(e))
+            raise
+        self._report(stage, "succeeded", duration_seconds=time.perf_counter() - started_at)
+        return result
 
     def start_data_ingestion(self):
         try:
             logging.info("Data Ingestion started.")
             data_ingestion_config = DataIngestionConfig(self.training_pipeline_config)
-            data_ingestion = DataIngestion(data_ingestion_config)
+            data_ingestion = DataIngestion(data_ingestion_config, artifact_handoff=self.artifact_handoff)
             data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
             logging.info("Data Ingestion Completed.")
             return data_ingestion_artifact
@@ -43,7 +74,8 @@ class TrainingPipeline:
             logging.info("Data Validation started.")
             data_validation_config = DataValidationConfig(self.training_pipeline_config)
             data_validation = DataValidation(data_validation_config  = data_validation_config,
-                                            data_ingestion_artifact = data_ingestion_artifact)
+                                            data_ingestion_artifact = data_ingestion_artifact,
+                                            artifact_handoff        = self.artifact_handoff)
             data_validation_artifact = data_validation.initiate_data_validation()
             logging.info("Data Ingestion completed.")
             return data_validation_artifact
@@ -56,7 +88,8 @@ class TrainingPipeline:
             data_transformation_config = DataTransformationConfig(self.training_pipeline_config)
             data_transformation = DataTransformation(
                                                     data_transformation_config=data_transformation_config,
-                                                    data_validation_artifact=data_validation_artifact
+                                                    data_validation_artifact=data_validation_artifact,
+                                                    artifact_handoff=self.artifact_handoff
                                                     )
             data_transformation_artifact = data_transformation.initiate_data_transformation()
             logging.info("Data Transformation completed.")
@@ -70,7 +103,8 @@ class TrainingPipeline:
             model_training_config = ModelTrainerConfig(self.training_pipeline_config)
             model_training = ModelTrainer(
                                             data_transformation_artifact=data_transformation_artifact,
-                                            model_trainer_config=model_training_config
+                                            model_trainer_config=model_training_config,
+                                            artifact_handoff=self.artifact_handoff
                                         )
             model_training_artifact = model_training.initiate_model_trainer()
             logging.info("Model Training completed.")
@@ -93,17 +127,32 @@ class TrainingPipeline:
         except Exception as e:
             raise ETLPipelineException(e,sys)
     
+    def persist_artifacts(self):
+        try:
+            if self.artifact_handoff is not None:
+                self.artifact_handoff.wait()
+        except Exception as e:
+            raise ETLPipelineException(e,sys)
+
     def run_pipeline(self):
         try:
-            data_ingestion_artifact         = self.start_data_ingestion()
-            data_validation_artifact        = self.start_data_validation(data_ingestion_artifact)
-            data_transformation_artifact    = self.start_data_transformation(data_validation_artifact)
-            model_trainer_artifact          = self.start_model_training(data_transformation_artifact)
+            data_ingestion_artifact         = self.run_stage("data_ingestion", self.start_data_ingestion)
+            data_validation_artifact        = self.run_stage("data_validation", self.start_data_validation,
+                                                             data_ingestion_artifact)
+            data_transformation_artifact    = self.run_stage("data_transformation", self.start_data_transformation,
+                                                             data_validation_artifact)
+            model_trainer_artifact          = self.run_stage("model_training", self.start_model_training,
+                                                             data_transformation_artifact)
 
-            self.sync_artifact_dir_to_s3()
-            self.sync_saved_model_dir_to_s3()
+            # The artifact dir is complete once the background writes are done
+            self.run_stage("persist_artifacts", self.persist_artifacts)
+            self.run_stage("sync_artifact_dir_to_s3", self.sync_artifact_dir_to_s3)
+            self.run_stage("sync_saved_model_dir_to_s3", self.sync_saved_model_dir_to_s3)
             
             return model_trainer_artifact
 
         except Exception as e:
-            raise ETLPipelineException(e, sys)
\ No newline at end of file
+            raise ETLPipelineException(e, sys)
+        finally:
+            if self.artifact_handoff is not None:
+                self.artifact_handoff.close()
\ No newline at end of file
@@ -0,0 +1,203 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from etl_project.constants.serving import (
+    ADMISSION_MAX_PENDING_ROWS,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    ADMISSION_ROUTES,
+    SERVING_MAX_BODY_BYTES,
+    UNBUFFERED_BODY_ROUTES,
+)
+from etl_project.logging.logger import logging
+from etl_project.serving.metrics import (
+    ADMISSION_CAPACITY_ROWS,
+    ADMISSION_PENDING_ROWS,
+    ADMISSION_REJECTED_TOTAL,
+    ADMISSION_WAITING_REQUESTS,
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, rows: int, pending_rows: int, retry_after: int) -> None:
+        message = f"Server is at capacity: {pending_rows:,} rows pending"
+        super().__init__(message + (f", {rows:,} more requested" if rows else ""))
+        self.rows         = rows
+        self.pending_rows = pending_rows
+        self.retry_after  = retry_after
+
+
+def rejected_response(message: str, status_code: int = 429,
+                      retry_after: Optional[int] = ADMISSION_RETRY_AFTER_SECONDS) -> JSONResponse:
+    headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+    return JSONResponse({"status": "error", "message": message}, status_code=status_code, headers=headers)
+
+
+class AdmissionController:
+    """
+    Bounds the inference work a worker has pending, counted in rows.
+
+    ``admit`` holds a request's rows from the time it is parsed until it
+    is scored. While the pending rows plus the new ones would go over
+    ``max_pending_rows`` the request is rejected right away, or with
+    ``wait=True`` (for streaming requests) it waits its turn, which stops
+    the body from being read and pushes back on the client. A request
+    larger than the whole capacity is only admitted when nothing else is
+    pending. All state lives on the event loop, so no lock is needed.
+    """
+    def __init__(self, max_pending_rows: int = ADMISSION_MAX_PENDING_ROWS,
+                 retry_after_seconds: int = ADMISSION_RETRY_AFTER_SECONDS) -> None:
+        self.max_pending_rows    = max_pending_rows
+        self.retry_after_seconds = retry_after_seconds
+        self.pending_rows        = 0
+        self._waiters            : Deque[Tuple[int, asyncio.Future]] = deque()
+        self._pending_gauge      = ADMISSION_PENDING_ROWS.labels()
+        self._waiting_gauge      = ADMISSION_WAITING_REQUESTS.labels()
+        ADMISSION_CAPACITY_ROWS.labels().set(max_pending_rows)
+
+    def has_capacity(self, rows: int = 1) -> bool:
+        """
+        Whether ``rows`` more rows would be admitted now. Waiting streams
+        go first, so there is no capacity while any are queued.
+        """
+        if self._waiters:
+            return False
+        return self.pending_rows == 0 or self.pending_rows + rows <= self.max_pending_rows
+
+    def reject(self, route: str, rows: int = 0) -> AdmissionRejected:
+        ADMISSION_REJECTED_TOTAL.labels(route, "queue_full").inc()
+        return AdmissionRejected(rows, self.pending_rows, self.retry_after_seconds)
+
+    def _reserve(self, rows: int) -> None:
+        self.pending_rows += rows
+        self._pending_gauge.set(self.pending_rows)
+
+    def _release(self, rows: int) -> None:
+        self.pending_rows -= rows
+        # Wake waiting streams in arrival order while their rows fit
+        while self._waiters:
+            rows_waiting, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if self.pending_rows and self.pending_rows + rows_waiting > self.max_pending_rows:
+                break
+            self._waiters.popleft()
+            self.pending_rows += rows_waiting
+            future.set_result(None)
+        self._pending_gauge.set(self.pending_rows)
+        self._waiting_gauge.set(len(self._waiters))
+
+    async def _wait(self, rows: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((rows, future))
+        self._waiting_gauge.set(len(self._waiters))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Woken and cancelled at once: hand the reserved rows back
+                self._release(rows)
+            else:
+                future.cancel()
+                self._release(0)
+            raise
+
+    @asynccontextmanager
+    async def admit(self, rows: int, route: str, wait: bool = False) -> AsyncIterator[None]:
+        """
+        Holds ``rows`` of capacity for the body of the ``async with``.
+        Raises AdmissionRejected if they don't fit and ``wait`` is False.
+        """
+        if self.has_capacity(rows):
+            self._reserve(rows)
+        elif wait:
+            await self._wait(rows)
+        else:
+            raise self.reject(route, rows)
+        try:
+            yield
+        finally:
+            self._release(rows)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware rejecting requests before their body is read.
+
+    Requests to ``admission_routes`` get a 429 with Retry-After while the
+    controller has no capacity left. Other bodies are limited to
+    ``max_body_bytes`` as they are received: a larger Content-Length is
+    refused up front, and a body that grows past the limit is cut off (the
+    endpoint sees the client disconnect) and answered with a 413 instead of
+    whatever the endpoint returns. Routes in ``unbuffered_routes`` read
+    their body incrementally and are not size limited.
+    """
+    def __init__(self, app, controller: AdmissionController, max_body_bytes: int = SERVING_MAX_BODY_BYTES,
+                 admission_routes: tuple = ADMISSION_ROUTES,
+                 unbuffered_routes: tuple = UNBUFFERED_BODY_ROUTES) -> None:
+        self.app               = app
+        self.controller        = controller
+        self.max_body_bytes    = max_body_bytes
+        self.admission_routes  = frozenset(admission_routes)
+        self.unbuffered_routes = frozenset(unbuffered_routes)
+
+    def _too_large_response(self, path: str) -> JSONResponse:
+        ADMISSION_REJECTED_TOTAL.labels(path, "body_too_large").inc()
+        logging.info(f"Rejected a request to {path}: body over {self.max_body_bytes:,} bytes")
+        return rejected_response(f"Request body is larger than the {self.max_body_bytes:,} byte limit",
+                                 status_code=413, retry_after=None)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in self.admission_routes and not self.controller.has_capacity():
+            rejected = self.controller.reject(path)
+            await rejected_response(str(rejected), retry_after=rejected.retry_after)(scope, receive, send)
+            return
+
+        if path in self.unbuffered_routes or self.max_body_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body_bytes:
+                await self._too_large_response(path)(scope, receive, send)
+                return
+
+        received_bytes = 0
+        exceeded = response_started = False
+
+        async def limited_receive():
+            nonlocal received_bytes, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received_bytes += len(message.get("body", b""))
+                if received_bytes > self.max_body_bytes:
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def limited_send(message) -> None:
+            nonlocal response_started
+            if exceeded and not response_started:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            if not exceeded or response_started:
+                raise
+        if exceeded and not response_started:
+            await self._too_large_response(path)(scope, receive, send)
@@ -0,0 +1,98 @@
+import asyncio
+import sys
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from etl_project.constants.serving import MICRO_BATCH_MAX_ROWS, MICRO_BATCH_MAX_WAIT_MS
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.serving.executor import InferenceExecutor
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction calls into one model call.
+
+    Frames are queued until ``max_rows`` rows are pending or the first one
+    has waited ``max_wait_ms``, then scored with a single vectorized
+    ``ETLModel.predict`` on the inference executor over the concatenated
+    batch and the predictions are split back to each caller. Only frames
+    with identical columns are batched together. Frames of ``max_rows``
+    rows or more skip the queue.
+    """
+    def __init__(self, executor: InferenceExecutor, max_rows: int = MICRO_BATCH_MAX_ROWS,
+                 max_wait_ms: float = MICRO_BATCH_MAX_WAIT_MS) -> None:
+        try:
+            self.executor       = executor
+            self.max_rows       = max_rows
+            self.max_wait       = max_wait_ms / 1000
+            self._pending       : Dict[tuple, List[Tuple[pd.DataFrame, asyncio.Future]]] = {}
+            self._pending_rows  : Dict[tuple, int] = {}
+            self._timers        : Dict[tuple, asyncio.TimerHandle] = {}
+            # The event loop only keeps weak references to tasks, so running batches are held here
+            self._running       : Set[asyncio.Task] = set()
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    async def predict(self, df: pd.DataFrame) -> np.ndarray:
+        if len(df) >= self.max_rows:
+            return await self.executor.predict(df)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = tuple(df.columns)
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((df, future))
+        self._pending_rows[key] = self._pending_rows.get(key, 0) + len(df)
+
+        if self._pending_rows[key] >= self.max_rows:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+
+        return self._unwrap(await future)
+
+    @staticmethod
+    def _unwrap(result):
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def _flush(self, key: tuple) -> None:
+        batch = self._pending.pop(key, [])
+        self._pending_rows.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[Tuple[pd.DataFrame, asyncio.Future]]) -> None:
+        results = await self._predict_batch([df for df, _ in batch])
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _predict_batch(self, frames: List[pd.DataFrame]) -> list:
+        """
+        Returns one prediction array, or the exception raised for it, per
+        frame. If the combined call fails, each frame is retried on its own
+        so one malformed upload can't fail the requests batched with it.
+        """
+        try:
+            if len(frames) == 1:
+                return [await self.executor.predict(frames[0])]
+            y_pred = await self.executor.predict(pd.concat(frames, ignore_index=True))
+            return np.split(y_pred, np.cumsum([len(df) for df in frames])[:-1])
+        except Exception as e:
+            if len(frames) == 1:
+                return [e]
+            logging.error(f"Batched prediction of {len(frames)} frames failed, retrying individually: {e}")
+
+        return await asyncio.gather(*[self.executor.predict(df) for df in frames],
+                                    return_exceptions=True)
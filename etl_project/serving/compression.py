@@ -0,0 +1,326 @@
+import os
+import zlib
+from typing import AsyncIterator, Iterator, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    from compression import zstd
+except ImportError:  # Python < 3.14
+    from backports import zstd
+
+from etl_project.constants.serving import (
+    COMPRESSED_FILE_EXTENSIONS,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_THREADPOOL_BYTES,
+    COMPRESSION_ZSTD_LEVEL,
+    CONTENT_ENCODINGS,
+    DECOMPRESSION_WRITE_SIZE,
+    RESPONSE_COMPRESSION_MEDIA_TYPES,
+    RESPONSE_COMPRESSION_MIN_BYTES,
+    RESPONSE_ENCODINGS,
+)
+
+ENCODING_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+
+class UnsupportedEncoding(Exception):
+    pass
+
+
+class DecompressedBodyTooLarge(Exception):
+    pass
+
+
+def request_encoding(content_encoding: Optional[str]) -> Optional[str]:
+    """
+    Returns "gzip" or "zstd" for a request's Content-Encoding header, or
+    None for no header or "identity". Raises UnsupportedEncoding otherwise.
+    """
+    content_encoding = (content_encoding or "").strip().lower()
+    if content_encoding in ("", "identity"):
+        return None
+    encoding = CONTENT_ENCODINGS.get(content_encoding)
+    if encoding is None:
+        raise UnsupportedEncoding(f"Unsupported Content-Encoding: {content_encoding}. "
+                                  f"Use one of {sorted(set(CONTENT_ENCODINGS.values()))}")
+    return encoding
+
+
+def split_compressed_filename(filename: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Splits "fixtures.csv.gz" into ("fixtures.csv", "gzip"). Names without a
+    compression extension are returned unchanged with no encoding.
+    """
+    if not filename:
+        return filename, None
+    stem, extension = os.path.splitext(filename)
+    encoding = COMPRESSED_FILE_EXTENSIONS.get(extension.lower())
+    return (stem, encoding) if encoding is not None else (filename, None)
+
+
+def sniff_encoding(data: bytes) -> Optional[str]:
+    """
+    Recognises gzip and zstd data by their magic bytes. CSV, JSON, Arrow
+    and Parquet never start with either.
+    """
+    return next((encoding for magic, encoding in ENCODING_MAGIC.items() if data.startswith(magic)), None)
+
+
+def negotiate_response_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Picks "zstd" or "gzip" from an Accept-Encoding header, or None if the
+    client accepts neither.
+    """
+    qualities = {}
+    for entry in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        coding = coding.lower()
+        if coding == "*":
+            for encoding in RESPONSE_ENCODINGS:
+                qualities.setdefault(encoding, quality)
+        elif CONTENT_ENCODINGS.get(coding) in RESPONSE_ENCODINGS:
+            qualities[CONTENT_ENCODINGS[coding]] = quality
+
+    best_encoding, best_quality = None, 0.0
+    for encoding in RESPONSE_ENCODINGS:
+        if qualities.get(encoding, 0.0) > best_quality:
+            best_encoding, best_quality = encoding, qualities[encoding]
+    return best_encoding
+
+
+class StreamDecompressor:
+    """
+    Incremental gzip or zstd decompression whose output comes in pieces of
+    at most DECOMPRESSION_WRITE_SIZE bytes, so a small upload that inflates
+    to gigabytes is caught at ``max_bytes`` instead of after it was fully
+    decompressed. Concatenated gzip members and zstd frames are read as one
+    stream.
+    """
+    def __init__(self, encoding: str, max_bytes: Optional[int] = None) -> None:
+        if encoding not in ("gzip", "zstd"):
+            raise UnsupportedEncoding(f"Unsupported encoding: {encoding}")
+        self.encoding      = encoding
+        self.max_bytes     = max_bytes
+        self.output_bytes  = 0
+        self._in_member    = False
+        self._decompressor = self._new_decompressor()
+
+    def _new_decompressor(self):
+        if self.encoding == "gzip":
+            return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        return zstd.ZstdDecompressor()
+
+    def _count(self, piece: bytes) -> bytes:
+        self.output_bytes += len(piece)
+        if self.max_bytes is not None and self.output_bytes > self.max_bytes:
+            raise DecompressedBodyTooLarge(f"Decompressed body is larger than the {self.max_bytes:,} byte limit")
+        return piece
+
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        """
+        Yields the output of data piece by piece. Each piece is decompressed
+        when the next one is asked for, so nothing past the limit is.
+        """
+        while True:
+            if data:
+                self._in_member = True
+            piece = self._decompressor.decompress(data, DECOMPRESSION_WRITE_SIZE)
+            if piece:
+                yield self._count(piece)
+            if self._decompressor.eof:
+                data = self._decompressor.unused_data
+                self._decompressor = self._new_decompressor()
+                self._in_member = False
+                if not data:
+                    return
+            elif self.encoding == "gzip":
+                # Input zlib couldn't use within max_length comes back as unconsumed_tail,
+                # a full piece may still have more output buffered
+                data = self._decompressor.unconsumed_tail
+                if not data and len(piece) < DECOMPRESSION_WRITE_SIZE:
+                    return
+            else:
+                # The zstd decompressor keeps unused input itself, and asks for more
+                # once all of it was decompressed
+                data = b""
+                if self._decompressor.needs_input:
+                    return
+
+    def finish(self) -> None:
+        """
+        Raises ValueError if the input ended in the middle of a gzip member or
+        zstd frame.
+        """
+        if self._in_member:
+            raise ValueError("Compressed body is truncated")
+
+
+def decompress(data: bytes, encoding: Optional[str] = None, max_bytes: Optional[int] = None) -> bytes:
+    """
+    Decompresses a whole body. Without an encoding it is sniffed from the
+    data, and data that isn't compressed is returned as it is.
+    """
+    encoding = encoding or sniff_encoding(data)
+    if encoding is None:
+        return data
+    decompressor = StreamDecompressor(encoding, max_bytes)
+    output = b"".join(decompressor.decompress(data))
+    decompressor.finish()
+    return output
+
+
+async def decompress_body(data: bytes, encoding: Optional[str] = None,
+                          max_bytes: Optional[int] = None) -> bytes:
+    """
+    ``decompress`` for request handlers, off the event loop for large bodies.
+    """
+    if len(data) > COMPRESSION_THREADPOOL_BYTES:
+        return await run_in_threadpool(decompress, data, encoding, max_bytes)
+    return decompress(data, encoding, max_bytes)
+
+
+async def iter_decompressed(byte_chunks: AsyncIterator[bytes], encoding: Optional[str] = None,
+                            max_bytes: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Decompresses a byte stream chunk by chunk as it arrives, yielding pieces
+    of at most DECOMPRESSION_WRITE_SIZE bytes and raising
+    DecompressedBodyTooLarge once more than ``max_bytes`` came out. Without
+    an encoding it is sniffed from the first chunk; an uncompressed stream
+    is passed through.
+    """
+    decompressor = None
+    async for chunk in byte_chunks:
+        if not chunk:
+            continue
+        if decompressor is None:
+            encoding = encoding or sniff_encoding(chunk)
+            if encoding is None:
+                yield chunk
+                async for chunk in byte_chunks:
+                    yield chunk
+                return
+            decompressor = StreamDecompressor(encoding, max_bytes)
+        pieces = decompressor.decompress(chunk)
+        while True:
+            # A large chunk can take a while to inflate, piece by piece, off the event loop
+            if len(chunk) > COMPRESSION_THREADPOOL_BYTES:
+                piece = await run_in_threadpool(next, pieces, None)
+            else:
+                piece = next(pieces, None)
+            if piece is None:
+                break
+            yield piece
+    if decompressor is not None:
+        decompressor.finish()
+
+
+class _Compressor:
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        else:
+            self._compressor = zstd.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """
+        Compresses a chunk and flushes it, so a streamed response reaches the
+        client chunk by chunk; ``final`` ends the stream.
+        """
+        if self.encoding == "gzip":
+            flush_mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        else:
+            flush_mode = zstd.ZstdCompressor.FLUSH_FRAME if final else zstd.ZstdCompressor.FLUSH_BLOCK
+        return self._compressor.compress(data) + self._compressor.flush(flush_mode)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with zstd or gzip, as negotiated
+    from Accept-Encoding.
+
+    Only media types in ``media_types`` are compressed (Parquet already
+    is), and single-message bodies under ``minimum_size`` bytes are sent as
+    they are. Streamed responses are compressed and flushed chunk by chunk.
+    """
+    def __init__(self, app, minimum_size: int = RESPONSE_COMPRESSION_MIN_BYTES,
+                 media_types: tuple = RESPONSE_COMPRESSION_MEDIA_TYPES) -> None:
+        self.app          = app
+        self.minimum_size = minimum_size
+        self.media_types  = media_types
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_response_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor    = None
+        passthrough   = False
+
+        async def compressing_send(message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                if "content-encoding" in headers or not media_type.startswith(self.media_types):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["Content-Length"]
+                if not more_body:
+                    body = await self._compress(compressor, body, True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                await send(start_message)
+
+            body = await self._compress(compressor, body, not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
+
+    @staticmethod
+    async def _compress(compressor: _Compressor, body: bytes, final: bool) -> bytes:
+        if len(body) > COMPRESSION_THREADPOOL_BYTES:
+            return await run_in_threadpool(compressor.compress, body, final)
+        return compressor.compress(body, final)
@@ -0,0 +1,170 @@
+import asyncio
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+from etl_project.constants.serving import SERVING_EXECUTOR_MODE, SERVING_EXECUTOR_WORKERS
+from etl_project.entity.config_entity import ModelRegistryConfig
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.serving.metrics import INFERENCE_STAGE_SECONDS
+from etl_project.serving.model_registry import ModelRegistry
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+
+EXECUTOR_MODES = ("thread", "process")
+
+_PREPROCESS_SECONDS    = INFERENCE_STAGE_SECONDS.labels("preprocess")
+_MODEL_PREDICT_SECONDS = INFERENCE_STAGE_SECONDS.labels("model_predict")
+
+# Registry of the current pool worker process, set by _init_worker
+_worker_registry: Optional[ModelRegistry] = None
+
+
+def _timed_predict(model: ETLModel, df: pd.DataFrame) -> Tuple[np.ndarray, float, float]:
+    """
+    ETLModel.predict, also returning the seconds spent in the preprocessor
+    and in the model.
+    """
+    started_at = time.perf_counter()
+    x_transform = model.preprocessor.transform(df)
+    transformed_at = time.perf_counter()
+    y_hat = model.estimator_for(x_transform.shape[0]).predict(x_transform)
+    return y_hat, transformed_at - started_at, time.perf_counter() - transformed_at
+
+
+def _init_worker(model_dir: str) -> None:
+    global _worker_registry
+    _worker_registry = ModelRegistry(ModelRegistryConfig(model_dir))
+    _worker_registry.get()
+
+
+def _warm_up_worker() -> bool:
+    return _worker_registry is not None and _worker_registry.get() is not None
+
+
+def _predict_in_worker(shm_name: str, shape: tuple, columns: List[str]) -> Tuple[np.ndarray, float, float]:
+    shm = SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        df = pd.DataFrame(values, columns=columns, copy=False)
+        loaded_model = _worker_registry.get()
+        if loaded_model is None:
+            raise ETLPipelineException("Trained model not found. Please train the model first.", sys)
+        return _timed_predict(loaded_model.model, df)
+    finally:
+        # The views must be gone before the buffer can be released
+        df = values = None
+        shm.close()
+
+
+class InferenceExecutor:
+    """
+    Runs ETLModel.predict off the asyncio event loop.
+
+    In ``thread`` mode predictions run in the threadpool against the app's
+    model registry. In ``process`` mode they run in a process pool whose
+    workers each load the model once on start-up (and hot reload it through
+    their own registry); rows are handed over as a float64 matrix in shared
+    memory, so only the block name and the predictions are pickled. If a
+    worker dies (the OOM killer, a crash in native code), the pool is
+    broken for every request: it is started again and the prediction
+    retried once.
+    """
+    def __init__(self, model_registry: ModelRegistry, mode: str = SERVING_EXECUTOR_MODE,
+                 max_workers: int = SERVING_EXECUTOR_WORKERS) -> None:
+        try:
+            if mode not in EXECUTOR_MODES:
+                raise ValueError(f"Unknown executor mode {mode}, expected one of {EXECUTOR_MODES}")
+            self.model_registry = model_registry
+            self.mode           = mode
+            self.max_workers    = max_workers
+            self._pool          : Optional[ProcessPoolExecutor] = None
+            self._pool_lock     = threading.Lock()
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def start(self) -> None:
+        """
+        Starts the process pool and waits until every worker has loaded
+        the model. Does nothing in thread mode or if already started.
+        """
+        try:
+            with self._pool_lock:
+                if self.mode != "process" or self._pool is not None:
+                    return
+                pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_registry.model_registry_config.model_dir,),
+                )
+                warm_up = [pool.submit(_warm_up_worker) for _ in range(self.max_workers)]
+                loaded = sum(future.result() for future in warm_up)
+                self._pool = pool
+            logging.info(f"Inference process pool started, model preloaded in {loaded} of {self.max_workers} workers")
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _restart(self, broken_pool: ProcessPoolExecutor) -> None:
+        """
+        Replaces a broken pool with a new one, unless a concurrent request
+        already has, and returns once the new pool is started.
+        """
+        with self._pool_lock:
+            if self._pool is broken_pool:
+                self._pool = None
+                broken_pool.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _predict_local(self, df: pd.DataFrame) -> Tuple[np.ndarray, float, float]:
+        loaded_model = self.model_registry.get()
+        if loaded_model is None:
+            raise ETLPipelineException("Trained model not found. Please train the model first.", sys)
+        return _timed_predict(loaded_model.model, df)
+
+    @staticmethod
+    def _record(result: Tuple[np.ndarray, float, float]) -> np.ndarray:
+        y_hat, preprocess_seconds, predict_seconds = result
+        _PREPROCESS_SECONDS.observe(preprocess_seconds)
+        _MODEL_PREDICT_SECONDS.observe(predict_seconds)
+        return y_hat
+
+    async def predict(self, df: pd.DataFrame) -> np.ndarray:
+        if self.mode == "thread":
+            return self._record(await run_in_threadpool(self._predict_local, df))
+
+        if self._pool is None:
+            await run_in_threadpool(self.start)
+
+        shape = (len(df), len(df.columns))
+        shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+        try:
+            shared = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            shared[:] = df.to_numpy()
+            shared = None
+            pool = self._pool
+            try:
+                future = pool.submit(_predict_in_worker, shm.name, shape, list(df.columns))
+                return self._record(await asyncio.wrap_future(future))
+            except BrokenProcessPool as e:
+                logging.error(f"Inference process pool broke, restarting it and retrying: {e}")
+                await run_in_threadpool(self._restart, pool)
+                future = self._pool.submit(_predict_in_worker, shm.name, shape, list(df.columns))
+                return self._record(await asyncio.wrap_future(future))
+        finally:
+            shm.close()
+            shm.unlink()
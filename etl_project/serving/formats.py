@@ -0,0 +1,120 @@
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from etl_project.constants.serving import (
+    PREDICTION_COLUMN_NAME,
+    PREDICTION_INPUT_FILE_EXTENSIONS,
+    PREDICTION_INPUT_MEDIA_TYPES,
+    PREDICTION_OUTPUT_MEDIA_TYPES,
+)
+from etl_project.exception.exception import ETLPipelineException
+
+ARROW_FILE_MAGIC = b"ARROW1"
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def detect_input_format(content_type: Optional[str], filename: Optional[str] = None) -> Optional[str]:
+    """
+    Returns "csv", "arrow" or "parquet" for an upload from its media type,
+    falling back to the file extension. Returns None if neither is known.
+    """
+    input_format = PREDICTION_INPUT_MEDIA_TYPES.get(_media_type(content_type))
+    if input_format is None and filename:
+        input_format = PREDICTION_INPUT_FILE_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+    return input_format
+
+
+def negotiate_output_format(accept: Optional[str]) -> Optional[str]:
+    """
+    Picks the response format from an Accept header: "json" (the default),
+    "arrow" or "parquet". Returns None if the client accepts none of them.
+    """
+    if not accept:
+        return "json"
+
+    best_format, best_quality = None, 0.0
+    for entry in accept.split(","):
+        media_type, *params = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+
+        media_type = media_type.lower()
+        if media_type in ("*/*", "application/*"):
+            output_format = "json"
+        else:
+            output_format = next((name for name, supported in PREDICTION_OUTPUT_MEDIA_TYPES.items()
+                                  if supported == media_type), None)
+        if output_format is not None and quality > best_quality:
+            best_format, best_quality = output_format, quality
+    return best_format
+
+
+def read_table(data: bytes, input_format: str) -> pa.Table:
+    """
+    Reads an Arrow IPC (stream or file) or Parquet payload. Arrow IPC
+    columns are views over ``data``, nothing is copied.
+    """
+    try:
+        buffer = pa.py_buffer(data)
+        if input_format == "arrow":
+            if data[:len(ARROW_FILE_MAGIC)] == ARROW_FILE_MAGIC:
+                return pa.ipc.open_file(buffer).read_all()
+            return pa.ipc.open_stream(buffer).read_all()
+        if input_format == "parquet":
+            return pq.read_table(pa.BufferReader(buffer))
+        raise ValueError(f"Unsupported columnar format: {input_format}")
+    except Exception as e:
+        raise ETLPipelineException(e, sys)
+
+
+def table_to_frame(table: pa.Table) -> pd.DataFrame:
+    """
+    Converts an Arrow table to a DataFrame without copying column data where
+    Arrow allows it: single-chunk numeric columns without nulls become
+    read-only NumPy views. Columns with nulls are converted with NaN in
+    place of the nulls, which the preprocessor imputes.
+    """
+    try:
+        columns = {}
+        for name, column in zip(table.column_names, table.columns):
+            array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+            try:
+                columns[name] = array.to_numpy(zero_copy_only=True)
+            except pa.ArrowInvalid:
+                columns[name] = array.to_numpy(zero_copy_only=False)
+        return pd.DataFrame(columns, copy=False)
+    except Exception as e:
+        raise ETLPipelineException(e, sys)
+
+
+def encode_predictions(y_pred: np.ndarray, output_format: str) -> pa.Buffer:
+    """
+    Encodes predictions as a single-column Arrow IPC stream or Parquet file.
+    """
+    try:
+        table = pa.table({PREDICTION_COLUMN_NAME: pa.array(y_pred)})
+        sink = pa.BufferOutputStream()
+        if output_format == "arrow":
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+        elif output_format == "parquet":
+            pq.write_table(table, sink)
+        else:
+            raise ValueError(f"Unsupported columnar format: {output_format}")
+        return sink.getvalue()
+    except Exception as e:
+        raise ETLPipelineException(e, sys)
@@ -0,0 +1,87 @@
+import sys
+import threading
+from typing import Annotated, List, Optional, Union
+
+import numpy as np
+from pydantic import ConfigDict, Field, TypeAdapter, create_model
+
+from etl_project.constants.serving import PREDICT_JSON_MAX_RECORDS
+from etl_project.constants.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.utils.main_utils.utils import read_yaml_file
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+
+
+def read_feature_columns(schema_file_path: str = SCHEMA_FILE_PATH,
+                         target_column: str = TARGET_COLUMN) -> List[str]:
+    """
+    Returns the model's input columns in schema order (the order the
+    preprocessor was fitted with).
+    """
+    try:
+        schema = read_yaml_file(schema_file_path)
+        columns = [name for column in schema["columns"] for name in column]
+        return [column for column in columns if column != target_column]
+    except Exception as e:
+        raise ETLPipelineException(e, sys)
+
+
+class JsonRecordScorer:
+    """
+    Scores feature records posted as JSON without building a DataFrame.
+
+    A pydantic model with one optional float field per schema column is
+    built once, and requests are validated straight from the raw body with
+    a precompiled TypeAdapter (a single record or a list of up to
+    ``max_records``). Unknown fields are rejected and missing or null
+    features become NaN for the imputer. Validated records are written into
+    a preallocated row buffer in schema column order, one buffer per thread,
+    and scored with ``ETLModel.predict_array``.
+    """
+    def __init__(self, feature_columns: Optional[List[str]] = None,
+                 max_records: int = PREDICT_JSON_MAX_RECORDS) -> None:
+        try:
+            self.feature_columns = feature_columns or read_feature_columns()
+            self.max_records     = max_records
+            self.record_model    = create_model(
+                "FeatureRecord",
+                __config__=ConfigDict(extra="forbid"),
+                **{column: (Optional[float], None) for column in self.feature_columns},
+            )
+            self.request_type    = Union[
+                self.record_model,
+                Annotated[List[self.record_model], Field(min_length=1, max_length=max_records)],
+            ]
+            self.request_adapter = TypeAdapter(self.request_type)
+            self._buffers = threading.local()
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _row_buffer(self) -> np.ndarray:
+        buffer = getattr(self._buffers, "rows", None)
+        if buffer is None:
+            buffer = np.empty((self.max_records, len(self.feature_columns)), dtype=np.float64)
+            self._buffers.rows = buffer
+        return buffer
+
+    def parse(self, body: bytes) -> list:
+        """
+        Validates a JSON body, raising pydantic.ValidationError if it is
+        not a feature record or a list of them.
+        """
+        records = self.request_adapter.validate_json(body)
+        return records if isinstance(records, list) else [records]
+
+    def fill(self, records: list) -> np.ndarray:
+        """
+        Writes records into this thread's row buffer and returns the filled
+        rows. The view is only valid until the thread fills the buffer again.
+        """
+        rows = self._row_buffer()[:len(records)]
+        for row, record in zip(rows, records):
+            # Field values are stored in schema column order; None becomes NaN
+            row[:] = list(record.__dict__.values())
+        return rows
+
+    def score(self, model: ETLModel, records: list) -> np.ndarray:
+        return model.predict_array(self.fill(records))
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import sys
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from pydantic import ConfigDict, StrictInt, TypeAdapter, ValidationError, create_model
+from starlette.websockets import WebSocket
+
+from etl_project.constants.serving import LIVE_BATCH_MAX_ROWS, LIVE_BATCH_WINDOW_MS, LIVE_MAX_PENDING_MESSAGES
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.serving.json_records import JsonRecordScorer
+from etl_project.serving.metrics import (
+    LIVE_CONNECTIONS,
+    LIVE_MESSAGES_TOTAL,
+    REQUEST_STAGE_SECONDS,
+    ROWS_SCORED_TOTAL,
+)
+
+LIVE_ROUTE = "/ws/predict"
+
+_LIVE_ROWS_SCORED = ROWS_SCORED_TOTAL.labels(LIVE_ROUTE)
+_LIVE_LATENCY     = REQUEST_STAGE_SECONDS.labels(LIVE_ROUTE, "predict")
+
+
+def live_message_adapter(record_scorer: JsonRecordScorer) -> TypeAdapter:
+    """
+    Validates a live feature update: ``{"id": ..., "records": ...}`` where
+    ``records`` is one feature record or a list of them, as accepted by
+    ``record_scorer``, and the optional ``id`` is echoed back with the
+    predictions.
+    """
+    try:
+        message_model = create_model(
+            "LiveFeatureUpdate",
+            __config__=ConfigDict(extra="forbid"),
+            id=(Optional[Union[StrictInt, str]], None),
+            records=(record_scorer.request_type, ...),
+        )
+        return TypeAdapter(message_model)
+    except Exception as e:
+        raise ETLPipelineException(e, sys)
+
+
+class LivePredictionBatcher:
+    """
+    Scores the feature updates of all live connections in shared batches.
+
+    An update arriving while no batch is being scored is scored at once.
+    Otherwise records are queued until the running batch finishes, the
+    next message would take the batch over ``max_rows`` or the first
+    message has waited ``window_ms``, then scored with one ``score`` call,
+    which returns the predictions and the version of the model that made
+    them, and the predictions are split back to each message.
+    """
+    def __init__(self, score: Callable[[list], Awaitable[Tuple[np.ndarray, str]]],
+                 max_rows: int = LIVE_BATCH_MAX_ROWS, window_ms: float = LIVE_BATCH_WINDOW_MS) -> None:
+        try:
+            self.score          = score
+            self.max_rows       = max_rows
+            self.window         = window_ms / 1000
+            self._pending       : List[Tuple[list, asyncio.Future]] = []
+            self._pending_rows  = 0
+            self._timer         : Optional[asyncio.TimerHandle] = None
+            # The event loop only keeps weak references to tasks, so running batches are held here
+            self._running       : Set[asyncio.Task] = set()
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    async def predict(self, records: list) -> Tuple[np.ndarray, str]:
+        if self._pending_rows + len(records) > self.max_rows:
+            self._flush()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((records, future))
+        self._pending_rows += len(records)
+
+        if self._pending_rows >= self.max_rows or not self._running:
+            self._flush()
+        elif len(self._pending) == 1:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        result = await future
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def _flush(self) -> None:
+        batch, self._pending, self._pending_rows = self._pending, [], 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[Tuple[list, asyncio.Future]]) -> None:
+        try:
+            y_pred, model_version = await self.score([record for records, _ in batch for record in records])
+            results = [(predictions, model_version) for predictions
+                       in np.split(y_pred, np.cumsum([len(records) for records, _ in batch])[:-1])]
+        except Exception as e:
+            logging.error(f"Live prediction batch of {len(batch)} messages failed: {e}")
+            results = [e] * len(batch)
+        finally:
+            self._running.discard(asyncio.current_task())
+        if self._pending and not self._running:
+            self._flush()
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class LivePredictionConnection:
+    """
+    One live prediction WebSocket connection.
+
+    Each feature update is scored through the shared batcher as soon as it
+    is received, and its predictions are pushed back when they are ready,
+    so updates can complete out of order; the message ``id`` ties them
+    together. An invalid update is answered with an error and the
+    connection stays open. Once ``max_pending_messages`` updates are
+    waiting for their answer the connection is not read, which pushes back
+    on the client.
+    """
+    def __init__(self, websocket: WebSocket, batcher: LivePredictionBatcher, message_adapter: TypeAdapter,
+                 max_pending_messages: int = LIVE_MAX_PENDING_MESSAGES) -> None:
+        self.websocket       = websocket
+        self.batcher         = batcher
+        self.message_adapter = message_adapter
+        self._slots          = asyncio.Semaphore(max_pending_messages)
+        self._outgoing       : asyncio.Queue = asyncio.Queue()
+        self._tasks          : set = set()
+        self._send_failed    = False
+
+    async def run(self) -> None:
+        LIVE_CONNECTIONS.labels().inc()
+        sender = asyncio.ensure_future(self._send())
+        try:
+            while True:
+                await self._slots.acquire()
+                if self._send_failed:
+                    return
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                received_at = time.perf_counter()
+                data = message.get("text") if message.get("text") is not None else message.get("bytes")
+                try:
+                    update = self.message_adapter.validate_json(data)
+                except ValidationError as validation_error:
+                    LIVE_MESSAGES_TOTAL.labels("invalid").inc()
+                    self._outgoing.put_nowait({
+                        "id": self._message_id(data),
+                        "status": "error",
+                        "message": "Invalid feature update",
+                        "errors": json.loads(validation_error.json(include_url=False))
+                    })
+                    continue
+                task = asyncio.ensure_future(self._predict(update, received_at))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            LIVE_CONNECTIONS.labels().dec()
+            for task in [*self._tasks, sender]:
+                task.cancel()
+            await asyncio.gather(*self._tasks, sender, return_exceptions=True)
+
+    @staticmethod
+    def _message_id(data) -> Optional[Union[int, str]]:
+        try:
+            message_id = json.loads(data).get("id")
+            return message_id if isinstance(message_id, (int, str)) else None
+        except Exception:
+            return None
+
+    async def _predict(self, update, received_at: float) -> None:
+        records = update.records if isinstance(update.records, list) else [update.records]
+        try:
+            y_pred, model_version = await self.batcher.predict(records)
+        except Exception as e:
+            LIVE_MESSAGES_TOTAL.labels("error").inc()
+            self._outgoing.put_nowait({"id": update.id, "status": "error", "message": str(e)})
+            return
+
+        latency = time.perf_counter() - received_at
+        LIVE_MESSAGES_TOTAL.labels("success").inc()
+        _LIVE_ROWS_SCORED.inc(len(records))
+        _LIVE_LATENCY.observe(latency)
+        self._outgoing.put_nowait({
+            "id": update.id,
+            "status": "success",
+            "predictions": y_pred.tolist(),
+            "model_version": model_version,
+            "latency_ms": round(latency * 1000, 3)
+        })
+
+    async def _send(self) -> None:
+        while True:
+            payload = await self._outgoing.get()
+            try:
+                await self.websocket.send_json(payload)
+            except Exception as e:
+                # The client is gone: wake the receive loop so it stops
+                logging.info(f"Live prediction connection closed while sending: {e}")
+                self._send_failed = True
+                self._slots.release()
+                return
+            # The update's slot is only freed once its answer is on the wire
+            self._slots.release()
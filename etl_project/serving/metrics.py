@@ -0,0 +1,292 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _ShardedValues:
+    """
+    A fixed-size list of numbers with one shard per thread.
+
+    Each thread only ever writes its own shard, so updates need no lock;
+    readers sum the shards. The lock is only taken when a thread creates
+    its shard and when the values are read.
+    """
+    def __init__(self, size: int) -> None:
+        self._size   = size
+        self._local  = threading.local()
+        self._shards : List[list] = []
+        self._lock   = threading.Lock()
+
+    def shard(self) -> list:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0] * self._size
+            with self._lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def snapshot(self) -> list:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(column) for column in zip(*shards)] if shards else [0] * self._size
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self._buckets = buckets
+        # One count per bucket, the +Inf count, then the sum
+        self._values  = _ShardedValues(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        values = self._values.shard()
+        values[bisect_left(self._buckets, value)] += 1
+        values[-1] += value
+
+
+class _CounterChild:
+    def __init__(self) -> None:
+        self._values = _ShardedValues(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._values.shard()[0] += amount
+
+
+class _GaugeChild:
+    """
+    Gauges are only updated from the event loop, so they hold a plain value.
+    """
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name          = name
+        self.documentation = documentation
+        self.labelnames    = tuple(labelnames)
+        self._children     : Dict[tuple, object] = {}
+        self._lock         = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *labelvalues: str):
+        """
+        Returns the child for these label values. Children are created once
+        and can be kept by callers to skip the lookup.
+        """
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labelvalues, self._new_child())
+        return child
+
+    def _label_text(self, labelvalues: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, labelvalues)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.collect()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def collect(self) -> List[str]:
+        lines = []
+        for labelvalues, child in list(self._children.items()):
+            values = child._values.snapshot()
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), values[:-1]):
+                cumulative += count
+                bucket_labels = self._label_text(labelvalues, 'le="' + str(bound) + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labelvalues)} {values[-1]}")
+            lines.append(f"{self.name}_count{self._label_text(labelvalues)} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def collect(self) -> List[str]:
+        return [f"{self.name}{self._label_text(labelvalues)} {child._values.snapshot()[0]}"
+                for labelvalues, child in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def collect(self) -> List[str]:
+        return [f"{self.name}{self._label_text(labelvalues)} {child.value}"
+                for labelvalues, child in list(self._children.items())]
+
+
+class CallbackMetric(_Metric):
+    """
+    A gauge or counter whose value is read from a callback at scrape time,
+    for state another component already tracks.
+    """
+    def __init__(self, name: str, documentation: str, kind: str, callback: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self.kind     = kind
+        self.callback = callback
+
+    def collect(self) -> List[str]:
+        return [f"{self.name} {self.callback()}"]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics : List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "etl_request_stage_seconds", "Time spent in each stage of a request", ("route", "stage")))
+INFERENCE_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "etl_inference_stage_seconds", "Time spent in preprocessing and model predict per model call", ("stage",)))
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "etl_requests_total", "Requests handled", ("route", "status")))
+ROWS_SCORED_TOTAL = REGISTRY.register(Counter(
+    "etl_rows_scored_total", "Rows scored", ("route",)))
+REQUEST_ROWS = REGISTRY.register(Gauge(
+    "etl_request_rows", "Rows in the last scored request", ("route",)))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "etl_requests_in_flight", "Requests currently being handled"))
+ADMISSION_PENDING_ROWS = REGISTRY.register(Gauge(
+    "etl_admission_pending_rows", "Rows admitted for inference and not yet scored"))
+ADMISSION_CAPACITY_ROWS = REGISTRY.register(Gauge(
+    "etl_admission_capacity_rows", "Rows that can be pending before requests are rejected"))
+ADMISSION_WAITING_REQUESTS = REGISTRY.register(Gauge(
+    "etl_admission_waiting_requests", "Streaming requests paused until rows can be admitted"))
+ADMISSION_REJECTED_TOTAL = REGISTRY.register(Counter(
+    "etl_admission_rejected_total", "Requests rejected by admission control", ("route", "reason")))
+LIVE_CONNECTIONS = REGISTRY.register(Gauge(
+    "etl_live_connections", "Open live prediction WebSocket connections"))
+LIVE_MESSAGES_TOTAL = REGISTRY.register(Counter(
+    "etl_live_messages_total", "Feature update messages received over live prediction connections", ("status",)))
+
+
+class StageTimings:
+    """
+    Durations of the stages of one request, recorded into
+    REQUEST_STAGE_SECONDS and reported in the Server-Timing header.
+    """
+    __slots__ = ("stages", "_stage", "_started_at")
+
+    def __init__(self) -> None:
+        self.stages : List[Tuple[str, float]] = []
+
+    def __call__(self, stage: str) -> "StageTimings":
+        self._stage = stage
+        return self
+
+    def __enter__(self) -> "StageTimings":
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stages.append((self._stage, time.perf_counter() - self._started_at))
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages.append((stage, seconds))
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.stages)
+
+
+def request_timings(request) -> StageTimings:
+    """
+    Returns the StageTimings the metrics middleware attached to a request.
+    """
+    timings = getattr(request.state, "stage_timings", None)
+    return timings if timings is not None else StageTimings()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests per route and status, tracking
+    in-flight requests and adding a Server-Timing header with the stages
+    the endpoint recorded in ``request.state.stage_timings``. Stage
+    durations go into the histogram once the response has started.
+    """
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        timings = StageTimings()
+        scope.setdefault("state", {})["stage_timings"] = timings
+        in_flight = REQUESTS_IN_FLIGHT.labels()
+        in_flight.inc()
+        status = "500"
+
+        async def send_with_timings(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                if timings.stages:
+                    MutableHeaders(scope=message).append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUESTS_TOTAL.labels(route, status).inc()
+            for stage, seconds in timings.stages:
+                REQUEST_STAGE_SECONDS.labels(route, stage).observe(seconds)
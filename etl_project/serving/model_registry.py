@@ -0,0 +1,181 @@
+import os
+import pickle
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import joblib
+
+from etl_project.entity.config_entity import ModelRegistryConfig
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.utils.main_utils.utils import file_lock, load_object
+from etl_project.utils.ml_utils.model.compiled_ensemble import CompiledTreeEnsemble
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+
+
+class DeferredModelLoad:
+    """
+    Unpickles a model the first time it is called, from a file opened when
+    it is created: a retrain replaces the model file with a new one, so the
+    open file still holds the version it was opened as.
+    """
+    def __init__(self, file_path: str) -> None:
+        self._file  = open(file_path, "rb")
+        self._lock  = threading.Lock()
+        self._model = None
+
+    def __call__(self):
+        with self._lock:
+            if self._file is not None:
+                self._model = pickle.load(self._file)
+                self._file.close()
+                self._file = None
+                logging.info("Model registry loaded the pickled model for a batch over the compiled model's size")
+            return self._model
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    model     : ETLModel
+    version   : str
+    loaded_at : float
+
+
+class ModelRegistry:
+    """
+    Keeps a single deserialized ETLModel in memory and swaps it for a new
+    one when the files in the final model directory change.
+
+    Readers call ``get()`` and keep the returned ``LoadedModel`` for the
+    whole request, so a reload never affects predictions already in flight.
+
+    A model published with a compiled ensemble is served from the ensemble
+    alone: the pickled model is loaded on the first batch too large for it
+    (over COMPILED_MAX_BATCH_ROWS rows), so start-up and workers that only
+    score small batches never pay for it.
+
+    With ``memory_map`` enabled, each version is also dumped once with
+    joblib and loaded back with its NumPy arrays memory-mapped read-only,
+    so every process serving that version shares one copy of them through
+    the page cache instead of holding its own.
+    """
+    def __init__(self, model_registry_config: ModelRegistryConfig = None) -> None:
+        try:
+            self.model_registry_config = model_registry_config or ModelRegistryConfig()
+            self._current: Optional[LoadedModel] = None
+            self._reload_lock = threading.Lock()
+            self._last_checked = 0.0
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _fingerprint(self) -> Optional[Tuple[int, int, int, int]]:
+        try:
+            preprocessor_stat = os.stat(self.model_registry_config.preprocessor_file_path)
+            model_stat        = os.stat(self.model_registry_config.model_file_path)
+        except FileNotFoundError:
+            return None
+
+        # The training pipeline writes the preprocessor before the model, so a
+        # preprocessor newer than the model means a retrain is half published.
+        if preprocessor_stat.st_mtime_ns > model_stat.st_mtime_ns:
+            return None
+
+        return (preprocessor_stat.st_mtime_ns, preprocessor_stat.st_size,
+                model_stat.st_mtime_ns, model_stat.st_size)
+
+    def published_version(self) -> Optional[str]:
+        """
+        Returns the version of the model files on disk without loading
+        them, or None if no complete model is published.
+        """
+        fingerprint = self._fingerprint()
+        return None if fingerprint is None else "-".join(str(part) for part in fingerprint)
+
+    def refresh(self, force: bool = False) -> Optional[LoadedModel]:
+        """
+        Reloads the model if its files changed since the last load.
+
+        Only one thread loads at a time; concurrent callers keep serving
+        the current model instead of waiting for the new one.
+        """
+        if not self._reload_lock.acquire(blocking=force):
+            return self._current
+        try:
+            self._last_checked = time.monotonic()
+            fingerprint = self._fingerprint()
+            if fingerprint is None:
+                return self._current
+
+            version = "-".join(str(part) for part in fingerprint)
+            if not force and self._current is not None and self._current.version == version:
+                return self._current
+
+            # Readers share the publish lock, so a retrain can't swap either
+            # file between the two loads
+            with file_lock(self.model_registry_config.publish_lock_file_path, shared=True):
+                fingerprint = self._fingerprint()
+                if fingerprint is None:
+                    return self._current
+                version = "-".join(str(part) for part in fingerprint)
+                preprocessor = load_object(self.model_registry_config.preprocessor_file_path)
+                # Published next to tree ensembles; a retrain that can't be
+                # compiled removes it
+                compiled_model = None
+                if os.path.exists(self.model_registry_config.compiled_model_file_path):
+                    compiled_model = CompiledTreeEnsemble.load(self.model_registry_config.compiled_model_file_path)
+                # A single tree is always scored by sklearn, and a memory-mapped
+                # model is dumped whole
+                if compiled_model is None or compiled_model.kind == "tree" or self.model_registry_config.memory_map:
+                    model, model_loader = load_object(self.model_registry_config.model_file_path), None
+                else:
+                    model, model_loader = None, DeferredModelLoad(self.model_registry_config.model_file_path)
+            etl_model = ETLModel(preprocessor=preprocessor, model=model, compiled_model=compiled_model,
+                                 model_loader=model_loader)
+            if self.model_registry_config.memory_map:
+                etl_model = self._memory_map(etl_model, version)
+            self._current = LoadedModel(model=etl_model,
+                                        version=version,
+                                        loaded_at=time.time())
+            logging.info(f"Model registry loaded model version {version}")
+            return self._current
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+        finally:
+            self._reload_lock.release()
+
+    def _memory_map(self, model: ETLModel, version: str) -> ETLModel:
+        mmap_dir  = self.model_registry_config.mmap_dir
+        file_name = f"{version}.joblib"
+        file_path = os.path.join(mmap_dir, file_name)
+
+        if not os.path.exists(file_path):
+            os.makedirs(mmap_dir, exist_ok=True)
+            tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+            joblib.dump(model, tmp_file_path)
+            os.replace(tmp_file_path, file_path)
+            # Processes still mapping an older version keep its pages until they reload
+            for name in os.listdir(mmap_dir):
+                if name != file_name and name.endswith(".joblib"):
+                    try:
+                        os.remove(os.path.join(mmap_dir, name))
+                    except FileNotFoundError:
+                        pass
+
+        return joblib.load(file_path, mmap_mode="r")
+
+    def get(self) -> Optional[LoadedModel]:
+        """
+        Returns the current model, checking the files for a new version at
+        most once per poll interval. Returns None until a model is trained.
+        """
+        if time.monotonic() - self._last_checked >= self.model_registry_config.poll_interval:
+            try:
+                self.refresh()
+            except ETLPipelineException as e:
+                if self._current is None:
+                    raise
+                logging.error(f"Model reload failed, keeping version {self._current.version}: {e}")
+        return self._current
@@ -0,0 +1,159 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import repeat
+from typing import Awaitable, Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+from etl_project.constants.serving import PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL_SECONDS
+from etl_project.exception.exception import ETLPipelineException
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    Returns a uint64 hash per row of the feature vector, computed column-wise
+    with ``pd.util.hash_pandas_object``. Values are hashed as float64, so a
+    row parsed as ints hashes like the same row parsed as floats, and the
+    column names are mixed in so frames with other columns never collide.
+    """
+    values = df.to_numpy(dtype=np.float64) + 0.0  # + 0.0 folds -0.0 into 0.0
+    row_hashes = pd.util.hash_pandas_object(pd.DataFrame(values, copy=False), index=False).to_numpy()
+    columns_key = "\x1f".join(str(column) for column in df.columns)
+    return row_hashes ^ pd.util.hash_array(np.array([columns_key], dtype=object))[0]
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of per-row predictions keyed by feature-vector hash.
+
+    Entries expire ``ttl_seconds`` after they were stored and the whole
+    cache is dropped when the model version it was filled with changes.
+    ``max_entries=0`` disables the cache.
+    """
+    def __init__(self, max_entries: int = PREDICTION_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS) -> None:
+        try:
+            self.max_entries  = max_entries
+            self.ttl_seconds  = ttl_seconds
+            self._entries     : "OrderedDict[int, Tuple[object, float]]" = OrderedDict()
+            self._version     : Optional[str] = None
+            self._lock        = threading.Lock()
+            self._stats       = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._version = version
+
+    def lookup(self, keys: np.ndarray, version: str,
+               row_counts: Optional[np.ndarray] = None) -> Tuple[list, np.ndarray]:
+        """
+        Returns the cached prediction (or None) for each key and a boolean
+        mask of the keys that missed. ``row_counts`` weighs each key by the
+        number of rows it stands for in the hit and miss counters.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            entries, move_to_end = self._entries, self._entries.move_to_end
+            cached = []
+            for key in keys.tolist():
+                entry = entries.get(key)
+                if entry is None:
+                    cached.append(None)
+                elif entry[1] < now:
+                    del entries[key]
+                    self._stats["expirations"] += 1
+                    cached.append(None)
+                else:
+                    move_to_end(key)
+                    cached.append(entry[0])
+
+            missing = np.fromiter((value is None for value in cached), dtype=bool, count=len(cached))
+            if row_counts is None:
+                row_counts = np.ones(len(cached), dtype=np.int64)
+            misses = int(row_counts[missing].sum())
+            self._stats["misses"] += misses
+            self._stats["hits"] += int(row_counts.sum()) - misses
+            return cached, missing
+
+    def store(self, keys: np.ndarray, predictions: np.ndarray, version: str) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries.update(zip(keys.tolist(), zip(predictions.tolist(), repeat(expires_at))))
+            overflow = len(self._entries) - self.max_entries
+            for _ in range(max(overflow, 0)):
+                self._entries.popitem(last=False)
+            self._stats["evictions"] += max(overflow, 0)
+
+    def _lookup_frame(self, df: pd.DataFrame, version: str):
+        keys = hash_rows(df)
+        # Repeated rows within one upload are looked up and scored once
+        unique_keys, first_rows, inverse, row_counts = np.unique(keys, return_index=True,
+                                                                 return_inverse=True, return_counts=True)
+        cached, missing = self.lookup(unique_keys, version, row_counts)
+        return keys, unique_keys, first_rows, inverse.reshape(-1), cached, missing
+
+    async def predict(self, df: pd.DataFrame, version: str,
+                      predict: Callable[[pd.DataFrame], Awaitable[np.ndarray]]) -> np.ndarray:
+        """
+        Returns predictions for every row of ``df``, calling ``predict`` only
+        with the distinct rows that aren't cached for ``version``.
+        """
+        if not self.enabled or df.empty:
+            return await predict(df)
+
+        try:
+            keys, unique_keys, first_rows, inverse, cached, missing = await run_in_threadpool(
+                self._lookup_frame, df, version)
+        except Exception:
+            # Frames that can't be hashed as features go straight to the model,
+            # which reports what is wrong with them
+            return await predict(df)
+
+        if missing.all() and len(unique_keys) == len(df):
+            # Nothing cached and no repeats: score the frame as is
+            y_pred = np.asarray(await predict(df))
+            self.store(keys, y_pred, version)
+            return y_pred
+
+        hits = np.asarray([value for value in cached if value is not None])
+        dtype = hits.dtype
+        y_miss = None
+        if missing.any():
+            miss_df = df.iloc[first_rows[missing]].reset_index(drop=True)
+            y_miss = np.asarray(await predict(miss_df))
+            self.store(unique_keys[missing], y_miss, version)
+            dtype = np.result_type(y_miss.dtype, hits.dtype) if hits.size else y_miss.dtype
+
+        y_unique = np.empty(len(unique_keys), dtype=dtype)
+        if y_miss is not None:
+            y_unique[missing] = y_miss
+        y_unique[~missing] = hits
+        return y_unique[inverse]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "model_version": self._version,
+            }
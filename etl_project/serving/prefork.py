@@ -0,0 +1,116 @@
+import gc
+import os
+import signal
+import socket
+import sys
+from typing import Dict
+
+import uvicorn
+
+from etl_project.constants.serving import SERVING_LISTEN_BACKLOG
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.serving.executor import InferenceExecutor
+from etl_project.serving.model_registry import ModelRegistry
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(SERVING_LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, host: str, port: int) -> None:
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port))
+    server.run(sockets=[sock])
+
+
+class PreforkServer:
+    """
+    Serves the app from several forked uvicorn worker processes that share
+    one listening socket.
+
+    The master loads the model once before forking, then freezes the
+    garbage collector, so the model's objects sit in the permanent
+    generation and the collectors in the workers never write to, and
+    copy, their pages. The registry memory-maps the model's arrays, so they
+    are file-backed and stay shared after the workers hot-reload a
+    retrained model. Workers infer in their own process (thread mode),
+    since a process pool per worker would load the model again. Workers
+    that exit unexpectedly are replaced.
+
+    The master must not have started any threads before ``run``.
+    """
+    def __init__(self, app, model_registry: ModelRegistry, inference_executor: InferenceExecutor,
+                 host: str, port: int, workers: int) -> None:
+        try:
+            self.app                = app
+            self.model_registry     = model_registry
+            self.inference_executor = inference_executor
+            self.host               = host
+            self.port               = port
+            self.workers            = workers
+            self._children          : Dict[int, int] = {}
+            self._stopping          = False
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _spawn(self, slot: int, sock: socket.socket) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                _run_worker(self.app, sock, self.host, self.port)
+            except BaseException:
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self._children[pid] = slot
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        try:
+            sock = _bind_socket(self.host, self.port)
+
+            self.inference_executor.mode = "thread"
+            self.model_registry.model_registry_config.memory_map = True
+            loaded_model = self.model_registry.refresh(force=True)
+            if loaded_model is None:
+                logging.warning("No trained model found, workers will load it once it is trained")
+
+            gc.collect()
+            gc.freeze()
+
+            signal.signal(signal.SIGINT, self._stop)
+            signal.signal(signal.SIGTERM, self._stop)
+            for slot in range(self.workers):
+                self._spawn(slot, sock)
+            logging.info(f"Pre-fork server on {self.host}:{self.port} started {self.workers} workers")
+
+            while self._children:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+                slot = self._children.pop(pid, None)
+                if slot is not None and not self._stopping:
+                    logging.error(f"Worker {pid} exited with status {status}, restarting it")
+                    self._spawn(slot, sock)
+
+            sock.close()
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
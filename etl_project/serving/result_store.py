@@ -0,0 +1,244 @@
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from starlette.concurrency import run_in_threadpool
+
+from etl_project.constants.serving import PREDICTION_RESULT_STREAM_BATCH_ROWS
+from etl_project.entity.config_entity import PredictionResultStoreConfig
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.serving.streaming import encode_scored_frame
+
+RESULT_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class PredictionResultWriter:
+    """
+    Writes a result one scored frame at a time, for results too large to
+    hold in memory. The file appears under its result id on ``close``.
+
+    Integer columns are stored as float64, so a later block in which a
+    column has missing values still matches the schema of the first.
+    """
+    def __init__(self, store: "PredictionResultStore", result_id: str) -> None:
+        self.store      = store
+        self.result_id  = result_id
+        self.file_path  = store.result_file_path(result_id)
+        self.rows       = 0
+        self._writer    : Optional[pq.ParquetWriter] = None
+
+    def _write(self, df: pd.DataFrame) -> None:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                schema = pa.schema([field.with_type(pa.float64()) if pa.types.is_integer(field.type) else field
+                                    for field in table.schema])
+                os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                self._writer = pq.ParquetWriter(self.file_path + ".tmp", schema,
+                                                compression=self.store.result_store_config.compression)
+            self._writer.write_table(table.cast(self._writer.schema))
+            self.rows += len(df)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    async def write(self, df: pd.DataFrame) -> None:
+        await run_in_threadpool(self._write, df)
+
+    def _close(self) -> None:
+        try:
+            if self._writer is None:
+                raise ValueError(f"Prediction result {self.result_id} has no rows")
+            self._writer.close()
+            os.replace(self.file_path + ".tmp", self.file_path)
+            self.store.result_written(self.file_path)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self._close)
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        try:
+            os.remove(self.file_path + ".tmp")
+        except FileNotFoundError:
+            pass
+
+
+class PredictionResultStore:
+    """
+    Stores the scored frame of each prediction request under its own id as
+    a zstd-compressed Parquet file.
+
+    ``save`` returns as soon as the write is scheduled; the file is written
+    in the threadpool (to a temporary name, then renamed) and the request
+    never waits for the disk. Writes are added to running totals of the
+    store's size and count. Once a write takes it past its age limit, the
+    expired results are removed; past its size or count limit, the oldest
+    results are removed until it is down to low_water_ratio of both.
+    """
+    def __init__(self, result_store_config: PredictionResultStoreConfig = None) -> None:
+        try:
+            self.result_store_config = result_store_config or PredictionResultStoreConfig()
+            self._pending           : Dict[str, asyncio.Task] = {}
+            self._retention_lock    = threading.Lock()
+            # Totals as of the last retention scan, plus the writes since
+            self._total_count       = 0
+            self._total_bytes       = 0
+            self._oldest_mtime      = float("inf")
+            self._scanned_at        : Optional[float] = None
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    @staticmethod
+    def new_result_id() -> str:
+        return uuid.uuid4().hex
+
+    def result_file_path(self, result_id: str) -> Optional[str]:
+        """
+        Returns the file path for a result id, or None if the id is malformed.
+        """
+        if not RESULT_ID_PATTERN.match(result_id):
+            return None
+        return os.path.join(self.result_store_config.result_dir,
+                            result_id + self.result_store_config.file_extension)
+
+    def _write(self, result_id: str, df: pd.DataFrame) -> None:
+        try:
+            file_path = self.result_file_path(result_id)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            pq.write_table(table, file_path + ".tmp", compression=self.result_store_config.compression)
+            os.replace(file_path + ".tmp", file_path)
+            self.result_written(file_path)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    async def _write_in_background(self, result_id: str, df: pd.DataFrame) -> None:
+        try:
+            await run_in_threadpool(self._write, result_id, df)
+        except Exception as e:
+            logging.error(f"Saving prediction result {result_id} failed: {e}")
+        finally:
+            self._pending.pop(result_id, None)
+
+    def save(self, df: pd.DataFrame) -> str:
+        """
+        Schedules ``df`` to be written and returns its result id. The frame
+        must not be modified afterwards.
+        """
+        result_id = self.new_result_id()
+        self._pending[result_id] = asyncio.ensure_future(self._write_in_background(result_id, df))
+        return result_id
+
+    def open_writer(self, result_id: str) -> PredictionResultWriter:
+        """
+        Returns a writer that stores a result block by block under
+        ``result_id``.
+        """
+        if self.result_file_path(result_id) is None:
+            raise ValueError(f"Malformed result id: {result_id}")
+        return PredictionResultWriter(self, result_id)
+
+    async def wait(self, result_id: str) -> None:
+        """
+        Waits for a pending write of ``result_id``, if there is one.
+        """
+        pending = self._pending.get(result_id)
+        if pending is not None:
+            await asyncio.shield(pending)
+
+    async def drain(self) -> None:
+        if self._pending:
+            await asyncio.gather(*self._pending.values(), return_exceptions=True)
+
+    def result_written(self, file_path: str) -> None:
+        """
+        Counts a new result file, and enforces retention if that took the
+        store past a limit. Between scans only this process' writes are
+        counted, so the directory is also scanned again once
+        retention_scan_seconds have passed.
+        """
+        config = self.result_store_config
+        size = os.path.getsize(file_path)
+        with self._retention_lock:
+            self._total_count += 1
+            self._total_bytes += size
+            due = (self._scanned_at is None
+                   or time.monotonic() - self._scanned_at >= config.retention_scan_seconds
+                   or self._total_count > config.max_count or self._total_bytes > config.max_bytes
+                   or self._oldest_mtime < time.time() - config.max_age_seconds)
+        if due:
+            self.enforce_retention()
+
+    def enforce_retention(self) -> None:
+        """
+        Deletes results older than the maximum age, then, if the total size
+        or the count is over its limit, the oldest results until both are
+        down to low_water_ratio of their limits.
+        """
+        config = self.result_store_config
+        with self._retention_lock:
+            try:
+                entries = []
+                with os.scandir(config.result_dir) as scan:
+                    for entry in scan:
+                        if entry.name.endswith(config.file_extension):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                entries = []
+
+            entries.sort()
+            total_bytes = sum(size for _, size, _ in entries)
+            expired_before = time.time() - config.max_age_seconds
+            max_bytes, max_count = config.max_bytes, config.max_count
+            if total_bytes > max_bytes or len(entries) > max_count:
+                max_bytes = int(max_bytes * config.low_water_ratio)
+                max_count = int(max_count * config.low_water_ratio)
+            removed = 0
+            for mtime, size, path in entries:
+                remaining = len(entries) - removed
+                if mtime >= expired_before and total_bytes <= max_bytes and remaining <= max_count:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+                removed += 1
+
+            self._total_count  = len(entries) - removed
+            self._total_bytes  = total_bytes
+            self._oldest_mtime = entries[removed][0] if removed < len(entries) else float("inf")
+            self._scanned_at   = time.monotonic()
+            if removed:
+                logging.info(f"Prediction result retention removed {removed} results")
+
+    async def iter_encoded(self, result_id: str, output_format: str,
+                           batch_rows: int = PREDICTION_RESULT_STREAM_BATCH_ROWS) -> AsyncIterator[bytes]:
+        """
+        Re-encodes a stored result as CSV or NDJSON one record batch at a time.
+        """
+        parquet_file = await run_in_threadpool(pq.ParquetFile, self.result_file_path(result_id))
+        batches = parquet_file.iter_batches(batch_size=batch_rows)
+        first = True
+        try:
+            while True:
+                batch = await run_in_threadpool(next, batches, None)
+                if batch is None:
+                    break
+                yield await run_in_threadpool(encode_scored_frame, batch.to_pandas(), output_format, first)
+                first = False
+        finally:
+            parquet_file.close()
@@ -0,0 +1,139 @@
+import io
+import json
+import sys
+from typing import AsyncIterator, Awaitable, Callable
+
+import anyio
+import numpy as np
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+
+from etl_project.constants.serving import PREDICTION_COLUMN_NAME, STREAMING_UPLOAD_READ_SIZE
+from etl_project.serving.compression import DecompressedBodyTooLarge
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose content is produced while the request body is
+    still being read. The base class watches ``receive`` for a disconnect,
+    which would swallow body chunks; here the body reader notices the
+    disconnect itself (``request.stream()`` raises ClientDisconnect).
+    """
+    async def listen_for_disconnect(self, receive) -> None:
+        await anyio.sleep_forever()
+
+
+async def iter_upload_chunks(upload, read_size: int = STREAMING_UPLOAD_READ_SIZE) -> AsyncIterator[bytes]:
+    """
+    Reads an UploadFile in fixed-size byte chunks.
+    """
+    while True:
+        chunk = await upload.read(read_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def iter_csv_blocks(byte_chunks: AsyncIterator[bytes], rows_per_block: int) -> AsyncIterator[bytes]:
+    """
+    Regroups a CSV byte stream into self-contained CSV blocks.
+
+    Every block starts with the header line and holds at least
+    ``rows_per_block`` complete rows (the last block may hold fewer), so it
+    can be parsed on its own while the rest of the upload is still arriving.
+    Rows are split on newlines, so quoted fields must not contain newlines,
+    which holds for the numeric feature files the model consumes.
+    """
+    header = None
+    buffer = bytearray()
+    buffered_rows = 0
+
+    async for chunk in byte_chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+
+        if header is None:
+            header_end = buffer.find(b"\n")
+            if header_end < 0:
+                continue
+            header = bytes(buffer[:header_end + 1])
+            del buffer[:header_end + 1]
+            buffered_rows = buffer.count(b"\n")
+        else:
+            buffered_rows += chunk.count(b"\n")
+
+        if buffered_rows >= rows_per_block:
+            block_end = buffer.rfind(b"\n") + 1
+            yield header + bytes(buffer[:block_end])
+            del buffer[:block_end]
+            buffered_rows = 0
+
+    if header is not None and buffer.strip():
+        yield header + bytes(buffer)
+
+
+def encode_scored_frame(df: pd.DataFrame, output_format: str, include_header: bool) -> bytes:
+    """
+    Encodes scored rows as NDJSON or CSV.
+    """
+    try:
+        if output_format == "csv":
+            return df.to_csv(index=False, header=include_header).encode()
+        return df.to_json(orient="records", lines=True).encode()
+    except Exception as e:
+        raise ETLPipelineException(e, sys)
+
+
+async def stream_scored_csv(byte_chunks: AsyncIterator[bytes],
+                            predict: Callable[[pd.DataFrame], Awaitable[np.ndarray]],
+                            output_format: str, rows_per_block: int) -> AsyncIterator[bytes]:
+    """
+    Scores a CSV byte stream block by block and yields each encoded block as
+    soon as it is ready. Parsing and encoding run in the threadpool and
+    ``predict`` is awaited, so the event loop keeps serving other requests.
+
+    The status code is already sent when a block fails, so an NDJSON stream
+    ends with an error record and a CSV stream is cut short. A body found
+    too large before the first block is raised instead, for ``prime`` to
+    let the caller answer 413.
+    """
+    scored_blocks = 0
+    try:
+        async for block in iter_csv_blocks(byte_chunks, rows_per_block):
+            df = await run_in_threadpool(pd.read_csv, io.BytesIO(block))
+            df[PREDICTION_COLUMN_NAME] = await predict(df)
+            payload = await run_in_threadpool(encode_scored_frame, df, output_format,
+                                              scored_blocks == 0)
+            scored_blocks += 1
+            yield payload
+    except Exception as e:
+        if isinstance(e, DecompressedBodyTooLarge) and scored_blocks == 0:
+            raise
+        logging.error(f"Streaming prediction failed after {scored_blocks} blocks: {e}")
+        if output_format == "ndjson":
+            yield (json.dumps({"status": "error", "message": str(e)}) + "\n").encode()
+
+
+async def prime(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Runs stream up to its first item, so an error raised before it reaches
+    the caller while the status code can still be chosen, and returns a
+    stream of that item and the rest.
+    """
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def resumed() -> AsyncIterator[bytes]:
+        if first is None:
+            return
+        yield first
+        async for item in stream:
+            yield item
+
+    return resumed()
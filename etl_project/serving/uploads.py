@@ -0,0 +1,325 @@
+import asyncio
+import fcntl
+import hashlib
+import io
+import json
+import numbers
+import os
+import re
+import sys
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from etl_project.constants.serving import PREDICTION_COLUMN_NAME
+from etl_project.entity.config_entity import ChunkedUploadConfig
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from etl_project.serving.compression import DecompressedBodyTooLarge, iter_decompressed, split_compressed_filename
+from etl_project.serving.formats import detect_input_format
+from etl_project.serving.result_store import PredictionResultStore
+from etl_project.serving.streaming import iter_csv_blocks
+from etl_project.utils.main_utils.utils import file_lock
+
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _label_key(value) -> str:
+    # Numeric labels read 1 rather than 1.0; class names are kept as they are
+    if isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_)):
+        return format(value, "g")
+    return str(value)
+
+
+class UploadRequest(BaseModel):
+    filename : str = Field(min_length=1, max_length=255)
+    size     : int = Field(gt=0)
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status_code: int, offset: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset      = offset
+
+
+class ChunkedUploadStore:
+    """
+    Resumable uploads of large CSV files, sent in chunks and scored while
+    later chunks are still arriving.
+
+    Each upload is staged on disk as ``<id>.part`` with its state in
+    ``<id>.json``. A chunk is appended only at the committed offset, after
+    its SHA-256 is checked, and the offset is committed after the bytes are
+    written, so a client that lost a response asks for the state and
+    resends from the committed offset. Appends take a file lock, so
+    pre-forked workers can receive chunks of the same upload.
+
+    One scorer per upload, in whichever worker first holds the upload's
+    scoring lock, reads the staged bytes up to the committed offset, splits
+    them into CSV blocks and scores each block as soon as it is complete.
+    Scored blocks go straight into a result stored under the upload id. A
+    scorer that dies with its worker is restarted from the start of the
+    staged file by the next request for that upload.
+    """
+    def __init__(self, predict: Callable[[pd.DataFrame], Awaitable[np.ndarray]],
+                 result_store: PredictionResultStore, upload_config: ChunkedUploadConfig = None) -> None:
+        try:
+            self.predict        = predict
+            self.result_store   = result_store
+            self.upload_config  = upload_config or ChunkedUploadConfig()
+            self._scorers       : Dict[str, asyncio.Task] = {}
+            self._appended      : Dict[str, asyncio.Event] = {}
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _file_path(self, upload_id: str, extension: str) -> str:
+        return os.path.join(self.upload_config.upload_dir, upload_id + extension)
+
+    def _read_state(self, upload_id: str) -> Optional[dict]:
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            return None
+        try:
+            with open(self._file_path(upload_id, ".json")) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _write_state(self, state: dict) -> None:
+        state["updated_at"] = time.time()
+        file_path = self._file_path(state["upload_id"], ".json")
+        with open(file_path + ".tmp", "w") as file:
+            json.dump(state, file)
+        os.replace(file_path + ".tmp", file_path)
+
+    def _update_state(self, upload_id: str, **changes) -> dict:
+        with file_lock(self._file_path(upload_id, ".lock")):
+            state = self._read_state(upload_id)
+            state.update(changes)
+            self._write_state(state)
+            return state
+
+    @staticmethod
+    def public_state(state: dict) -> dict:
+        """
+        The state returned to clients: "receiving" becomes "scoring" once
+        every byte has arrived.
+        """
+        status = state["status"]
+        if status == "receiving" and state["offset"] >= state["size"]:
+            status = "scoring"
+        public = {name: value for name, value in state.items() if name != "encoding"}
+        public["status"] = status
+        return public
+
+    def _create(self, filename: str, size: int) -> dict:
+        try:
+            name, encoding = split_compressed_filename(filename)
+            if detect_input_format(None, name) != "csv":
+                raise UploadError("Chunked uploads take CSV files, optionally gzip or zstd compressed", 400)
+            if size > self.upload_config.max_bytes:
+                raise UploadError(f"Upload of {size:,} bytes is over the {self.upload_config.max_bytes:,} "
+                                  f"byte limit", 413)
+
+            self.enforce_retention()
+            upload_id = self.result_store.new_result_id()
+            os.makedirs(self.upload_config.upload_dir, exist_ok=True)
+            open(self._file_path(upload_id, ".part"), "wb").close()
+            state = {
+                "upload_id": upload_id,
+                "filename": filename,
+                "encoding": encoding,
+                "size": size,
+                "offset": 0,
+                "chunk_bytes": self.upload_config.chunk_bytes,
+                "status": "receiving",
+                "scored_rows": 0,
+                "prediction_counts": {},
+                "error": None,
+                "created_at": time.time(),
+            }
+            self._write_state(state)
+            logging.info(f"Created upload {upload_id} for {filename} ({size:,} bytes)")
+            return state
+        except UploadError:
+            raise
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    async def create(self, filename: str, size: int) -> dict:
+        state = await run_in_threadpool(self._create, filename, size)
+        return self.public_state(state)
+
+    def _append(self, upload_id: str, offset: int, data: bytes, checksum: Optional[str]) -> dict:
+        if checksum is not None and hashlib.sha256(data).hexdigest() != checksum.strip().lower():
+            raise UploadError("Chunk checksum does not match its SHA-256", 400)
+        if len(data) > self.upload_config.chunk_bytes:
+            raise UploadError(f"Chunks are limited to {self.upload_config.chunk_bytes:,} bytes", 413)
+        if self._read_state(upload_id) is None:
+            raise UploadError(f"Upload {upload_id} not found", 404)
+
+        with file_lock(self._file_path(upload_id, ".lock")):
+            state = self._read_state(upload_id)
+            if state["status"] != "receiving":
+                raise UploadError(f"Upload {upload_id} is {state['status']}", 409, state["offset"])
+            if offset < state["offset"] and offset + len(data) <= state["offset"]:
+                # A chunk resent after its response was lost is already committed
+                return state
+            if offset != state["offset"]:
+                raise UploadError(f"Expected the chunk at offset {state['offset']}", 409, state["offset"])
+            if offset + len(data) > state["size"]:
+                raise UploadError(f"Chunk ends past the declared size of {state['size']:,} bytes", 400,
+                                  state["offset"])
+
+            # Written in place, so bytes left past the offset by a failed append are overwritten
+            with open(self._file_path(upload_id, ".part"), "r+b") as file:
+                file.seek(offset)
+                file.write(data)
+            state["offset"] = offset + len(data)
+            self._write_state(state)
+            return state
+
+    async def append(self, upload_id: str, offset: int, data: bytes, checksum: Optional[str] = None) -> dict:
+        """
+        Appends a chunk at ``offset`` and returns the upload's state.
+        Raises UploadError with the committed offset if the chunk is not the
+        next one.
+        """
+        state = await run_in_threadpool(self._append, upload_id, offset, data, checksum)
+        self._appended.setdefault(upload_id, asyncio.Event()).set()
+        self.ensure_scoring(upload_id)
+        return self.public_state(state)
+
+    async def status(self, upload_id: str) -> Optional[dict]:
+        state = await run_in_threadpool(self._read_state, upload_id)
+        if state is None:
+            return None
+        if state["status"] == "receiving" and state["offset"] > 0:
+            self.ensure_scoring(upload_id)
+        return self.public_state(state)
+
+    def ensure_scoring(self, upload_id: str) -> None:
+        """
+        Starts this worker's scorer for the upload, unless one is running.
+        """
+        scorer = self._scorers.get(upload_id)
+        if scorer is None or scorer.done():
+            self._scorers[upload_id] = asyncio.ensure_future(self._score(upload_id))
+
+    def _read_part(self, upload_id: str, offset: int, size: int) -> bytes:
+        with open(self._file_path(upload_id, ".part"), "rb") as file:
+            file.seek(offset)
+            return file.read(size)
+
+    async def _staged_chunks(self, upload_id: str) -> AsyncIterator[bytes]:
+        """
+        Yields the staged bytes as they are committed, until the whole
+        declared size has been read.
+        """
+        appended = self._appended.setdefault(upload_id, asyncio.Event())
+        read_offset = 0
+        while True:
+            appended.clear()
+            state = await run_in_threadpool(self._read_state, upload_id)
+            if read_offset < state["offset"]:
+                data = await run_in_threadpool(self._read_part, upload_id, read_offset,
+                                               min(state["offset"] - read_offset, self.upload_config.read_size))
+                read_offset += len(data)
+                yield data
+            elif read_offset >= state["size"]:
+                return
+            else:
+                # Chunks received by another worker only show up in the state file
+                try:
+                    await asyncio.wait_for(appended.wait(), self.upload_config.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _score(self, upload_id: str) -> None:
+        lock_file = open(self._file_path(upload_id, ".scoring"), "a")
+        try:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is scoring this upload
+                return
+            state = await run_in_threadpool(self._read_state, upload_id)
+            if state is None or state["status"] != "receiving":
+                return
+
+            writer = self.result_store.open_writer(upload_id)
+            scored_rows, prediction_counts = 0, {}
+            try:
+                # A compressed upload is held to the same limit once decompressed
+                chunks = iter_decompressed(self._staged_chunks(upload_id), state["encoding"],
+                                           self.upload_config.max_bytes)
+                async for block in iter_csv_blocks(chunks, self.upload_config.rows_per_block):
+                    df = await run_in_threadpool(pd.read_csv, io.BytesIO(block))
+                    y_pred = np.asarray(await self.predict(df))
+                    df[PREDICTION_COLUMN_NAME] = y_pred
+                    await writer.write(df)
+
+                    scored_rows += len(df)
+                    for value, count in zip(*np.unique(y_pred, return_counts=True)):
+                        key = _label_key(value)
+                        prediction_counts[key] = prediction_counts.get(key, 0) + int(count)
+                    await run_in_threadpool(self._update_state, upload_id, scored_rows=scored_rows,
+                                            prediction_counts=prediction_counts)
+                await writer.close()
+            except asyncio.CancelledError:
+                # Shutting down: the next request for the upload scores it again
+                writer.abort()
+                raise
+            except Exception as score_error:
+                writer.abort()
+                error = str(score_error)
+                if isinstance(score_error, DecompressedBodyTooLarge):
+                    error = (f"Upload is larger than the {self.upload_config.max_bytes:,} byte limit "
+                             f"once decompressed")
+                logging.error(f"Scoring upload {upload_id} failed after {scored_rows} rows: {error}")
+                await run_in_threadpool(self._update_state, upload_id, status="failed", error=error)
+                await run_in_threadpool(self._remove_files, upload_id, (".part",))
+                return
+
+            await run_in_threadpool(self._update_state, upload_id, status="complete",
+                                    result_id=upload_id, result_url=f"/predictions/{upload_id}")
+            await run_in_threadpool(self._remove_files, upload_id, (".part",))
+            logging.info(f"Scored upload {upload_id}: {scored_rows:,} rows")
+        finally:
+            lock_file.close()
+            self._scorers.pop(upload_id, None)
+            self._appended.pop(upload_id, None)
+
+    def _remove_files(self, upload_id: str, extensions: tuple) -> None:
+        for extension in extensions:
+            try:
+                os.remove(self._file_path(upload_id, extension))
+            except FileNotFoundError:
+                pass
+
+    def enforce_retention(self) -> None:
+        """
+        Removes uploads, finished or not, not updated for the maximum age.
+        Their results are kept by the result store's own retention.
+        """
+        expired_before = time.time() - self.upload_config.max_age_seconds
+        try:
+            with os.scandir(self.upload_config.upload_dir) as scan:
+                expired = [entry.name[:-len(".json")] for entry in scan
+                           if entry.name.endswith(".json") and entry.stat().st_mtime < expired_before]
+        except FileNotFoundError:
+            return
+        for upload_id in expired:
+            self._remove_files(upload_id, (".json", ".part", ".lock", ".scoring"))
+        if expired:
+            logging.info(f"Upload retention removed {len(expired)} uploads")
+
+    async def shutdown(self) -> None:
+        scorers = list(self._scorers.values())
+        for scorer in scorers:
+            scorer.cancel()
+        await asyncio.gather(*scorers, return_exceptions=True)
@@ -0,0 +1,73 @@
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, List, Tuple
+import sys
+import time
+
+
+class ArtifactHandoff:
+    """
+    Hands artifacts from one pipeline stage to the next in memory.
+
+    A stage publishes each artifact under the file path it is persisted
+    to. The object is kept for the next stage, and a background thread
+    writes it to that path. The run's artifact directory ends up the same
+    as when every stage writes its files itself, but no stage waits for
+    those writes or parses the previous stage's files. ``get`` returns the
+    published object, or loads the file when the artifact came from
+    another run, e.g. a stage started on its own.
+
+    Published objects are shared with the writer thread and later stages,
+    so they must not be modified after they are published.
+    """
+    def __init__(self, max_workers: int = 1) -> None:
+        try:
+            self._artifacts: Dict[str, object] = {}
+            self._pending: List[Tuple[str, Future]] = []
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artifact-persist")
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def publish(self, file_path: str, artifact: object, persist: Callable[[str, object], object]) -> None:
+        """
+        Makes artifact the one at file_path, and persists it in the
+        background with persist(file_path, artifact).
+        """
+        try:
+            self._artifacts[file_path] = artifact
+            self._pending.append((file_path, self._executor.submit(persist, file_path, artifact)))
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def get(self, file_path: str, load: Callable[[str], object]) -> object:
+        try:
+            if file_path in self._artifacts:
+                return self._artifacts[file_path]
+            return load(file_path)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def wait(self) -> None:
+        """
+        Blocks until every published artifact is persisted, and raises the
+        first failure to persist one.
+        """
+        try:
+            started_at = time.perf_counter()
+            pending, self._pending = self._pending, []
+            for file_path, future in pending:
+                error = future.exception()
+                if error is not None:
+                    raise RuntimeError(f"Persisting {file_path} failed: {error}") from error
+            logging.info(f"Persisted {len(pending)} artifacts, waited {time.perf_counter() - started_at:.2f}s")
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def close(self) -> None:
+        """
+        Lets the writes still running finish and releases the artifacts.
+        """
+        self._executor.shutdown(wait=True)
+        self._artifacts.clear()
+        self._pending.clear()
@@ -0,0 +1,278 @@
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import bson
+import numpy as np
+import pandas as pd
+import sys
+
+# Fixed-width BSON element types: double, int32, int64 and boolean
+BSON_FIXED_WIDTH_TYPES = {0x01: np.dtype("<f8"), 0x10: np.dtype("<i4"), 0x12: np.dtype("<i8"), 0x08: np.dtype("?")}
+BSON_OBJECT_ID_TYPE    = 0x07
+BSON_NULL_TYPE         = 0x0A
+
+
+class ColumnBuffer:
+    """
+    A preallocated, typed column that batches of values are appended to.
+    It grows when more rows arrive than were reserved, and an integer
+    column becomes float64 the first time a value is missing (NaN) or
+    fractional. Given ``out``, values are written into that array (a slice
+    of a larger column) for as long as they fit it and keep its type.
+    """
+    def __init__(self, dtype: str, capacity: int, out: Optional[np.ndarray] = None) -> None:
+        self.array = out if out is not None else np.empty(max(capacity, 1), dtype=dtype)
+        self.size  = 0
+        self._out  = out
+
+    def _reserve(self, rows: int) -> None:
+        if self.size + rows > len(self.array):
+            grown = np.empty(max(self.size + rows, int(len(self.array) * 1.5)), dtype=self.array.dtype)
+            grown[:self.size] = self.array[:self.size]
+            self.array = grown
+
+    def append(self, values: np.ndarray) -> None:
+        # NaN never equals itself, so missing values fail the check too
+        if self.array.dtype.kind in "iub" and values.dtype.kind == "f" and not (values == np.trunc(values)).all():
+            self.array = self.array.astype(np.float64)
+        self._reserve(len(values))
+        self.array[self.size:self.size + len(values)] = values
+        self.size += len(values)
+
+    @property
+    def filled_out(self) -> bool:
+        """
+        Whether exactly ``out`` was filled, with no values written elsewhere.
+        """
+        return self._out is not None and self.array is self._out and self.size == len(self._out)
+
+    def finish(self) -> np.ndarray:
+        # Only copied when the reserved capacity was more than the rows exported
+        return self.array if self.size == len(self.array) else self.array[:self.size].copy()
+
+
+def _missing_values(rows: int) -> np.ndarray:
+    return np.full(rows, np.nan)
+
+
+def decode_fixed_layout(raw_batch: bytes, columns: List[str]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Decodes a batch of raw BSON documents into one array per column when
+    every document has the same fields, in the same order, with the same
+    fixed-width types: the batch is then an array of fixed-size records
+    and each field a strided view of it, read without decoding any
+    document. Returns None when the batch does not have such a layout.
+    """
+    document_size = int.from_bytes(raw_batch[:4], "little")
+    if document_size == 0 or len(raw_batch) % document_size:
+        return None
+
+    # Parse the first document: where each value is, and the runs of bytes
+    # (lengths, types, names) that must be the same in every document
+    fields, structure, position = {}, [], 4
+    while position < document_size - 1:
+        element_type = raw_batch[position]
+        name_end = raw_batch.index(b"\x00", position + 1)
+        name = raw_batch[position + 1:name_end].decode()
+        structure.append((position, name_end + 1))
+        position = name_end + 1
+        if element_type in BSON_FIXED_WIDTH_TYPES:
+            fields[name] = (BSON_FIXED_WIDTH_TYPES[element_type], position)
+            position += BSON_FIXED_WIDTH_TYPES[element_type].itemsize
+        elif element_type == BSON_OBJECT_ID_TYPE:
+            position += 12
+        elif element_type != BSON_NULL_TYPE:
+            return None
+    structure += [(0, 4), (document_size - 1, document_size)]
+
+    documents = np.frombuffer(raw_batch, dtype=np.uint8).reshape(-1, document_size)
+    for start, end in structure:
+        if not (documents[:, start:end] == documents[0, start:end]).all():
+            return None
+
+    present = [column for column in columns if column in fields]
+    records = np.frombuffer(raw_batch, dtype=np.dtype({
+        "names": present,
+        "formats": [fields[column][0] for column in present],
+        "offsets": [fields[column][1] for column in present],
+        "itemsize": document_size,
+    }))
+    return {column: records[column] if column in fields else _missing_values(len(records)) for column in columns}
+
+
+def decode_documents(raw_batch: bytes, columns: List[str], required: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+    """
+    Decodes a batch of raw BSON documents of any layout into one array per
+    column; missing and null values become NaN. Documents missing a value
+    for any of the ``required`` columns are skipped.
+    """
+    documents = bson.decode_all(raw_batch)
+    if required:
+        documents = [document for document in documents
+                     if all(document.get(column) is not None for column in required)]
+    decoded = {}
+    for column in columns:
+        values = [document.get(column) for document in documents]
+        if any(value is None for value in values):
+            decoded[column] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        else:
+            decoded[column] = np.asarray(values)
+    return decoded
+
+
+class MongoColumnExporter:
+    """
+    Exports a Mongo collection into a DataFrame of typed columns without
+    materialising its documents.
+
+    The query is sent with a projection of just ``columns`` (no ``_id``),
+    and the cursor is read as raw BSON batches of ``batch_size`` documents.
+    Each batch is decoded straight into per-column arrays, by reading the
+    values at fixed byte offsets when all its documents share a layout
+    (see ``decode_fixed_layout``) and by decoding the documents otherwise,
+    and appended to column buffers preallocated from the collection's
+    document count. Peak memory is the columns plus one raw batch.
+    """
+    def __init__(self, collection, columns: Dict[str, str], batch_size: int = 20_000) -> None:
+        try:
+            self.collection = collection
+            self.columns    = columns
+            self.batch_size = batch_size
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _expected_documents(self, query: dict) -> int:
+        if query:
+            return self.collection.count_documents(query)
+        return self.collection.estimated_document_count()
+
+    def _read(self, query: dict, buffers: Dict[str, ColumnBuffer]) -> None:
+        names = list(self.columns)
+        projection = {"_id": 0, **{column: 1 for column in names}}
+        fixed_batches = decoded_batches = 0
+        cursor = self.collection.find_raw_batches(query, projection, batch_size=self.batch_size)
+        for raw_batch in cursor:
+            columns = decode_fixed_layout(raw_batch, names)
+            if columns is None:
+                columns = decode_documents(raw_batch, names)
+                decoded_batches += 1
+            else:
+                fixed_batches += 1
+            for column, values in columns.items():
+                buffers[column].append(values)
+        logging.info(f"Exported {next(iter(buffers.values())).size:,} documents matching {query} in "
+                     f"{fixed_batches} fixed-layout and {decoded_batches} decoded batches")
+
+    def export(self, query: Optional[dict] = None, expected_documents: Optional[int] = None) -> pd.DataFrame:
+        try:
+            query = query or {}
+            if expected_documents is None:
+                expected_documents = self._expected_documents(query)
+            buffers = {column: ColumnBuffer(dtype, expected_documents) for column, dtype in self.columns.items()}
+            self._read(query, buffers)
+            return pd.DataFrame({column: buffer.finish() for column, buffer in buffers.items()}, copy=False)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def export_with_keys(self, query: Optional[dict] = None,
+                         key_fields: Sequence[str] = ("_id",)) -> Tuple[pd.DataFrame, List[tuple]]:
+        """
+        ``export`` that also returns the values of ``key_fields`` of every
+        exported document, in row order; documents missing any of them are
+        skipped. Every document is decoded, so this is meant for queries
+        matching few documents.
+        """
+        try:
+            names = list(self.columns)
+            fields = names + [field for field in key_fields if field not in self.columns]
+            buffers = {column: ColumnBuffer(dtype, 0) for column, dtype in self.columns.items()}
+            keys = []
+            cursor = self.collection.find_raw_batches(query or {}, {field: 1 for field in fields},
+                                                      batch_size=self.batch_size)
+            for raw_batch in cursor:
+                decoded = decode_documents(raw_batch, fields, required=key_fields)
+                for column in names:
+                    buffers[column].append(decoded[column])
+                keys.extend(zip(*(decoded[field].tolist() for field in key_fields)))
+            logging.info(f"Exported {len(keys):,} documents matching {query} with their {list(key_fields)}")
+            return pd.DataFrame({column: buffer.finish() for column, buffer in buffers.items()}, copy=False), keys
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def sample_boundaries(self, partitions: int, partition_field: str = "_id",
+                          samples_per_partition: int = 32) -> list:
+        """
+        Returns up to ``partitions - 1`` values of ``partition_field`` that
+        split the collection into ranges of about the same number of
+        documents, the quantiles of a server-side $sample.
+        """
+        try:
+            sample = self.collection.aggregate([
+                {"$sample": {"size": partitions * samples_per_partition}},
+                {"$project": {"_id": 0, "value": f"${partition_field}"}},
+            ])
+            values = sorted(document["value"] for document in sample if document.get("value") is not None)
+            if not values:
+                return []
+            return sorted({values[len(values) * partition // partitions] for partition in range(1, partitions)})
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def export_parallel(self, partitions: int, partition_field: str = "_id",
+                        samples_per_partition: int = 32, query: Optional[dict] = None) -> pd.DataFrame:
+        """
+        Exports the documents matching ``query`` (all of them by default) as
+        ``partitions`` ranges of ``partition_field`` (an indexed field every
+        document has), each read by its own thread with its own cursor. The collection's client is shared, and its
+        connection pool gives each cursor a connection.
+
+        Every range is counted first, so the columns are allocated once and
+        each range is decoded straight into its own slice of them: the
+        partitions need no concatenating. A range whose count changed while
+        it was read, or that changed a column's type, is copied in at the
+        end instead.
+        """
+        try:
+            boundaries = self.sample_boundaries(partitions, partition_field, samples_per_partition)
+            if not boundaries:
+                return self.export(query)
+            bounds = list(zip([None, *boundaries], [*boundaries, None]))
+            queries = [{partition_field: {**({"$gte": lower} if lower is not None else {}),
+                                          **({"$lt": upper} if upper is not None else {})}}
+                       for lower, upper in bounds]
+            if query:
+                queries = [{"$and": [query, range_query]} for range_query in queries]
+
+            with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="mongo-export") as pool:
+                counts = list(pool.map(self.collection.count_documents, queries))
+                offsets = np.concatenate([[0], np.cumsum(counts)])
+                columns = {column: np.empty(int(offsets[-1]), dtype=dtype) for column, dtype in self.columns.items()}
+
+                def read_range(partition: int) -> Dict[str, ColumnBuffer]:
+                    start, end = offsets[partition], offsets[partition + 1]
+                    buffers = {column: ColumnBuffer(dtype, 0, out=columns[column][start:end])
+                               for column, dtype in self.columns.items()}
+                    self._read(queries[partition], buffers)
+                    return buffers
+
+                partition_buffers = list(pool.map(read_range, range(len(queries))))
+
+            for column in self.columns:
+                buffers = [buffers[column] for buffers in partition_buffers]
+                if not all(buffer.filled_out for buffer in buffers):
+                    logging.info(f"Column {column} changed while it was exported, concatenating its ranges")
+                    columns[column] = np.concatenate([buffer.finish() for buffer in buffers])
+            logging.info(f"Exported {len(columns[next(iter(columns))]):,} documents in {len(queries)} "
+                         f"{partition_field} ranges "
+                         f"of {min(counts):,} to {max(counts):,} documents")
+            return pd.DataFrame(columns, copy=False)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+
+def schema_column_types(schema: dict) -> Dict[str, str]:
+    """
+    Returns {column: dtype} from a schema's ``columns`` list.
+    """
+    return {name: dtype for column in schema["columns"] for name, dtype in column.items()}
@@ -3,12 +3,12 @@ from etl_project.logging.logger import logging
 import numpy as np
 import os
 import sys
+import fcntl
 import dill
 import pickle
 import yaml
+from contextlib import contextmanager
 
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
 
 def read_yaml_file(file_path: str) -> dict:
     try:
@@ -44,18 +44,38 @@ def save_object(file_path: str, obj: object):
     try:
         logging.info("Entered save_object method in /utils/main_utils/utils.py")
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "wb") as file:
+        # Write next to the target and rename, so readers never see a partial pickle
+        tmp_file_path = f"{file_path}.tmp"
+        with open(tmp_file_path, "wb") as file:
             pickle.dump(obj, file)
+        os.replace(tmp_file_path, file_path)
         logging.info("Exited save_obj method")
     except Exception as e:
         raise ETLPipelineException(e, sys)
 
+@contextmanager
+def file_lock(lock_file_path: str, shared: bool = False):
+    """
+    Holds a lock on lock_file_path across processes: exclusive for writers,
+    or shared with other readers when shared is True.
+    """
+    try:
+        os.makedirs(os.path.dirname(lock_file_path), exist_ok=True)
+        lock_file = open(lock_file_path, "a")
+    except Exception as e:
+        raise ETLPipelineException(e, sys)
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
 def load_object(file_path: str, ) -> object:
     try:
         if not os.path.exists(file_path):
             raise Exception(f"The file: {file_path} is not exists")
         with open(file_path, "rb") as file_obj:
-            print(file_obj)
             return pickle.load(file_obj)
     except Exception as e:
         raise ETLPipelineException(e, sys) from e
@@ -75,6 +95,10 @@ def load_numpy_array_data(file_path: str) -> np.array:
 
 
 def evaluate_models(X_train, y_train,X_test,y_test,models,param):
+    # Imported here so serving, which only loads and saves objects, doesn't pay for them
+    from sklearn.metrics import r2_score
+    from sklearn.model_selection import GridSearchCV
+
     try:
         report = {}
 
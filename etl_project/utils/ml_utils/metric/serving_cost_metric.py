@@ -0,0 +1,75 @@
+from etl_project.entity.artifact_entity import ServingCostArtifact
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.utils.ml_utils.model.compiled_ensemble import CompiledTreeEnsemble
+from etl_project.utils.ml_utils.model.estimator import ETLModel
+import numpy as np
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+def get_serving_cost(etl_model: ETLModel, X: np.ndarray, latency_samples: int = 200,
+                     batch_rows: int = 1_000, seed: int = 0) -> ServingCostArtifact:
+    """
+    Measures what serving the model costs on transformed rows X: the p50/p99
+    latency of scoring one row, the time to score a batch, the size of the
+    pickled model and the peak memory of loading the published model files
+    and scoring.
+    The model is scored the way serving scores it, so a compiled ensemble is
+    used for the batch sizes it serves. The preprocessor is left out, being
+    the same for every candidate.
+    """
+    try:
+        rng   = np.random.default_rng(seed)
+        rows  = X[rng.integers(0, X.shape[0], size=latency_samples)]
+        batch = X[rng.integers(0, X.shape[0], size=batch_rows)]
+
+        single_row_model = etl_model.estimator_for(1)
+        batch_model      = etl_model.estimator_for(batch_rows)
+        single_row_model.predict(rows[:1])
+        batch_model.predict(batch)
+
+        timings = np.empty(latency_samples)
+        for i in range(latency_samples):
+            started_at = time.perf_counter()
+            single_row_model.predict(rows[i:i + 1])
+            timings[i] = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        batch_model.predict(batch)
+        batch_seconds = time.perf_counter() - started_at
+
+        # Loaded as published: the pickled model and its compiled .npz. Only the
+        # pickle counts towards the size limit, the .npz being derived from it
+        pickled_model = pickle.dumps(etl_model.model, protocol=pickle.HIGHEST_PROTOCOL)
+        model_size_bytes = len(pickled_model)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            compiled_model_file_path = os.path.join(tmp_dir, "model.npz")
+            if etl_model.compiled_model is not None:
+                etl_model.compiled_model.save(compiled_model_file_path)
+
+            # Started after timing, as tracing slows every allocation down
+            tracemalloc.start()
+            try:
+                compiled_model = None
+                if etl_model.compiled_model is not None:
+                    compiled_model = CompiledTreeEnsemble.load(compiled_model_file_path)
+                loaded_model = ETLModel(preprocessor=None, model=pickle.loads(pickled_model),
+                                        compiled_model=compiled_model)
+                loaded_model.estimator_for(1).predict(rows[:1])
+                loaded_model.estimator_for(batch_rows).predict(batch)
+                _, peak_bytes = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        serving_cost = ServingCostArtifact(single_row_p50_ms=float(np.percentile(timings, 50) * 1000),
+                                           single_row_p99_ms=float(np.percentile(timings, 99) * 1000),
+                                           batch_rows=batch_rows,
+                                           batch_ms=batch_seconds * 1000,
+                                           model_size_mb=model_size_bytes / 2**20,
+                                           peak_memory_mb=peak_bytes / 2**20)
+        return serving_cost
+    except Exception as e:
+        raise ETLPipelineException(e, sys)
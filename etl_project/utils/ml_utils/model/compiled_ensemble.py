@@ -0,0 +1,340 @@
+import sys
+from typing import Optional
+
+import numpy as np
+
+from etl_project.exception.exception import ETLPipelineException
+from etl_project.logging.logger import logging
+
+ENSEMBLE_KINDS = ("tree", "forest", "gradient_boosting")
+
+# Rows predicted together; bounds the (rows x trees) arrays of a block
+BLOCK_ROWS = 2048
+
+# (row, tree) pairs advanced per traversal step
+STEP_PAIRS = 16384
+
+# Largest batch ETLModel scores with the compiled ensemble. Small batches
+# are dominated by sklearn's per-tree call overhead, which the compiled
+# ensemble doesn't have; on large batches sklearn's compiled per-tree
+# traversal is faster than stepping through all trees with NumPy
+COMPILED_MAX_BATCH_ROWS = 128
+
+# Rows of the synthetic parity check when no reference data is given
+PARITY_CHECK_ROWS = 2048
+
+
+class CompiledTreeEnsemble:
+    """
+    A fitted sklearn tree classifier (DecisionTreeClassifier,
+    RandomForestClassifier / ExtraTreesClassifier or
+    GradientBoostingClassifier) compiled into flat NumPy arrays.
+
+    The nodes of all trees are concatenated: ``feature``, ``threshold``,
+    ``left``, ``right`` and ``missing_go_to_left`` per node, ``roots`` per
+    tree. A leaf has feature -1 and its ``left`` holds its row in
+    ``leaf_values``, which keeps only what prediction reads: the class
+    probabilities each tree's predict_proba returns for trees and forests,
+    and learning-rate-scaled values for gradient boosting.
+
+    ``predict`` walks every tree for a block of rows at once, one tree
+    level per step, dropping (row, tree) pairs as they reach a leaf.
+    Inputs are compared as float32 and trees are summed in fit order, as
+    sklearn does, so predictions and probabilities match the estimator's
+    bit for bit.
+    """
+    def __init__(self, kind: str, classes: np.ndarray, n_features: int, roots: np.ndarray,
+                 feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 missing_go_to_left: np.ndarray, leaf_values: np.ndarray,
+                 init_raw: Optional[np.ndarray] = None, loss: str = "") -> None:
+        try:
+            if kind not in ENSEMBLE_KINDS:
+                raise ValueError(f"kind must be one of {ENSEMBLE_KINDS}, got {kind!r}")
+            self.kind               = kind
+            self.classes_           = classes
+            self.n_features_in_     = int(n_features)
+            self.roots              = roots.astype(np.intp)
+            self.feature            = feature.astype(np.intp)
+            self.threshold          = threshold.astype(np.float64)
+            self.left               = left.astype(np.intp)
+            self.right              = right.astype(np.intp)
+            self.missing_go_to_left = missing_go_to_left.astype(bool)
+            self.leaf_values        = leaf_values.astype(np.float64)
+            self.init_raw           = init_raw
+            self.loss               = loss
+            self._prepare_traversal()
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _prepare_traversal(self) -> None:
+        """
+        Derives the arrays the traversal reads. Leaves become splits on
+        feature 0 at +inf whose children are the leaf itself, and each
+        float64 threshold becomes the largest float32 not above it, so
+        comparing float32 inputs against it decides exactly like sklearn.
+        """
+        self._is_leaf = self.feature < 0
+        nodes = np.arange(self.feature.shape[0], dtype=np.intp)
+        self._children = np.empty(2 * nodes.shape[0], dtype=np.intp)
+        self._children[0::2] = np.where(self._is_leaf, nodes, self.left)
+        self._children[1::2] = np.where(self._is_leaf, nodes, self.right)
+        self._split_feature = np.where(self._is_leaf, 0, self.feature)
+        threshold32 = self.threshold.astype(np.float32)
+        rounded_up = threshold32.astype(np.float64) > self.threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+        threshold32[self._is_leaf] = np.inf
+        self._split_threshold = threshold32
+        self._missing_go_to_right = ~self.missing_go_to_left & ~self._is_leaf
+
+    @classmethod
+    def from_estimator(cls, estimator, X_check: Optional[np.ndarray] = None) -> Optional["CompiledTreeEnsemble"]:
+        """
+        Compiles a fitted estimator, or returns None if its type (or its
+        configuration) isn't supported or the compiled ensemble doesn't
+        reproduce its predictions on ``X_check`` (synthetic rows around the
+        split thresholds if not given).
+        """
+        from sklearn.dummy import DummyClassifier
+        from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+        from sklearn.tree import DecisionTreeClassifier
+
+        try:
+            init_raw, loss = None, ""
+            if isinstance(estimator, DecisionTreeClassifier):
+                kind, trees, scale = "tree", [estimator], None
+            elif isinstance(estimator, (RandomForestClassifier, ExtraTreesClassifier)):
+                kind, trees, scale = "forest", list(estimator.estimators_), None
+            elif isinstance(estimator, GradientBoostingClassifier):
+                if not (estimator.init_ == "zero" or isinstance(estimator.init_, DummyClassifier)):
+                    return None
+                kind, trees, scale = "gradient_boosting", list(estimator.estimators_.ravel()), estimator.learning_rate
+                # The default init is a class prior, the same raw value for every row
+                init_raw = estimator._raw_predict_init(np.zeros((1, estimator.n_features_in_), dtype=np.float32))[0]
+                loss = estimator.loss
+            else:
+                return None
+            if getattr(estimator, "n_outputs_", 1) != 1:
+                return None
+
+            parts = {name: [] for name in ("roots", "feature", "threshold", "left", "right",
+                                           "missing_go_to_left", "leaf_values")}
+            node_offset = leaf_offset = 0
+            for tree in trees:
+                tree_ = tree.tree_
+                is_leaf = tree_.children_left == -1
+                leaf_ids = np.cumsum(is_leaf) - 1 + leaf_offset
+                parts["roots"].append(node_offset)
+                parts["feature"].append(np.where(is_leaf, -1, tree_.feature))
+                parts["threshold"].append(tree_.threshold)
+                parts["left"].append(np.where(is_leaf, leaf_ids, tree_.children_left + node_offset))
+                parts["right"].append(np.where(is_leaf, leaf_ids, tree_.children_right + node_offset))
+                parts["missing_go_to_left"].append(getattr(tree_, "missing_go_to_left",
+                                                           np.zeros(tree_.node_count, dtype=np.uint8)))
+                values = tree_.value[is_leaf, 0, :]
+                if kind != "gradient_boosting":
+                    # What the tree's predict_proba returns for the leaf. sklearn >= 1.4 keeps class
+                    # fractions and returns them as they are: normalizing again can change the last bit
+                    normalizer = values.sum(axis=1, keepdims=True)
+                    if not np.allclose(normalizer, 1.0, rtol=0.0, atol=1e-9):
+                        normalizer[normalizer == 0.0] = 1.0
+                        values = values / normalizer
+                else:
+                    values = scale * values
+                parts["leaf_values"].append(values)
+                node_offset += tree_.node_count
+                leaf_offset += int(is_leaf.sum())
+
+            compiled = cls(
+                kind               = kind,
+                classes            = estimator.classes_,
+                n_features         = estimator.n_features_in_,
+                roots              = np.asarray(parts["roots"]),
+                feature            = np.concatenate(parts["feature"]),
+                threshold          = np.concatenate(parts["threshold"]),
+                left               = np.concatenate(parts["left"]),
+                right              = np.concatenate(parts["right"]),
+                missing_go_to_left = np.concatenate(parts["missing_go_to_left"]),
+                leaf_values        = np.concatenate(parts["leaf_values"]),
+                init_raw           = init_raw,
+                loss               = loss,
+            )
+            if X_check is None:
+                X_check = compiled.synthetic_rows()
+            if not compiled.matches(estimator, X_check):
+                logging.warning(f"Compiled {type(estimator).__name__} does not match the estimator's "
+                                f"predictions, keeping the sklearn model")
+                return None
+            return compiled
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def synthetic_rows(self, n_rows: int = PARITY_CHECK_ROWS, seed: int = 0) -> np.ndarray:
+        """
+        Random rows whose values sit exactly on, or just above, the split
+        thresholds, so they exercise both branches of most splits.
+        """
+        rng = np.random.default_rng(seed)
+        X = np.zeros((n_rows, self.n_features_in_), dtype=np.float32)
+        for column in range(self.n_features_in_):
+            thresholds = self._split_threshold[~self._is_leaf & (self.feature == column)]
+            candidates = np.concatenate([thresholds, np.nextafter(thresholds, np.float32(np.inf))])
+            candidates = candidates[np.isfinite(candidates)]
+            if candidates.size:
+                X[:, column] = rng.choice(candidates, size=n_rows)
+        return X
+
+    def matches(self, estimator, X: np.ndarray) -> bool:
+        """
+        Returns True if this ensemble gives the estimator's predictions and
+        probabilities on X.
+        """
+        try:
+            if not np.array_equal(self.predict(X), estimator.predict(X)):
+                return False
+            if self.kind == "gradient_boosting" and self.loss not in ("log_loss", "exponential"):
+                return True
+            return np.allclose(self.predict_proba(X), estimator.predict_proba(X), rtol=1e-12, atol=1e-12)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _leaf_rows(self, X32: np.ndarray) -> np.ndarray:
+        """
+        Returns the leaf_values row every tree reaches for every row of
+        X32, as an (n_rows, n_trees) array.
+
+        Trees are walked a group at a time, sized so one step handles about
+        STEP_PAIRS (row, tree) pairs: small batches walk all trees together,
+        large ones keep a few trees' nodes in cache. Leaves loop back to
+        themselves, so pairs that reach one early are only dropped from the
+        work arrays once enough of them have.
+        """
+        n_rows, n_trees = X32.shape[0], self.roots.shape[0]
+        flat_x = X32.ravel()
+        has_missing = bool(np.isnan(flat_x).any())
+        tree_group = int(min(max(STEP_PAIRS // n_rows, 1), n_trees))
+        leaf_rows = np.empty((n_rows, n_trees), dtype=np.intp)
+
+        for first_tree in range(0, n_trees, tree_group):
+            roots = self.roots[first_tree:first_tree + tree_group]
+            node = np.tile(roots, n_rows)
+            # Offset of each pair's row in flat_x, and the pair's slot in the result
+            row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * self.n_features_in_, roots.shape[0])
+            slot = np.arange(node.shape[0])
+            result = np.empty_like(node)
+            while True:
+                x = flat_x[row_offset + self._split_feature[node]]
+                go_right = x > self._split_threshold[node]
+                if has_missing:
+                    go_right |= np.isnan(x) & self._missing_go_to_right[node]
+                node = self._children[2 * node + go_right]
+                at_leaf = self._is_leaf[node]
+                n_at_leaf = np.count_nonzero(at_leaf)
+                if n_at_leaf == node.shape[0]:
+                    result[slot] = node
+                    break
+                if n_at_leaf * 4 > node.shape[0]:
+                    result[slot[at_leaf]] = node[at_leaf]
+                    inside = ~at_leaf
+                    node, row_offset, slot = node[inside], row_offset[inside], slot[inside]
+            leaf_rows[:, first_tree:first_tree + tree_group] = self.left[result].reshape(n_rows, -1)
+        return leaf_rows
+
+    def _check_input(self, X) -> np.ndarray:
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        if X32.ndim != 2 or X32.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X32.shape}, but the model expects {self.n_features_in_} features")
+        return X32
+
+    def _block_output(self, X32: np.ndarray) -> np.ndarray:
+        """
+        Probabilities (tree), mean probabilities (forest) or raw predictions
+        (gradient boosting) for one block of rows.
+        """
+        # (trees, rows, values). Trees are summed with a running sum, which
+        # adds them one after another in fit order like sklearn (a plain sum
+        # may add them pairwise and round differently)
+        per_tree = self.leaf_values[self._leaf_rows(X32).T]
+        if self.kind == "tree":
+            return per_tree[0]
+        if self.kind == "forest":
+            return np.add.accumulate(per_tree, axis=0, out=per_tree)[-1] / per_tree.shape[0]
+
+        n_outputs = self.init_raw.shape[0]
+        per_stage = per_tree.reshape(-1, n_outputs, X32.shape[0]).transpose(0, 2, 1) if n_outputs > 1 else per_tree
+        init = np.broadcast_to(self.init_raw, (1, X32.shape[0], n_outputs))
+        stages = np.concatenate([init, per_stage])
+        return np.add.accumulate(stages, axis=0, out=stages)[-1]
+
+    def _output(self, X) -> np.ndarray:
+        X32 = self._check_input(X)
+        if X32.shape[0] <= BLOCK_ROWS:
+            return self._block_output(X32)
+        return np.concatenate([self._block_output(X32[start:start + BLOCK_ROWS])
+                               for start in range(0, X32.shape[0], BLOCK_ROWS)])
+
+    def predict(self, X) -> np.ndarray:
+        try:
+            output = self._output(X)
+            if self.kind == "gradient_boosting" and output.shape[1] == 1:
+                return self.classes_[(output[:, 0] >= 0).astype(int)]
+            return self.classes_.take(np.argmax(output, axis=1), axis=0)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def predict_proba(self, X) -> np.ndarray:
+        try:
+            output = self._output(X)
+            if self.kind in ("tree", "forest"):
+                return output
+
+            from scipy.special import expit, softmax
+            if output.shape[1] > 1:
+                return softmax(output, axis=1)
+            proba = np.empty((output.shape[0], 2), dtype=output.dtype)
+            proba[:, 1] = expit(2 * output[:, 0] if self.loss == "exponential" else output[:, 0])
+            proba[:, 0] = 1 - proba[:, 1]
+            return proba
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def save(self, file_path: str) -> None:
+        """
+        Writes the arrays to an uncompressed .npz file, which loads without
+        unpickling any Python objects.
+        """
+        try:
+            arrays = {
+                "kind": np.array(self.kind), "loss": np.array(self.loss), "classes": self.classes_,
+                "n_features": np.array(self.n_features_in_), "roots": self.roots.astype(np.int32),
+                "feature": self.feature.astype(np.int32), "threshold": self.threshold,
+                "left": self.left.astype(np.int32), "right": self.right.astype(np.int32),
+                "missing_go_to_left": self.missing_go_to_left.astype(np.uint8),
+                "leaf_values": self.leaf_values,
+            }
+            if self.init_raw is not None:
+                arrays["init_raw"] = self.init_raw
+            with open(file_path, "wb") as file:
+                np.savez(file, **arrays)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    @classmethod
+    def load(cls, file_path: str) -> "CompiledTreeEnsemble":
+        try:
+            with np.load(file_path, allow_pickle=False) as arrays:
+                return cls(
+                    kind               = str(arrays["kind"]),
+                    classes            = arrays["classes"],
+                    n_features         = int(arrays["n_features"]),
+                    roots              = arrays["roots"],
+                    feature            = arrays["feature"],
+                    threshold          = arrays["threshold"],
+                    left               = arrays["left"],
+                    right              = arrays["right"],
+                    missing_go_to_left = arrays["missing_go_to_left"],
+                    leaf_values        = arrays["leaf_values"],
+                    init_raw           = arrays["init_raw"] if "init_raw" in arrays else None,
+                    loss               = str(arrays["loss"]),
+                )
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
@@ -1,21 +1,85 @@
 import os
 import sys
+import numpy as np
+import pandas as pd
+from typing import Callable, Optional
 from etl_project.exception.exception import ETLPipelineException
 from etl_project.logging.logger import logging
 from etl_project.constants.training_pipeline import SAVED_MODEL_DIR, MODEL_FILE_NAME
+from etl_project.utils.ml_utils.model.compiled_ensemble import COMPILED_MAX_BATCH_ROWS, CompiledTreeEnsemble
 
 class ETLModel:
-    def __init__(self, preprocessor, model):
+    def __init__(self, preprocessor, model, compiled_model: CompiledTreeEnsemble = None,
+                 model_loader: Optional[Callable[[], object]] = None):
         try:
-            self.preprocessor = preprocessor
-            self.model        = model
+            self.preprocessor   = preprocessor
+            self.model          = model
+            self.compiled_model = compiled_model
+            # Loads the model when it is left out (None) and first needed
+            self.model_loader   = model_loader
         except Exception as e:
             raise ETLPipelineException(e,sys)
+
+    def _load_model(self):
+        if self.model is None and getattr(self, "model_loader", None) is not None:
+            self.model = self.model_loader()
+        return self.model
+
+    def compile(self, X_check=None) -> "ETLModel":
+        """
+        Returns an ETLModel that also holds the model compiled into a
+        CompiledTreeEnsemble, or this one if the model can't be compiled.
+        """
+        try:
+            compiled_model = CompiledTreeEnsemble.from_estimator(self.model, X_check)
+            if compiled_model is None:
+                return self
+            return ETLModel(preprocessor=self.preprocessor, model=self.model, compiled_model=compiled_model)
+        except Exception as e:
+            raise ETLPipelineException(e,sys)
+
+    def estimator_for(self, n_rows: int):
+        """
+        Returns the compiled ensemble for batches it scores faster than
+        sklearn (up to COMPILED_MAX_BATCH_ROWS rows) and the sklearn model
+        for larger ones.
+        """
+        # Models pickled before compilation existed have no compiled_model
+        compiled_model = getattr(self, "compiled_model", None)
+        if compiled_model is None:
+            return self._load_model()
+        # A single sklearn tree has no per-tree overhead to save
+        if compiled_model.kind != "tree" and n_rows <= COMPILED_MAX_BATCH_ROWS:
+            return compiled_model
+        model = self._load_model()
+        return compiled_model if model is None else model
     
     def predict(self,x):
         try:
             x_transform = self.preprocessor.transform(x)
-            y_hat = self.model.predict(x_transform)
+            y_hat = self.estimator_for(x_transform.shape[0]).predict(x_transform)
             return y_hat
         except Exception as e:
-            raise ETLPipelineException(e,sys)
\ No newline at end of file
+            raise ETLPipelineException(e,sys)
+
+    def predict_array(self, x):
+        """
+        Predicts from a 2-D float64 array in the training column order.
+        Preprocessing steps that provide ``transform_array`` use it to skip
+        input validation; others fall back to ``transform``, with the array
+        wrapped in a DataFrame if the step was fitted with feature names.
+        """
+        try:
+            steps = getattr(self.preprocessor, "steps", [(None, self.preprocessor)])
+            x_transform = x
+            for _, step in steps:
+                if hasattr(step, "transform_array"):
+                    x_transform = step.transform_array(x_transform)
+                    continue
+                if hasattr(step, "feature_names_in_") and isinstance(x_transform, np.ndarray):
+                    x_transform = pd.DataFrame(x_transform, columns=step.feature_names_in_, copy=False)
+                x_transform = step.transform(x_transform)
+            y_hat = self.estimator_for(x_transform.shape[0]).predict(x_transform)
+            return y_hat
+        except Exception as e:
+            raise ETLPipelineException(e,sys)
@@ -0,0 +1,184 @@
+import sys
+from numbers import Integral
+
+import numpy as np
+from sklearn.impute import KNNImputer
+from sklearn.utils._param_validation import Interval
+from sklearn.utils.validation import FLOAT_DTYPES, check_is_fitted, validate_data
+
+from etl_project.exception.exception import ETLPipelineException
+
+
+class IndexedKNNImputer(KNNImputer):
+    """
+    KNNImputer with a serving-optimized transform.
+
+    ``KNNImputer.transform`` builds a nan-euclidean distance matrix against
+    every stored training row and then loops over columns, so its cost grows
+    with the training set. This imputer prepares a donor index at fit time
+    (the fully observed training rows and their squared norms, pickled with
+    the preprocessor) and finds neighbours with a blocked BLAS kernel: for
+    each missing-value pattern the observed-column distances come from one
+    matrix product per block of donors. Rows without missing values are
+    returned untouched and never reach the distance code.
+
+    With ``max_donors`` set, the index keeps a fixed random sample of that
+    many donors, which bounds imputation latency regardless of the training
+    set size. With ``max_donors=None`` and complete training data the
+    imputed values match ``KNNImputer`` up to ties between equally distant
+    neighbours. Configurations the index can't serve (custom metrics or
+    weights, all-missing training columns) fall back to
+    ``KNNImputer.transform``.
+
+    Parameters:
+    -----------
+    max_donors : int or None, default=None
+        Maximum number of training rows kept in the donor index
+    block_size : int, default=65536
+        Number of donors compared per matrix product
+    random_state : int, default=0
+        Seed for sampling the donors when max_donors is set
+    """
+    _parameter_constraints: dict = {
+        **KNNImputer._parameter_constraints,
+        "max_donors"   : [Interval(Integral, 1, None, closed="left"), None],
+        "block_size"   : [Interval(Integral, 1, None, closed="left")],
+        "random_state" : ["random_state"],
+    }
+
+    def __init__(self, *, missing_values=np.nan, n_neighbors=5, weights="uniform",
+                 metric="nan_euclidean", copy=True, add_indicator=False,
+                 keep_empty_features=False, max_donors=None, block_size=65536,
+                 random_state=0):
+        super().__init__(missing_values=missing_values, n_neighbors=n_neighbors,
+                         weights=weights, metric=metric, copy=copy,
+                         add_indicator=add_indicator,
+                         keep_empty_features=keep_empty_features)
+        self.max_donors   = max_donors
+        self.block_size   = block_size
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        try:
+            super().fit(X, y)
+
+            complete_rows = ~self._mask_fit_X.any(axis=1)
+            # Share the training matrix when it is complete, so it is stored once
+            donors = self._fit_X if complete_rows.all() else self._fit_X[complete_rows]
+            if self.max_donors is not None and len(donors) > self.max_donors:
+                rng = np.random.default_rng(self.random_state)
+                donors = donors[np.sort(rng.choice(len(donors), self.max_donors, replace=False))]
+
+            self._donors = donors
+            self._donor_sq_norms = np.einsum("ij,ij->i", donors, donors)
+            self._index_enabled = bool(
+                isinstance(self.missing_values, float) and np.isnan(self.missing_values)
+                and self.metric == "nan_euclidean"
+                and self.weights in ("uniform", "distance")
+                and self._valid_mask.all()
+                and len(donors) >= self.n_neighbors
+            )
+            if self._index_enabled:
+                self._column_means = np.nanmean(self._fit_X, axis=0)
+            return self
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def _nearest_donors(self, queries: np.ndarray, missing_cols: np.ndarray):
+        """
+        Returns squared observed-column distances (without the constant
+        query norm) and indices of the k nearest donors for each query.
+        ``queries`` has zeros in the missing columns.
+        """
+        k = self.n_neighbors
+        best_dist = np.empty((len(queries), 0))
+        best_idx  = np.empty((len(queries), 0), dtype=np.intp)
+
+        for start in range(0, len(self._donors), self.block_size):
+            block = self._donors[start:start + self.block_size]
+            missing_part = block[:, missing_cols]
+            block_norms = (self._donor_sq_norms[start:start + self.block_size]
+                           - np.einsum("ij,ij->i", missing_part, missing_part))
+            dist = block_norms[None, :] - 2.0 * (queries @ block.T)
+
+            if dist.shape[1] > k:
+                idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            else:
+                idx = np.broadcast_to(np.arange(dist.shape[1]), dist.shape)
+            best_dist = np.hstack([best_dist, np.take_along_axis(dist, idx, axis=1)])
+            best_idx  = np.hstack([best_idx, idx + start])
+
+            if best_dist.shape[1] > k:
+                keep = np.argpartition(best_dist, k - 1, axis=1)[:, :k]
+                best_dist = np.take_along_axis(best_dist, keep, axis=1)
+                best_idx  = np.take_along_axis(best_idx, keep, axis=1)
+
+        return best_dist, best_idx
+
+    def _impute_pattern(self, X: np.ndarray, rows: np.ndarray, pattern: np.ndarray) -> None:
+        missing_cols = np.flatnonzero(pattern)
+
+        if pattern.all():
+            X[np.ix_(rows, missing_cols)] = self._column_means[missing_cols]
+            return
+
+        queries = X[rows]
+        queries[:, missing_cols] = 0.0
+        dist, idx = self._nearest_donors(queries, missing_cols)
+        values = self._donors[idx[:, :, None], missing_cols]
+
+        if self.weights == "uniform":
+            imputed = values.mean(axis=1)
+        else:
+            # Same scaling and zero-distance handling as nan_euclidean + KNNImputer
+            dist = np.maximum(dist + np.einsum("ij,ij->i", queries, queries)[:, None], 0.0)
+            dist = np.sqrt(dist * pattern.size / (pattern.size - missing_cols.size))
+            with np.errstate(divide="ignore"):
+                weights = 1.0 / dist
+            inf_mask = np.isinf(weights)
+            inf_rows = inf_mask.any(axis=1)
+            weights[inf_rows] = inf_mask[inf_rows]
+            imputed = np.einsum("rk,rkm->rm", weights, values) / weights.sum(axis=1)[:, None]
+
+        X[np.ix_(rows, missing_cols)] = imputed
+
+    def _impute(self, X: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        row_missing_idx = np.flatnonzero(mask.any(axis=1))
+
+        if row_missing_idx.size:
+            patterns, inverse = np.unique(mask[row_missing_idx], axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            for pattern_idx, pattern in enumerate(patterns):
+                self._impute_pattern(X, row_missing_idx[inverse == pattern_idx], pattern)
+
+        X_indicator = super()._transform_indicator(mask)
+        return super()._concatenate_indicator(X, X_indicator)
+
+    def transform(self, X):
+        if not getattr(self, "_index_enabled", False):
+            return super().transform(X)
+        try:
+            check_is_fitted(self)
+            X = validate_data(self, X, accept_sparse=False, dtype=FLOAT_DTYPES,
+                              force_writeable=True, ensure_all_finite="allow-nan",
+                              copy=self.copy, reset=False)
+            return self._impute(X, np.isnan(X))
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
+
+    def transform_array(self, X: np.ndarray) -> np.ndarray:
+        """
+        Low-latency ``transform`` for a 2-D float64 array that is already in
+        training column order, e.g. a preallocated serving buffer. Input
+        validation is skipped, and a block without missing values is
+        returned as is, without a copy.
+        """
+        if not getattr(self, "_index_enabled", False):
+            return super().transform(X)
+        try:
+            mask = np.isnan(X)
+            if not self.add_indicator and not mask.any():
+                return X
+            return self._impute(X.copy(), mask)
+        except Exception as e:
+            raise ETLPipelineException(e, sys)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.preprocessing import FunctionTransformer
+
+from etl_project.entity.config_entity import ModelRegistryConfig
+from etl_project.serving.model_registry import ModelRegistry
+from etl_project.utils.main_utils.utils import save_object
+from etl_project.utils.ml_utils.model.compiled_ensemble import COMPILED_MAX_BATCH_ROWS, CompiledTreeEnsemble
+
+N_FEATURES = 6
+
+
+def training_data(missing: bool, n_classes: int = 2):
+    rng = np.random.default_rng(0)
+    # Phishing-style {-1, 0, 1} columns next to continuous ones
+    X = np.column_stack([rng.integers(-1, 2, size=(600, 3)), rng.normal(size=(600, N_FEATURES - 3))])
+    y = (X[:, 0] + X[:, 3] + rng.normal(scale=0.5, size=600) > 0).astype(int)
+    if n_classes > 2:
+        y = y + (X[:, 4] > 0.5)
+    if missing:
+        X[rng.random(X.shape) < 0.1] = np.nan
+    return X, y
+
+
+def boundary_rows(compiled: CompiledTreeEnsemble, missing: bool) -> np.ndarray:
+    """
+    Rows whose values sit on, and one float64 or float32 step either side
+    of, the split thresholds, with NaNs mixed in if the model saw them.
+    """
+    rng = np.random.default_rng(1)
+    X = np.zeros((COMPILED_MAX_BATCH_ROWS, N_FEATURES))
+    for column in range(N_FEATURES):
+        # Splits that only separate missing values have an infinite threshold
+        thresholds = compiled.threshold[(compiled.feature == column) & np.isfinite(compiled.threshold)]
+        threshold32 = thresholds.astype(np.float32)
+        candidates = np.concatenate([
+            thresholds,
+            np.nextafter(thresholds, np.inf),
+            np.nextafter(thresholds, -np.inf),
+            threshold32,
+            np.nextafter(threshold32, np.float32(np.inf)),
+            np.nextafter(threshold32, np.float32(-np.inf)),
+        ]).astype(np.float64)
+        if candidates.size:
+            X[:, column] = rng.choice(candidates, size=COMPILED_MAX_BATCH_ROWS)
+    if missing:
+        X[rng.random(X.shape) < 0.15] = np.nan
+    return X
+
+
+ESTIMATORS = [
+    pytest.param(RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0), True, id="random_forest"),
+    pytest.param(ExtraTreesClassifier(n_estimators=25, max_depth=8, random_state=0), True, id="extra_trees"),
+    # GradientBoostingClassifier does not accept missing values
+    pytest.param(GradientBoostingClassifier(n_estimators=25, max_depth=3, random_state=0), False,
+                 id="gradient_boosting"),
+]
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("estimator,missing", ESTIMATORS)
+def test_compiled_matches_sklearn(estimator, missing, n_classes):
+    X_train, y_train = training_data(missing, n_classes)
+    estimator.fit(X_train, y_train)
+    compiled = CompiledTreeEnsemble.from_estimator(estimator)
+    assert compiled is not None
+
+    X = boundary_rows(compiled, missing)
+    for n_rows in range(1, COMPILED_MAX_BATCH_ROWS + 1):
+        np.testing.assert_array_equal(compiled.predict(X[:n_rows]), estimator.predict(X[:n_rows]))
+        np.testing.assert_array_equal(compiled.predict_proba(X[:n_rows]), estimator.predict_proba(X[:n_rows]))
+
+
+def test_registry_loads_pickle_only_for_large_batches(tmp_path):
+    X_train, y_train = training_data(missing=False)
+    estimator = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X_train, y_train)
+    config = ModelRegistryConfig(str(tmp_path), memory_map=False)
+    save_object(config.preprocessor_file_path, FunctionTransformer())
+    CompiledTreeEnsemble.from_estimator(estimator).save(config.compiled_model_file_path)
+    save_object(config.model_file_path, estimator)
+
+    etl_model = ModelRegistry(config).refresh().model
+    assert etl_model.model is None
+    X = X_train[:COMPILED_MAX_BATCH_ROWS + 1]
+    np.testing.assert_array_equal(etl_model.predict(X[:-1]), estimator.predict(X[:-1]))
+    assert etl_model.model is None
+
+    # A retrain replacing the pickle does not change the version already loaded
+    save_object(config.model_file_path, RandomForestClassifier(n_estimators=1).fit(X_train, 1 - y_train))
+    np.testing.assert_array_equal(etl_model.predict(X), estimator.predict(X))
+    assert isinstance(etl_model.model, RandomForestClassifier) and len(etl_model.model.estimators_) == 10
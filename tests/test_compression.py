@@ -0,0 +1,82 @@
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+
+try:
+    from compression import zstd
+except ImportError:  # Python < 3.14
+    from backports import zstd
+
+import app as serving_app
+from etl_project.constants.serving import DECOMPRESSION_WRITE_SIZE
+from etl_project.serving.compression import DecompressedBodyTooLarge, StreamDecompressor, _Compressor, decompress
+
+# 64 MiB of zeros, a few dozen KiB compressed
+BOMB_SIZE = 64 * 1024 ** 2
+COMPRESS = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=9),
+    "zstd": lambda data: zstd.compress(data, level=19),
+}
+
+
+@pytest.fixture(scope="module")
+def bombs():
+    return {encoding: compress(b"0" * BOMB_SIZE) for encoding, compress in COMPRESS.items()}
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESS))
+def test_round_trip_across_members(encoding):
+    data = b"a,b\n" + b"1,2\n" * 100_000
+    body = COMPRESS[encoding](data[:1000]) + COMPRESS[encoding](data[1000:])
+    assert decompress(body) == data
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESS))
+def test_streamed_response_decodes_chunk_by_chunk(encoding):
+    compressor, decompressor = _Compressor(encoding), StreamDecompressor(encoding)
+    chunks = [b"a,b\n", b"1,2\n" * 10_000, b"3,4\n"]
+    for chunk in chunks:
+        # Each flushed chunk decodes on its own, before the stream ends
+        assert b"".join(decompressor.decompress(compressor.compress(chunk, final=False))) == chunk
+    assert b"".join(decompressor.decompress(compressor.compress(b"", final=True))) == b""
+    decompressor.finish()
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESS))
+def test_pieces_are_bounded(encoding, bombs):
+    decompressor = StreamDecompressor(encoding)
+    pieces = decompressor.decompress(bombs[encoding])
+    total = 0
+    for piece in pieces:
+        assert 0 < len(piece) <= DECOMPRESSION_WRITE_SIZE
+        total += len(piece)
+    decompressor.finish()
+    assert total == BOMB_SIZE
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESS))
+def test_bomb_stops_at_limit(encoding, bombs):
+    decompressor = StreamDecompressor(encoding, max_bytes=4 * DECOMPRESSION_WRITE_SIZE)
+    with pytest.raises(DecompressedBodyTooLarge):
+        for _ in decompressor.decompress(bombs[encoding]):
+            pass
+    assert decompressor.output_bytes <= 5 * DECOMPRESSION_WRITE_SIZE
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESS))
+def test_truncated_body_fails(encoding):
+    body = COMPRESS[encoding](b"1,2\n" * 10_000)
+    with pytest.raises(ValueError):
+        decompress(body[:len(body) // 2], encoding)
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESS))
+def test_predict_stream_rejects_bomb(encoding, bombs, monkeypatch):
+    monkeypatch.setattr(serving_app, "SERVING_MAX_BODY_BYTES", 4 * DECOMPRESSION_WRITE_SIZE)
+    monkeypatch.setattr(serving_app.model_registry, "get", lambda: object())
+    client = TestClient(serving_app.app)
+    response = client.post("/predict/stream", content=bombs[encoding],
+                           headers={"Content-Type": "text/csv", "Content-Encoding": encoding})
+    assert response.status_code == 413
+    assert response.json()["status"] == "error"
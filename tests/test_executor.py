@@ -0,0 +1,37 @@
+import asyncio
+import os
+import signal
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.tree import DecisionTreeClassifier
+
+from etl_project.entity.config_entity import ModelRegistryConfig
+from etl_project.serving.executor import InferenceExecutor
+from etl_project.serving.model_registry import ModelRegistry
+from etl_project.utils.main_utils.utils import save_object
+
+
+def test_process_pool_recovers_from_a_dead_worker(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.integers(-1, 2, size=(200, 4)).astype(float)
+    y = (X[:, 0] > 0).astype(int)
+    config = ModelRegistryConfig(str(tmp_path), memory_map=False)
+    save_object(config.preprocessor_file_path, FunctionTransformer())
+    save_object(config.model_file_path, DecisionTreeClassifier(random_state=0).fit(X, y))
+    df = pd.DataFrame(X[:10], columns=["a", "b", "c", "d"])
+
+    executor = InferenceExecutor(ModelRegistry(config), mode="process", max_workers=1)
+    try:
+        executor.start()
+        expected = asyncio.run(executor.predict(df))
+        broken_pool = executor._pool
+        for process in list(broken_pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+
+        np.testing.assert_array_equal(asyncio.run(executor.predict(df)), expected)
+        assert executor._pool is not broken_pool
+    finally:
+        executor.shutdown()
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from sklearn.impute import KNNImputer
+
+from etl_project.constants.training_pipeline import DATA_TRANSFORMATION_IMPUTER_PARAMS
+from etl_project.utils.ml_utils.preprocessing.imputer import IndexedKNNImputer
+
+
+def test_default_params_keep_every_donor():
+    assert DATA_TRANSFORMATION_IMPUTER_PARAMS["max_donors"] is None
+
+
+@pytest.mark.parametrize("weights", ["uniform", "distance"])
+def test_matches_knn_imputer(weights):
+    rng = np.random.default_rng(0)
+    # Continuous values, so no two donors are equally distant
+    train = rng.normal(size=(3000, 8))
+    X = rng.normal(size=(500, 8))
+    X[rng.random(X.shape) < 0.2] = np.nan
+    X[0] = np.nan
+
+    params = {**DATA_TRANSFORMATION_IMPUTER_PARAMS, "weights": weights}
+    # A block size below the donor count also covers merging blocks
+    indexed = IndexedKNNImputer(**params, block_size=1000).fit(train)
+    params.pop("max_donors")
+    expected = KNNImputer(**params).fit(train).transform(X)
+
+    np.testing.assert_allclose(indexed.transform(X), expected, rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(indexed.transform_array(X), expected, rtol=1e-10, atol=1e-10)
@@ -0,0 +1,27 @@
+import asyncio
+import gc
+
+import numpy as np
+
+from etl_project.serving.live import LivePredictionBatcher
+
+
+def test_running_batches_are_held_until_done():
+    async def score(records):
+        # Collected while the batch waits, unless the batcher holds its task
+        gc.collect()
+        await asyncio.sleep(0.01)
+        return np.array(records) * 2, "v1"
+
+    async def main():
+        batcher = LivePredictionBatcher(score, max_rows=4, window_ms=5)
+        first = asyncio.ensure_future(batcher.predict([1, 2]))
+        await asyncio.sleep(0)
+        assert len(batcher._running) == 1
+        results = await asyncio.wait_for(asyncio.gather(first, batcher.predict([3]), batcher.predict([4])), 5)
+        return batcher, results
+
+    batcher, results = asyncio.run(main())
+    assert [predictions.tolist() for predictions, _ in results] == [[2, 4], [6], [8]]
+    assert all(model_version == "v1" for _, model_version in results)
+    assert not batcher._running
@@ -0,0 +1,31 @@
+import os
+import time
+
+import pandas as pd
+
+from etl_project.entity.config_entity import PredictionResultStoreConfig
+from etl_project.serving.result_store import PredictionResultStore
+
+
+def test_retention_scans_only_past_a_limit(tmp_path, monkeypatch):
+    config = PredictionResultStoreConfig(str(tmp_path))
+    config.max_count = 10
+    store = PredictionResultStore(config)
+    scans = []
+    enforce_retention = store.enforce_retention
+    monkeypatch.setattr(store, "enforce_retention", lambda: scans.append(1) or enforce_retention())
+
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    for _ in range(11):
+        store._write(store.new_result_id(), df)
+        # Distinct mtimes, so the oldest results are the ones removed
+        time.sleep(0.01)
+
+    # The first write, then the write past the count limit, which evicts down to the low-water mark
+    assert len(scans) == 2
+    assert len(os.listdir(tmp_path)) == 9
+
+    # Back at the limit, the next write does not scan again
+    store._write(store.new_result_id(), df)
+    assert len(scans) == 2
+    assert len(os.listdir(tmp_path)) == config.max_count
@@ -0,0 +1,13 @@
+import os
+
+from benchmarks.startup_benchmark import FORBIDDEN_MODULES, import_times
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_imports_no_training_module():
+    imported = import_times("app", REPO_DIR)
+    forbidden = sorted(name for name in imported
+                       if any(name == prefix or name.startswith(prefix + ".") for prefix in FORBIDDEN_MODULES))
+    assert "app" in imported
+    assert not forbidden, f"training-only modules imported by the app: {forbidden}"
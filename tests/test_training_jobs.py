@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+import time
+
+from etl_project.pipeline import training_jobs
+from etl_project.pipeline.training_jobs import JOB_FAILED, JOB_SUCCEEDED, TrainingJob, TrainingJobManager
+
+
+def test_workers_share_the_active_job(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def run_training_job(events):
+        release.wait(10)
+        events.put({"stage": "job", "status": JOB_SUCCEEDED, "timestamp": time.time(), "result": None})
+
+    class FakeProcess:
+        def __init__(self, target, args, name):
+            self._thread = threading.Thread(target=target, args=args)
+            self.exitcode = 0
+
+        def start(self):
+            self._thread.start()
+
+        def is_alive(self):
+            return self._thread.is_alive()
+
+        def join(self):
+            self._thread.join()
+
+    monkeypatch.setattr(training_jobs, "_run_training_job", run_training_job)
+    # Two managers on one job directory stand in for two pre-forked workers
+    workers = [TrainingJobManager(job_dir=str(tmp_path)) for _ in range(2)]
+    monkeypatch.setattr(workers[0]._mp_context, "Process", FakeProcess, raising=False)
+
+    submitted = workers[0].submit()
+    joined = workers[1].submit()
+    assert not submitted["deduplicated"]
+    assert joined["deduplicated"] and joined["job_id"] == submitted["job_id"]
+    assert workers[1].get(submitted["job_id"])["finished_at"] is None
+
+    release.set()
+    for _ in range(100):
+        if workers[1].get(submitted["job_id"])["status"] == JOB_SUCCEEDED:
+            break
+        time.sleep(0.05)
+    assert workers[1].get(submitted["job_id"])["status"] == JOB_SUCCEEDED
+
+
+def test_job_without_supervisor_is_failed(tmp_path):
+    manager = TrainingJobManager(job_dir=str(tmp_path))
+    job = TrainingJob(job_id="0" * 32, status="running", started_at=time.time())
+    with open(os.path.join(str(tmp_path), job.job_id + ".json"), "w") as file:
+        json.dump(job.__dict__, file)
+
+    assert manager.get(job.job_id)["status"] == JOB_FAILED
+    assert manager.get("../" + job.job_id) is None
+
+
+def test_final_event_left_on_queue_is_applied(tmp_path):
+    manager = TrainingJobManager(job_dir=str(tmp_path))
+    events = manager._mp_context.Queue()
+    process = manager._mp_context.Process(target=events.put, args=(
+        {"stage": "job", "status": JOB_SUCCEEDED, "timestamp": time.time(), "result": None},))
+    process.start()
+    job = TrainingJob(job_id="1" * 32, status="running", started_at=time.time())
+
+    manager._drain_events(job, events, process)
+    assert job.status == JOB_SUCCEEDED
+    events.close()
@@ -0,0 +1,55 @@
+import asyncio
+import gzip
+import os
+
+import numpy as np
+
+from etl_project.entity.config_entity import ChunkedUploadConfig, PredictionResultStoreConfig
+from etl_project.serving.result_store import PredictionResultStore
+from etl_project.serving.uploads import ChunkedUploadStore
+
+
+async def predict(df):
+    return np.zeros(len(df))
+
+
+def test_upload_inflating_past_limit_fails(tmp_path):
+    upload_config = ChunkedUploadConfig(str(tmp_path / "uploads"))
+    upload_config.max_bytes = 4 * 1024 ** 2
+    result_store = PredictionResultStore(PredictionResultStoreConfig(str(tmp_path / "results")))
+    store = ChunkedUploadStore(predict, result_store, upload_config)
+    body = gzip.compress(b"a,b\n" + b"1,2\n" * (4 * 1024 ** 2), compresslevel=9)
+    assert len(body) < upload_config.max_bytes
+
+    async def upload():
+        state = await store.create("bomb.csv.gz", len(body))
+        await store.append(state["upload_id"], 0, body)
+        await asyncio.wait_for(store._scorers[state["upload_id"]], 30)
+        return await store.status(state["upload_id"])
+
+    state = asyncio.run(upload())
+    assert state["status"] == "failed"
+    assert "byte limit once decompressed" in state["error"]
+    assert not os.path.exists(os.path.join(upload_config.upload_dir, state["upload_id"] + ".part"))
+
+
+def test_upload_counts_numeric_and_named_labels(tmp_path):
+    async def predict_names(df):
+        return np.where(df["a"] > 1, "win", "loss")
+
+    async def upload(predict_labels):
+        result_store = PredictionResultStore(PredictionResultStoreConfig(str(tmp_path / "results")))
+        store = ChunkedUploadStore(predict_labels, result_store, ChunkedUploadConfig(str(tmp_path / "uploads")))
+        body = b"a,b\n" + b"1,2\n3,4\n" * 100
+        state = await store.create("fixtures.csv", len(body))
+        await store.append(state["upload_id"], 0, body)
+        await asyncio.wait_for(store._scorers[state["upload_id"]], 30)
+        return await store.status(state["upload_id"])
+
+    state = asyncio.run(upload(predict_names))
+    assert state["status"] == "complete", state.get("error")
+    assert state["prediction_counts"] == {"loss": 100, "win": 100}
+
+    state = asyncio.run(upload(predict))
+    assert state["status"] == "complete", state.get("error")
+    assert state["prediction_counts"] == {"0": 200}